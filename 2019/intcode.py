@@ -1,6 +1,121 @@
+import itertools
+import operator
+import random
+import sys
+import time
+from collections import OrderedDict, deque
+
+
 class IntCodeException(Exception):
     pass
 
+
+class Memory:
+    """
+    Memory of an IntCode machine, divided into pages of PAGE_SIZE
+    values. Pages are only allocated when they are written to
+    (reading from a page that doesn't exist returns zero), so
+    using a very high address doesn't require allocating all the
+    memory up to that address.
+
+    Copies of a memory share their pages, and a page is only
+    copied when one of the memories writes to it (copy-on-write).
+    """
+
+    PAGE_BITS = 8
+    PAGE_SIZE = 1 << PAGE_BITS
+    PAGE_MASK = PAGE_SIZE - 1
+
+    def __init__(self, values=()):
+        """
+        Creates a memory with the given initial values
+        """
+        # Pages, indexed by page number
+        self.pages = {}
+
+        # Pages that are not shared with any other memory
+        # (and can be written to without copying them)
+        self.owned = set()
+
+        # Pages that have been written to, and may be
+        # different from the initial values
+        self.dirty = set()
+
+        values = list(values)
+        for start in range(0, len(values), Memory.PAGE_SIZE):
+            page = values[start:start+Memory.PAGE_SIZE]
+            page.extend([0] * (Memory.PAGE_SIZE - len(page)))
+            self.pages[start >> Memory.PAGE_BITS] = page
+            self.owned.add(start >> Memory.PAGE_BITS)
+
+    def __getitem__(self, address):
+        page = self.pages.get(address >> Memory.PAGE_BITS)
+        if page is None:
+            if address < 0:
+                raise IntCodeException(f"Invalid address: {address}")
+            return 0
+        return page[address & Memory.PAGE_MASK]
+
+    def __eq__(self, other):
+        if not isinstance(other, Memory):
+            return NotImplemented
+        zeros = [0] * Memory.PAGE_SIZE
+        return all(self.pages.get(n, zeros) == other.pages.get(n, zeros)
+                   for n in self.pages.keys() | other.pages.keys())
+
+    def __setitem__(self, address, value):
+        n = address >> Memory.PAGE_BITS
+        if n not in self.owned:
+            self.own(n)
+        self.pages[n][address & Memory.PAGE_MASK] = value
+
+    def read_range(self, start, end):
+        """
+        Returns the values from address start to address end
+        (not included) as a list
+        """
+        n = start >> Memory.PAGE_BITS
+        if n == (end - 1) >> Memory.PAGE_BITS and n in self.pages:
+            return self.pages[n][start & Memory.PAGE_MASK:((end - 1) & Memory.PAGE_MASK) + 1]
+        return [self[address] for address in range(start, end)]
+
+    def own(self, n):
+        """
+        Makes sure page n is allocated and not shared
+        with any other memory (copying it if necessary)
+        """
+        if n < 0:
+            raise IntCodeException(f"Invalid page: {n}")
+        page = self.pages.get(n)
+        self.pages[n] = page[:] if page is not None else [0] * Memory.PAGE_SIZE
+        self.owned.add(n)
+        self.dirty.add(n)
+
+    def copy(self):
+        """
+        Creates a copy of the memory. Both memories share
+        all their pages until they write to them.
+        """
+        new = Memory()
+        new.pages = self.pages.copy()
+        new.dirty = self.dirty.copy()
+        self.owned.clear()
+        return new
+
+    def restore(self, base):
+        """
+        Restores every page that has been written to
+        since this memory was copied from base.
+        """
+        for n in self.dirty:
+            if n in base.pages:
+                self.pages[n] = base.pages[n]
+            else:
+                del self.pages[n]
+            self.owned.discard(n)
+        self.dirty.clear()
+
+
 class IntCode:
     """
     IntCode virtual machine
@@ -40,78 +155,154 @@ class IntCode:
         OP_HALT: []
     }
 
+    # Operations performed by each opcode (used by the "decoded"
+    # engine to dispatch instructions)
+    ARITHMETIC = {
+        OP_ADD: operator.add,
+        OP_MUL: operator.mul,
+        OP_LT: lambda x, y: int(x < y),
+        OP_EQ: lambda x, y: int(x == y),
+    }
+
+    JUMPS = {
+        OP_JMPT: operator.truth,
+        OP_JMPF: operator.not_,
+    }
+
     BREAK_INPUT_REQUIRED = 0
     BREAK_INPUT_DONE = 1
     BREAK_OUTPUT_AVAILABLE = 2
     HALT = 3
 
-    def __init__(self, prog):
+    # When to stop running after reading an input:
+    # - after every input
+    # - once the input queue is empty
+    # - never (keep running until we need more input)
+    INPUT_BREAK_EACH = 0
+    INPUT_BREAK_DRAINED = 1
+    INPUT_BREAK_NEVER = 2
+
+    # Conditions for run_until
+    UNTIL_BLOCKED = "blocked"
+    UNTIL_HALT = "halt"
+
+    # Execution engines:
+    # - interpreted: parses every instruction every time it runs it
+    # - decoded: decodes each instruction once, and caches it
+    #   (until the program writes into that instruction)
+    # - compiled: translates each basic block (a sequence of
+    #   instructions without input, output, or halting, that ends
+    #   in a jump) into a Python function, and caches it (until
+    #   the program writes into that block)
+    #
+    # The compiled engine only pays off on programs that spend most
+    # of their time in a few tight loops (like the countdown and
+    # arithmetic loops in benchmark). On programs that run for a short
+    # time, or that are mostly input/output, compiling costs more than
+    # it saves, and it is slower than the decoded engine (on the Day 2
+    # sweep, Day 5, cloning, and the Day 7 amplifier network, for
+    # example). That's why decoded is the default engine.
+    ENGINES = ("interpreted", "decoded", "compiled")
+
+    # Maximum number of instructions in a compiled block
+    MAX_BLOCK_LENGTH = 64
+
+    # Number of times we have to run a block before we compile
+    # it (so we don't waste time compiling code that only runs once)
+    COMPILE_THRESHOLD = 3
+
+    # Compiled blocks, indexed by their source code (so machines
+    # running the same program don't have to compile them again).
+    # Self-modifying programs can keep generating new blocks, so we
+    # only keep the most recently used MAX_COMPILED_SOURCES blocks
+    MAX_COMPILED_SOURCES = 1024
+    _compiled_sources = OrderedDict()
+
+    def __init__(self, prog, engine="decoded"):
         """
         Creates an IntCode machine with the given program
         """
-        self.orig_prog = prog[:]
+        if engine not in IntCode.ENGINES:
+            raise IntCodeException(f"Unknown engine: {engine}")
+
+        self.engine = engine
+        # The original program is never written to, so the
+        # memory of every clone of this machine can share it
+        if isinstance(prog, Memory):
+            self.orig_prog = prog
+        else:
+            self.orig_prog = Memory(prog)
+
+        self.memory = self.orig_prog.copy()
         self.reset()
 
     def reset(self):
         """
-        Resets the machine
+        Resets the machine (only the memory pages that have
+        been written to are restored)
         """
-        self.memory = self.orig_prog[:]
+        self.memory.restore(self.orig_prog)
         self.pc = 0
-        self._input = None
-        self.outputs = []
+        self.inputs = deque()
+        self.outputs = deque()
         self.relative_base = 0
         self.last_break = None
 
+        # Number of instructions executed
+        self.instructions = 0
+
+        # Decoded instructions (indexed by address), and the
+        # addresses that are part of a decoded instruction
+        self._decoded = {}
+        self._code = set()
+
+        # Compiled blocks (indexed by their starting address), and
+        # the blocks that include each address
+        self._blocks = {}
+        self._block_owners = {}
+        self._block_runs = {}
+
     def clone(self):
         """
         Creates a clone of the machine
         """
-        new_vm = IntCode(self.memory)
-        new_vm.orig_prog = self.orig_prog[:]
+        new_vm = IntCode(self.orig_prog, self.engine)
+        new_vm.memory = self.memory.copy()
         new_vm.pc = self.pc
         new_vm.relative_base = self.relative_base
-        new_vm._input = self._input
-        new_vm.outputs = self.outputs[:]
+        new_vm.inputs = self.inputs.copy()
+        new_vm.outputs = self.outputs.copy()
         new_vm.last_break = self.last_break
+        new_vm.instructions = self.instructions
 
-        return new_vm
-
-    def __extend_memory(self, address):
-        """
-        Extends the size of the memory (with 0's) up to
-        the given address
-        """
-        extra_positions = address - len(self.memory) + 1
-        self.memory.extend([0] * extra_positions)
+        # Decoded instructions are still valid in the clone
+        # (and the set of addresses in decoded instructions
+        # only ever grows, so it can be shared)
+        new_vm._decoded = self._decoded.copy()
+        new_vm._code = self._code
+        new_vm._blocks = self._blocks.copy()
+        new_vm._block_owners = self._block_owners.copy()
+        new_vm._block_runs = self._block_runs.copy()
 
-    def __check_address(self, address):
-        """
-        Checks if the given memory address is valid
-        """
-        if address >= len(self.memory):
-            return False
-        else:
-            return True
+        return new_vm
 
     def write(self, address, value):
         """
-        Writes a value into an address, extending
-        the memory if necessary
+        Writes a value into an address.
+
+        Note: Writing directly into self.memory skips invalidating
+        any decoded instructions at that address, so it should only
+        be done before the machine starts running.
         """
-        if not self.__check_address(address):
-            self.__extend_memory(address)
         self.memory[address] = value
+        if address in self._code:
+            self.__invalidate(address)
         
     def read(self, address):
         """
-        Reads a value from an address.
-        Note that, if the memory has to be extended to
-        the given address, that new address will be
-        initialized to a zero by default.
+        Reads a value from an address (addresses that have
+        never been written to are initialized to zero)
         """
-        if not self.__check_address(address):
-            self.__extend_memory(address)
         return self.memory[address]
 
     def parse_operation(self):
@@ -163,32 +354,301 @@ class IntCode:
 
         return opcode, params, i+1+len(params)
 
+    def decode(self, address):
+        """
+        Decodes the instruction at the given address.
+
+        Returns a tuple with the opcode, the mode of each of the
+        three parameters, the (raw) value of each of the three
+        parameters, and the address of the next instruction.
+        Opcodes with fewer than three parameters have their
+        remaining modes and values set to zero.
+
+        The decoded instruction is cached until the program
+        writes into any of the instruction's addresses.
+        """
+        op = self.memory[address]
+        opcode = op % 100
+        param_types = IntCode.OPCODES.get(opcode)
+        if param_types is None:
+            raise IntCodeException(f"Invalid opcode {op} at address {address}")
+
+        n_params = len(param_types)
+        end = address + 1 + n_params
+
+        if op < 100:
+            # Common case: all parameters are in position mode
+            modes = (0, 0, 0)
+        else:
+            modes = (op // 100 % 10, op // 1000 % 10, op // 10000 % 10)
+            if max(modes[:n_params], default=0) > IntCode.MODE_RELATIVE:
+                raise IntCodeException(f"Invalid mode in opcode {op} at address {address}")
+            modes = modes[:n_params] + (0, 0, 0)[n_params:]
+
+        values = self.memory.read_range(address + 1, end) + [0] * (3 - n_params)
+
+        instruction = (opcode, *modes, *values, end)
+        self._decoded[address] = instruction
+        self._code.update(range(address, end))
+
+        return instruction
+
+    def __invalidate(self, address):
+        """
+        Removes any decoded instruction that includes
+        the given address
+        """
+        # Instructions are at most four values long
+        decoded = self._decoded
+        for start in range(address - 3, address + 1):
+            if start in decoded:
+                del decoded[start]
+
+        # Also remove any compiled block that includes it
+        owners = self._block_owners.pop(address, None)
+        if owners is not None:
+            for start in owners:
+                self._blocks.pop(start, None)
+
+    def __operand_source(self, mode, value, name):
+        """
+        Returns the Python code for reading a parameter in a compiled
+        block, as a list of lines that must run before reading it
+        (which may assign to the given variable name), and an expression
+        with its value.
+
+        Addresses known at compile time are read directly from the
+        memory pages (which must be allocated beforehand). Relative
+        addresses are also read from the pages, unless the page
+        hasn't been allocated.
+        """
+        if mode == IntCode.MODE_IMMEDIATE:
+            return [], repr(value)
+        elif mode == IntCode.MODE_RELATIVE:
+            bits, mask = Memory.PAGE_BITS, Memory.PAGE_MASK
+            return [f"a = rb + {value}",
+                    f"try: {name} = pages[a >> {bits}][a & {mask}]",
+                    f"except KeyError: {name} = memory[a]"], name
+        elif value < 0:
+            # Let the memory raise the exception at runtime
+            return [], f"memory[{value}]"
+        else:
+            n = value >> Memory.PAGE_BITS
+            if n not in self.memory.pages:
+                self.memory.own(n)
+            return [], f"pages[{n}][{value & Memory.PAGE_MASK}]"
+
+    def __write_source(self, mode, value, expr, next_pc, end, count):
+        """
+        Returns the lines of Python code for writing the result of an
+        instruction in a compiled block (where next_pc is the address
+        of the next instruction, and end is the end of the block).
+
+        If the write modifies the program, any decoded instructions
+        or compiled blocks at that address are invalidated. If it
+        modifies the rest of the block we're running, the block
+        stops right away (since the rest of the block is stale)
+        """
+        if mode == IntCode.MODE_RELATIVE:
+            bits, mask = Memory.PAGE_BITS, Memory.PAGE_MASK
+            return [f"v = {expr}",
+                    f"a = rb + {value}",
+                    f"n = a >> {bits}",
+                    f"if n not in owned: memory.own(n)",
+                    f"pages[n][a & {mask}] = v",
+                    f"if a in code:",
+                    f"    invalidate(a)",
+                    f"    if {next_pc} <= a < {end}: return {next_pc}, rb, {count}"]
+        elif value < 0:
+            return [f"memory[{value}] = {expr}"]
+        else:
+            n = value >> Memory.PAGE_BITS
+            lines = [f"v = {expr}",
+                     f"if {n} not in owned: memory.own({n})",
+                     f"pages[{n}][{value & Memory.PAGE_MASK}] = v"]
+            if next_pc <= value < end:
+                lines += [f"if {value} in code:",
+                          f"    invalidate({value})",
+                          f"    return {next_pc}, rb, {count}"]
+            else:
+                lines += [f"if {value} in code: invalidate({value})"]
+            return lines
+
+    def compile_block(self, start):
+        """
+        Compiles the basic block starting at the given address into
+        a Python function, and caches it. The block ends with the
+        first jump, or right before the first input, output, or halt
+        instruction. If the instruction at that address is one of
+        those, there is no block to compile, and we cache False.
+
+        The function takes the memory, its pages, the set of pages
+        owned by the memory, the set of addresses that are part of
+        the program, a function to invalidate an address, and the
+        relative base. It returns the address of the next instruction,
+        the updated relative base, and the number of instructions
+        that were run.
+        """
+        # Find the instructions in the block
+        instructions = []
+        pc = start
+        while len(instructions) < IntCode.MAX_BLOCK_LENGTH:
+            instruction = self._decoded.get(pc)
+            if instruction is None:
+                instruction = self.decode(pc)
+            opcode = instruction[0]
+            if opcode in (IntCode.OP_IN, IntCode.OP_OUT, IntCode.OP_HALT):
+                break
+            instructions.append(instruction)
+            pc = instruction[-1]
+            if opcode in IntCode.JUMPS:
+                break
+        end = pc
+
+        for address in range(start, max(end, start + 1)):
+            self._block_owners.setdefault(address, []).append(start)
+            self._code.add(address)
+
+        if len(instructions) == 0:
+            self._blocks[start] = False
+            return False
+
+        # Generate the code for each instruction
+        lines = []
+        for count, instruction in enumerate(instructions, start=1):
+            opcode, m1, m2, m3, v1, v2, v3, next_pc = instruction
+            setup, x = self.__operand_source(m1, v1, "x")
+            lines.extend(setup)
+            if opcode in IntCode.ARITHMETIC:
+                setup, y = self.__operand_source(m2, v2, "y")
+                lines.extend(setup)
+                if opcode == IntCode.OP_ADD:
+                    expr = f"{x} + {y}"
+                elif opcode == IntCode.OP_MUL:
+                    expr = f"{x} * {y}"
+                elif opcode == IntCode.OP_LT:
+                    expr = f"int({x} < {y})"
+                else:
+                    expr = f"int({x} == {y})"
+                lines.extend(self.__write_source(m3, v3, expr, next_pc, end, count))
+            elif opcode in IntCode.JUMPS:
+                cmp = "!=" if opcode == IntCode.OP_JMPT else "=="
+                setup, target = self.__operand_source(m2, v2, "y")
+                if len(setup) == 0:
+                    lines.append(f"if {x} {cmp} 0: return {target}, rb, {count}")
+                else:
+                    lines.append(f"if {x} {cmp} 0:")
+                    lines.extend("    " + line for line in setup)
+                    lines.append(f"    return {target}, rb, {count}")
+            elif opcode == IntCode.OP_RELBASE:
+                lines.append(f"rb += {x}")
+        lines.append(f"return {end}, rb, {len(instructions)}")
+
+        source = "def block(memory, pages, owned, code, invalidate, rb):\n" + \
+                 "\n".join("    " + line for line in lines)
+
+        sources = IntCode._compiled_sources
+        block = sources.get(source)
+        if block is None:
+            namespace = {}
+            exec(source, namespace)
+            block = namespace["block"]
+            sources[source] = block
+            if len(sources) > IntCode.MAX_COMPILED_SOURCES:
+                sources.popitem(last=False)
+        else:
+            sources.move_to_end(source)
+
+        self._blocks[start] = block
+        return block
+
+    def __allocate_for(self, instruction):
+        """
+        Allocates the memory pages for every address
+        accessed by a decoded instruction
+        """
+        _, *modes_values, _ = instruction
+        modes, values = modes_values[:3], modes_values[3:]
+        for m, v in zip(modes, values):
+            if m != IntCode.MODE_IMMEDIATE:
+                address = v + self.relative_base if m == IntCode.MODE_RELATIVE else v
+                if address >> Memory.PAGE_BITS not in self.memory.pages:
+                    self.memory.own(address >> Memory.PAGE_BITS)
+
     def run(self, expect_outputs = 1):
-        self.outputs = []
+        """
+        Runs the program until it reads an input, it needs an input
+        (and there are none queued), it has produced expect_outputs
+        outputs, or it halts. Returns the reason why it stopped
+        (BREAK_INPUT_DONE, BREAK_INPUT_REQUIRED, BREAK_OUTPUT_AVAILABLE,
+        or HALT).
+
+        Any previous outputs are discarded.
+        """
+        self.outputs.clear()
+        return self._run(expect_outputs, IntCode.INPUT_BREAK_EACH)
+
+    def run_until(self, until=UNTIL_BLOCKED):
+        """
+        Runs the program, reading as many queued inputs as it needs,
+        until it needs an input and there are none queued
+        (UNTIL_BLOCKED), or until it halts (UNTIL_HALT). Outputs
+        are added to the output queue (see drain)
+
+        Returns BREAK_INPUT_REQUIRED or HALT.
+        """
+        rv = self._run(None, IntCode.INPUT_BREAK_NEVER)
+        if until == IntCode.UNTIL_HALT and rv != IntCode.HALT:
+            raise IntCodeException("The program needs an input but there are none queued")
+        return rv
+
+    def _run(self, expect_outputs, input_break):
+        """
+        Runs the program with the machine's engine. If expect_outputs
+        is None, we don't stop after producing outputs. input_break
+        specifies when to stop after reading an input.
+        """
+        if self.engine == "decoded":
+            return self._run_decoded(expect_outputs, input_break)
+        elif self.engine == "compiled":
+            return self._run_compiled(expect_outputs, input_break)
+        else:
+            return self._run_interpreted(expect_outputs, input_break)
+
+    def _run_interpreted(self, expect_outputs, input_break):
+        """
+        Runs the program with the "interpreted" engine
+        """
         while True:
             op, params, next_pc = self.parse_operation()
+            self.instructions += 1
             if op == IntCode.OP_ADD:
                 self.write(params[2], params[0] + params[1])
             elif op == IntCode.OP_MUL:
                 self.write(params[2], params[0] * params[1])
             elif op == IntCode.OP_IN:
-                if self._input is not None:
-                    v = self._input
-                    self._input = None
+                if len(self.inputs) > 0:
+                    v = self.inputs.popleft()
                 else:
+                    # The instruction didn't actually run
+                    self.instructions -= 1
                     self.last_break = IntCode.BREAK_INPUT_REQUIRED
                     return IntCode.BREAK_INPUT_REQUIRED
                 self.write(params[0], v)
                 self.pc = next_pc
-                self.last_break = IntCode.BREAK_INPUT_DONE
-                return IntCode.BREAK_INPUT_DONE
+                if input_break == IntCode.INPUT_BREAK_EACH or \
+                   (input_break == IntCode.INPUT_BREAK_DRAINED and len(self.inputs) == 0):
+                    self.last_break = IntCode.BREAK_INPUT_DONE
+                    return IntCode.BREAK_INPUT_DONE
+                continue
             elif op == IntCode.OP_OUT:
                 self.outputs.append(params[0])
                 self.pc = next_pc
-                expect_outputs -= 1
-                if expect_outputs == 0:
-                    self.last_break = IntCode.BREAK_OUTPUT_AVAILABLE
-                    return IntCode.BREAK_OUTPUT_AVAILABLE
+                if expect_outputs is not None:
+                    expect_outputs -= 1
+                    if expect_outputs == 0:
+                        self.last_break = IntCode.BREAK_OUTPUT_AVAILABLE
+                        return IntCode.BREAK_OUTPUT_AVAILABLE
             elif op == IntCode.OP_JMPT:
                 if params[0] != 0:
                     self.pc = params[1]
@@ -216,6 +676,215 @@ class IntCode:
 
             self.pc = next_pc
 
+    def _run_decoded(self, expect_outputs, input_break):
+        """
+        Runs the program with the "decoded" engine. The state
+        of the machine is kept in local variables while running,
+        and it is only stored back in the object when we stop.
+        """
+        memory = self.memory
+        pages = memory.pages
+        owned = memory.owned
+        bits = Memory.PAGE_BITS
+        mask = Memory.PAGE_MASK
+        inputs = self.inputs
+        outputs = self.outputs
+        decoded = self._decoded
+        code = self._code
+        arithmetic = IntCode.ARITHMETIC
+        jumps = IntCode.JUMPS
+        op_in = IntCode.OP_IN
+        op_halt = IntCode.OP_HALT
+        op_relbase = IntCode.OP_RELBASE
+        pc = self.pc
+        rb = self.relative_base
+        count = 0
+
+        while True:
+            instruction = decoded.get(pc)
+            if instruction is None:
+                instruction = self.decode(pc)
+            opcode, m1, m2, m3, v1, v2, v3, next_pc = instruction
+
+            # Memory is accessed directly through its pages (a page
+            # that hasn't been allocated raises a KeyError)
+            try:
+                if m1 == 1:
+                    x = v1
+                elif opcode != op_in and opcode != op_halt:
+                    a = v1 if m1 == 0 else rb + v1
+                    x = pages[a >> bits][a & mask]
+
+                if opcode in arithmetic:
+                    if m2 == 1:
+                        y = v2
+                    else:
+                        a = v2 if m2 == 0 else rb + v2
+                        y = pages[a >> bits][a & mask]
+                    address = rb + v3 if m3 == 2 else v3
+                    n = address >> bits
+                    if n not in owned:
+                        memory.own(n)
+                    pages[n][address & mask] = arithmetic[opcode](x, y)
+                    if address in code:
+                        self.__invalidate(address)
+                elif opcode in jumps:
+                    if jumps[opcode](x):
+                        if m2 == 1:
+                            next_pc = v2
+                        else:
+                            a = v2 if m2 == 0 else rb + v2
+                            next_pc = pages[a >> bits][a & mask]
+                elif opcode == op_relbase:
+                    rb += x
+                else:
+                    # Input, output, and halting need to update the state
+                    # of the machine, so we store it back in the object
+                    self.pc = pc
+                    self.relative_base = rb
+                    self.instructions += count
+                    count = 0
+
+                    if opcode == IntCode.OP_IN:
+                        if len(inputs) == 0:
+                            self.last_break = IntCode.BREAK_INPUT_REQUIRED
+                            return IntCode.BREAK_INPUT_REQUIRED
+                        self.write(rb + v1 if m1 == 2 else v1, inputs.popleft())
+                        if input_break == IntCode.INPUT_BREAK_EACH or \
+                           (input_break == IntCode.INPUT_BREAK_DRAINED and len(inputs) == 0):
+                            self.pc = next_pc
+                            self.instructions += 1
+                            self.last_break = IntCode.BREAK_INPUT_DONE
+                            return IntCode.BREAK_INPUT_DONE
+                    elif opcode == IntCode.OP_OUT:
+                        outputs.append(x)
+                        if expect_outputs is not None:
+                            expect_outputs -= 1
+                            if expect_outputs == 0:
+                                self.pc = next_pc
+                                self.instructions += 1
+                                self.last_break = IntCode.BREAK_OUTPUT_AVAILABLE
+                                return IntCode.BREAK_OUTPUT_AVAILABLE
+                    elif opcode == IntCode.OP_HALT:
+                        self.instructions += 1
+                        self.last_break = IntCode.HALT
+                        return IntCode.HALT
+            except KeyError:
+                # The instruction accessed a page that hasn't been
+                # allocated yet. Allocate it, and try again.
+                self.pc = pc
+                self.relative_base = rb
+                self.__allocate_for(instruction)
+                continue
+
+            count += 1
+            pc = next_pc
+
+    def __run_block(self, pc, rb):
+        """
+        Runs the basic block starting at pc without compiling it
+        (decoding one instruction at a time). Returns the address
+        of the next instruction, the updated relative base, and
+        the number of instructions that were run.
+        """
+        memory = self.memory
+        count = 0
+        while True:
+            instruction = self._decoded.get(pc)
+            if instruction is None:
+                instruction = self.decode(pc)
+            opcode, m1, m2, m3, v1, v2, v3, next_pc = instruction
+
+            if opcode in (IntCode.OP_IN, IntCode.OP_OUT, IntCode.OP_HALT):
+                return pc, rb, count
+            count += 1
+
+            x = v1 if m1 == 1 else memory[v1 if m1 == 0 else rb + v1]
+            if opcode in IntCode.ARITHMETIC:
+                y = v2 if m2 == 1 else memory[v2 if m2 == 0 else rb + v2]
+                self.write(rb + v3 if m3 == 2 else v3, IntCode.ARITHMETIC[opcode](x, y))
+            elif opcode in IntCode.JUMPS:
+                if IntCode.JUMPS[opcode](x):
+                    next_pc = v2 if m2 == 1 else memory[v2 if m2 == 0 else rb + v2]
+                return next_pc, rb, count
+            elif opcode == IntCode.OP_RELBASE:
+                rb += x
+            pc = next_pc
+
+    def _run_compiled(self, expect_outputs, input_break):
+        """
+        Runs the program with the "compiled" engine. Compiled blocks
+        run until they jump (or right before an input, output, or
+        halt instruction), and those instructions are run here.
+        """
+        memory = self.memory
+        pages = memory.pages
+        owned = memory.owned
+        inputs = self.inputs
+        outputs = self.outputs
+        blocks = self._blocks
+        block_runs = self._block_runs
+        code = self._code
+        invalidate = self.__invalidate
+        pc = self.pc
+        rb = self.relative_base
+        count = 0
+
+        while True:
+            block = blocks.get(pc)
+            if block is None:
+                runs = block_runs.get(pc, 0) + 1
+                if runs < IntCode.COMPILE_THRESHOLD:
+                    # Not hot enough to compile yet
+                    block_runs[pc] = runs
+                    pc, rb, n = self.__run_block(pc, rb)
+                    if n > 0:
+                        count += n
+                        continue
+                else:
+                    block = self.compile_block(pc)
+
+            if block:
+                pc, rb, n = block(memory, pages, owned, code, invalidate, rb)
+                count += n
+                continue
+
+            # Input, output, or halt
+            self.pc = pc
+            self.relative_base = rb
+            self.instructions += count
+            count = 0
+
+            instruction = self._decoded.get(pc)
+            if instruction is None:
+                instruction = self.decode(pc)
+            opcode, m1, _, _, v1, _, _, next_pc = instruction
+
+            if opcode == IntCode.OP_IN:
+                if len(inputs) == 0:
+                    self.last_break = IntCode.BREAK_INPUT_REQUIRED
+                    return IntCode.BREAK_INPUT_REQUIRED
+                self.write(rb + v1 if m1 == 2 else v1, inputs.popleft())
+                self.pc = pc = next_pc
+                self.instructions += 1
+                if input_break == IntCode.INPUT_BREAK_EACH or \
+                   (input_break == IntCode.INPUT_BREAK_DRAINED and len(inputs) == 0):
+                    self.last_break = IntCode.BREAK_INPUT_DONE
+                    return IntCode.BREAK_INPUT_DONE
+            elif opcode == IntCode.OP_OUT:
+                outputs.append(v1 if m1 == 1 else memory[v1 if m1 == 0 else rb + v1])
+                self.pc = pc = next_pc
+                self.instructions += 1
+                if expect_outputs is not None:
+                    expect_outputs -= 1
+                    if expect_outputs == 0:
+                        self.last_break = IntCode.BREAK_OUTPUT_AVAILABLE
+                        return IntCode.BREAK_OUTPUT_AVAILABLE
+            else:
+                self.instructions += 1
+                self.last_break = IntCode.HALT
+                return IntCode.HALT
+
     def run_interactive(self, ascii=False):
         rv = None
 
@@ -253,7 +922,7 @@ class IntCode:
 
     def output(self):
         if len(self.outputs) > 0:
-            return self.outputs.pop()
+            return self.outputs.popleft()
         else:
             rv = self.run(expect_outputs=1)
             if rv != IntCode.BREAK_OUTPUT_AVAILABLE:
@@ -261,7 +930,22 @@ class IntCode:
             return self.get_output()
 
     def set_input(self, input):
-        self._input = input
+        self.inputs.append(input)
+
+    def feed(self, values):
+        """
+        Adds several values to the input queue
+        """
+        self.inputs.extend(values)
+
+    def drain(self):
+        """
+        Removes all the values in the output queue,
+        and returns them as a list
+        """
+        values = list(self.outputs)
+        self.outputs.clear()
+        return values
 
     def input(self, input):
         self.set_input(input)
@@ -269,17 +953,429 @@ class IntCode:
         if rv != IntCode.BREAK_INPUT_DONE:
             raise IntCodeException("Requested an input but the program did not read it")
 
-    def input_string(self, s, add_newline=False, echo=True):
+    def input_string(self, s, add_newline=False, echo=False):
+        """
+        Inputs a string (as ASCII codes), and runs the program
+        until it has read all of it (or it stops for some other
+        reason). If echo is True, the string is also printed.
+        """
         if add_newline:
             s = s + chr(10)
-        for x in s:
-            if echo:
-                print(x, end='')
-            self.set_input(ord(x))
-            rv = self.run()
-            if rv != IntCode.BREAK_INPUT_DONE:
+        if echo:
+            print(s, end='')
+        self.outputs.clear()
+        self.feed(map(ord, s))
+        return self._run(None, IntCode.INPUT_BREAK_DRAINED)
+
+
+class Channel:
+    """
+    Connects the outputs of a machine in a Network to the inputs
+    of other machines. The outputs are grouped into messages of
+    a fixed number of values (e.g., one value for a chain of
+    amplifiers, or three values for (address, X, Y) packets),
+    and each message is sent wherever the route function says.
+    """
+
+    def __init__(self, route, arity=1):
+        """
+        route is a function that takes a message (a tuple of arity
+        values), and returns the name of the machine to send it to,
+        and the values to input to that machine.
+        """
+        self.route = route
+        self.arity = arity
+
+        # Outputs that don't make up a full message yet
+        self.pending = []
+
+    def send(self, values):
+        """
+        Takes the outputs of the machine, and returns a list of
+        (destination, values) tuples for every full message.
+        """
+        self.pending.extend(values)
+        n = len(self.pending) - len(self.pending) % self.arity
+        messages = []
+        for i in range(0, n, self.arity):
+            messages.append(self.route(tuple(self.pending[i:i+self.arity])))
+        del self.pending[:n]
+        return messages
+
+
+class Network:
+    """
+    A network of IntCode machines, run cooperatively (in
+    round-robin order) by a simple scheduler.
+
+    In each round, every machine that hasn't halted runs until it
+    needs an input that isn't there (reading all the inputs queued
+    for it), and then its outputs are routed to other machines
+    through its channel. Messages sent to a destination that isn't
+    in the network are added to the outbox.
+    """
+
+    # Reasons why run() stops
+    HALTED = "halted"
+    IDLE = "idle"
+
+    def __init__(self, idle_input=None):
+        """
+        If idle_input is not None, machines that need an input
+        and have none queued get that value instead (e.g., -1
+        in a network of machines that poll for packets)
+        """
+        self.machines = {}
+        self.channels = {}
+        self.idle_input = idle_input
+        self.outbox = deque()
+        self.rounds = 0
+
+    def add(self, name, vm, channel=None):
+        """
+        Adds a machine to the network (optionally, with the
+        channel for its outputs)
+        """
+        self.machines[name] = vm
+        if channel is not None:
+            self.channels[name] = channel
+
+    def connect(self, src, dst):
+        """
+        Sends every output of machine src to machine dst
+        """
+        self.channels[src] = Channel(lambda message: (dst, message))
+
+    def send(self, dst, values):
+        """
+        Sends values to a machine (or to the outbox, if
+        there is no such machine in the network)
+        """
+        if dst in self.machines:
+            self.machines[dst].feed(values)
+        else:
+            self.outbox.append((dst, tuple(values)))
+
+    def step(self):
+        """
+        Runs one round of the network. Returns True if any
+        machine read an input or produced an output.
+        """
+        progress = False
+        for name, vm in self.machines.items():
+            if vm.last_break == IntCode.HALT:
+                continue
+
+            if len(vm.inputs) > 0:
+                progress = True
+            elif self.idle_input is not None:
+                vm.set_input(self.idle_input)
+
+            vm.run_until(IntCode.UNTIL_BLOCKED)
+            outputs = vm.drain()
+            if len(outputs) == 0:
+                continue
+
+            progress = True
+            channel = self.channels.get(name)
+            if channel is None:
+                self.outbox.append((name, tuple(outputs)))
+            else:
+                for dst, values in channel.send(outputs):
+                    self.send(dst, values)
+
+        self.rounds += 1
+        return progress
+
+    def run(self, max_rounds=None):
+        """
+        Runs the network until every machine has halted (returns
+        HALTED), or until a whole round goes by without any machine
+        reading an input or producing an output, which means the
+        network is idle or deadlocked (returns IDLE). Returns None
+        if we reach max_rounds first.
+        """
+        rounds = 0
+        while max_rounds is None or rounds < max_rounds:
+            if all(vm.last_break == IntCode.HALT for vm in self.machines.values()):
+                return Network.HALTED
+            if not self.step():
+                return Network.IDLE
+            rounds += 1
+        return None
+
+    @property
+    def instructions(self):
+        """
+        Number of instructions executed by each machine
+        """
+        return {name: vm.instructions for name, vm in self.machines.items()}
+
+
+def amplifier_loop(prog, phases, engine="decoded"):
+    """
+    Runs a chain of amplifiers in a feedback loop (as in Day 7),
+    and returns the last signal sent to the first amplifier
+    (along with the network, so we can look at its statistics)
+    """
+    net = Network()
+    for i, phase in enumerate(phases):
+        vm = IntCode(prog, engine)
+        vm.set_input(phase)
+        net.add(i, vm)
+        net.connect(i, (i + 1) % len(phases))
+    net.send(0, [0])
+
+    net.run()
+
+    return net.machines[0].inputs[-1], net
+
+
+###############################################################################
+# 
+#  DIFFERENTIAL TESTING
+# 
+###############################################################################
+
+def compare_engines(prog, inputs=(), engines=("decoded", "compiled"), max_breaks=100_000):
+    """
+    Runs a program with several engines in lockstep (one break at
+    a time), feeding them the same inputs, and checks that the
+    state of every machine (the reason for the break, outputs, program
+    counter, relative base, instruction count, and memory) is the same
+    after every break. Raises an IntCodeException if they differ.
+
+    Returns the outputs produced by the program.
+    """
+    vms = [IntCode(prog, engine) for engine in engines]
+    inputs = deque(inputs)
+    all_outputs = []
+
+    for _ in range(max_breaks):
+        rvs = [vm.run() for vm in vms]
+
+        reference = vms[0]
+        for vm, rv in zip(vms[1:], rvs[1:]):
+            for what, expected, actual in [("break", rvs[0], rv),
+                                           ("outputs", list(reference.outputs), list(vm.outputs)),
+                                           ("pc", reference.pc, vm.pc),
+                                           ("relative base", reference.relative_base, vm.relative_base),
+                                           ("instructions", reference.instructions, vm.instructions),
+                                           ("memory", True, reference.memory == vm.memory)]:
+                if expected != actual:
+                    raise IntCodeException(f"Engine {vm.engine} differs from {reference.engine} "
+                                           f"in {what} after {reference.instructions} instructions: "
+                                           f"{expected} != {actual}")
+
+        all_outputs.extend(reference.outputs)
+
+        if rvs[0] == IntCode.HALT:
+            break
+        elif rvs[0] == IntCode.BREAK_INPUT_REQUIRED:
+            if len(inputs) == 0:
                 break
+            value = inputs.popleft()
+            for vm in vms:
+                vm.set_input(value)
 
-        return rv
+    return all_outputs
+
+
+def differential_test(engines=IntCode.ENGINES):
+    """
+    Compares the engines on a few example programs, and on the
+    IntCode programs in the puzzle inputs (if they are available)
+    """
+    programs = [("Day 5 example (input 7)", DAY05_EXAMPLE, [7]),
+                ("Day 5 example (input 8)", DAY05_EXAMPLE, [8]),
+                ("Day 5 example (input 9)", DAY05_EXAMPLE, [9]),
+                ("Day 7 amplifier", AMPLIFIER_EXAMPLE, [9, 0] + list(range(100))),
+                ("Day 9 quine", QUINE, []),
+                ("Self-modifying counter", SELF_MODIFYING, []),
+                ("Scratch memory", SCRATCH_MEMORY, []),
+                ("Countdown loop", countdown_program(1000), []),
+                ("Arithmetic loop", arithmetic_loop_program(1000), []),
+                ("Day 2-style program", gravity_assist_program(), [])]
+
+    inputs = {"02": [[]],
+              "05": [[1], [5]],
+              "07": [[phase, 0] for phase in range(10)],
+              "09": [[1], [2]]}
+
+    for day, day_inputs in inputs.items():
+        try:
+            with open(f"input/{day}.in") as f:
+                prog = [int(x) for x in f.read().strip().split(",")]
+        except FileNotFoundError:
+            continue
+        for i, prog_inputs in enumerate(day_inputs):
+            programs.append((f"Day {day} input (run {i+1})", prog, prog_inputs))
+
+    for name, prog, prog_inputs in programs:
+        outputs = compare_engines(prog, prog_inputs, engines)
+        print(f"{name}: OK ({len(outputs)} outputs)")
+
+
+###############################################################################
+# 
+#  BENCHMARK
+# 
+###############################################################################
+
+# Larger example from Day 5: outputs 999 if the input is below 8,
+# 1000 if it is equal to 8, and 1001 if it is greater than 8
+DAY05_EXAMPLE = [3,21,1008,21,8,20,1005,20,22,107,8,21,20,1006,20,31,
+                 1106,0,36,98,0,0,1002,21,125,20,4,20,1105,1,46,104,
+                 999,1105,1,46,1101,1000,1,20,4,20,1105,1,46,98,99]
+
+# Example from Day 7: amplifier program for a feedback loop (with
+# phases 9,8,7,6,5, the final signal is 139629729)
+AMPLIFIER_EXAMPLE = [3,26,1001,26,-4,26,3,27,1002,27,2,27,1,27,26,
+                     27,4,27,1001,28,-1,28,1005,28,6,99,0,0,5]
+
+# Example from Day 9: outputs a copy of itself
+QUINE = [109,1,204,-1,1001,100,1,100,1008,100,16,101,1006,101,0,99]
+
+# Counter that increments itself by modifying its own add instruction
+# (it counts 1, 3, 6, 10, 15, and outputs 15)
+SELF_MODIFYING = [1101,0,0,23, 1001,23,1,23, 1001,6,1,6,
+                  1007,23,12,24, 1005,24,4, 4,23, 99, 0, 0, 0]
+
+# Reads and writes memory far past the end of the program (directly,
+# and relative to the relative base), which hasn't been allocated
+# (it outputs 0, 0, 7, 7, 0)
+SCRATCH_MEMORY = [4,1000, 109,2000, 204,0, 1001,5000,7,5000, 4,5000,
+                  21101,3,4,10, 204,10, 1205,3500,0, 1,6000,7000,8000,
+                  4,8000, 99]
+
+
+def countdown_program(n):
+    """
+    Returns a program that counts down from n to zero
+    (in a loop), and then outputs zero
+    """
+    return [109, 100,           # rb = 100
+            21101, 0, n, 0,     # [rb] = 0 + n
+            21201, 0, -1, 0,    # [rb] = [rb] - 1
+            1205, 0, 6,         # if [rb] != 0: goto 6
+            204, 0,             # output [rb]
+            99]
+
+
+def arithmetic_loop_program(n):
+    """
+    Returns a program with a longer loop (a few arithmetic
+    operations per iteration) that runs n times, and then
+    outputs a checksum
+    """
+    return [109, 100,           # rb = 100
+            21101, 0, n, 0,     # [rb] = 0 + n
+            22201, 1, 0, 1,     # [rb+1] = [rb+1] + [rb]
+            21202, 1, 3, 2,     # [rb+2] = [rb+1] * 3
+            21207, 2, 1000, 3,  # [rb+3] = [rb+2] < 1000
+            22201, 1, 3, 1,     # [rb+1] = [rb+1] + [rb+3]
+            21201, 4, 1, 4,     # [rb+4] = [rb+4] + 1
+            22208, 2, 4, 5,     # [rb+5] = [rb+2] == [rb+4]
+            21201, 0, -1, 0,    # [rb] = [rb] - 1
+            1205, 0, 6,         # if [rb] != 0: goto 6
+            204, 1,             # output [rb+1]
+            99]
+
+
+def gravity_assist_program(length=50, seed=2019):
+    """
+    Returns a Day 2-style program: the noun and verb (at addresses
+    1 and 2) are the addresses of the first two values to add, and
+    then a chain of additions and multiplications computes the
+    value at address 0.
+    """
+    rng = random.Random(seed)
+    prog = [1, 0, 0, 3]
+    for _ in range(length):
+        prog += [rng.choice((1, 2)), 3, 0, 3]
+    prog += [1, 3, 0, 0, 99]
+    const_start = len(prog)
+    prog += [rng.randint(1, 5) for _ in range(100)]
+
+    # Each instruction in the chain uses a different constant
+    for i in range(length):
+        prog[4 + 4*i + 2] = const_start + i
+    prog[4 + 4*length + 2] = const_start + length
+
+    return prog
+
+
+def benchmark(engines=IntCode.ENGINES):
+    """
+    Runs a few programs with each engine, and prints the
+    number of instructions per second.
+    """
+    def sweep(prog, engine):
+        # Day 2: try every noun and verb
+        instructions = 0
+        for noun in range(100):
+            for verb in range(100):
+                vm = IntCode(prog, engine)
+                vm.memory[1] = noun
+                vm.memory[2] = verb
+                vm.run()
+                instructions += vm.instructions
+        return instructions
+
+    def diagnostics(prog, engine):
+        # Day 5: run the comparison program with many inputs
+        instructions = 0
+        for i in range(2000):
+            vm = IntCode(prog, engine)
+            vm.input(i % 16)
+            vm.output()
+            instructions += vm.instructions
+        return instructions
+
+    def loop(prog, engine):
+        vm = IntCode(prog, engine)
+        vm.run()
+        return vm.instructions
+
+    def clones(prog, engine):
+        # Search-style cloning (as when exploring a maze): clone
+        # the machine at every step, and run each clone a bit
+        vm = IntCode(prog + [0] * 4000, engine)
+        vm.run()
+        instructions = 0
+        for i in range(20000):
+            clone = vm.clone()
+            clone.run()
+            instructions += clone.instructions - vm.instructions
+        return instructions
+
+    def amplifiers(prog, engine):
+        # Day 7: try every permutation of phases in a feedback loop
+        instructions = 0
+        for phases in itertools.permutations(range(5, 10)):
+            _, net = amplifier_loop(prog, phases, engine)
+            instructions += sum(net.instructions.values())
+        return instructions
+
+    benchmarks = [("Day 2 noun/verb sweep", sweep, gravity_assist_program()),
+                  ("Day 5 diagnostics", diagnostics, DAY05_EXAMPLE),
+                  ("Countdown loop", loop, countdown_program(500_000)),
+                  ("Arithmetic loop", loop, arithmetic_loop_program(100_000)),
+                  ("Cloning", clones, QUINE),
+                  ("Day 7 amplifier network", amplifiers, AMPLIFIER_EXAMPLE)]
+
+    for name, fn, prog in benchmarks:
+        print(name)
+        for engine in engines:
+            start = time.perf_counter()
+            instructions = fn(prog, engine)
+            elapsed = time.perf_counter() - start
+            print(f"  {engine:12} {instructions:10} instructions "
+                  f"in {elapsed:.3f}s ({instructions/elapsed:,.0f} instructions/s)")
 
 
+if __name__ == "__main__":
+    if "--compare" in sys.argv:
+        differential_test()
+    else:
+        benchmark()
@@ -0,0 +1 @@
+from aoc.algorithms import *
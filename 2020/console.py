@@ -3,6 +3,8 @@ This module provides a Console class for running console programs
 (so far, only on day 8)
 """
 
+from collections import deque
+
 from util import read_strs
 
 class ConsoleException(Exception):
@@ -35,7 +37,10 @@ class Console:
         self.prog = self.orig_prog[:]
         self.pc = 0
         self.acc = 0
-        self.pc_set = set()
+
+        # Number of times each instruction has been run
+        # (run() uses it to detect infinite loops)
+        self.profile = [0] * len(self.prog)
 
 
     def clone(self):
@@ -47,13 +52,17 @@ class Console:
         return new_vm
 
 
-    def run(self, expect_outputs = 1):
-
+    def run(self, expect_outputs = 1, max_runs = 1):
+        """
+        Runs the program until it terminates, or until an instruction
+        is about to run more than max_runs times (by default, as soon
+        as we run into an infinite loop)
+        """
         while True:
-            if self.pc in self.pc_set:
+            if self.profile[self.pc] >= max_runs:
                 break
             
-            self.pc_set.add(self.pc)
+            self.profile[self.pc] += 1
             op, param = self.prog[self.pc]
             next_pc = self.pc + 1
 
@@ -73,3 +82,98 @@ class Console:
     def normal_termination(self):
         return self.pc == len(self.prog)
 
+
+    def flip(self, i):
+        """
+        Switches instruction i from nop to jmp (or from jmp to nop)
+        """
+        op, param = self.prog[i]
+        if op == Console.OP_NOP:
+            self.prog[i] = (Console.OP_JMP, param)
+        elif op == Console.OP_JMP:
+            self.prog[i] = (Console.OP_NOP, param)
+        else:
+            raise ConsoleException(f"Instruction {i} is not a nop or jmp")
+
+
+    def next_pc(self, i, op=None):
+        """
+        Returns the instruction that runs after instruction i
+        (optionally, as if instruction i had the given operation)
+        """
+        prog_op, param = self.prog[i]
+        if op is None:
+            op = prog_op
+        if op == Console.OP_JMP:
+            return i + param
+        else:
+            return i + 1
+
+
+    def control_flow_graph(self):
+        """
+        Returns the control-flow graph of the program, as a list
+        with the predecessors of every instruction (including the
+        "instruction" right after the end of the program, which
+        is where the program terminates)
+        """
+        preds = [[] for _ in range(len(self.prog) + 1)]
+        for i in range(len(self.prog)):
+            target = self.next_pc(i)
+            if 0 <= target <= len(self.prog):
+                preds[target].append(i)
+        return preds
+
+
+    def terminating_instructions(self):
+        """
+        Returns the set of instructions from which the program
+        terminates normally (by walking the control-flow graph
+        backwards from the end of the program)
+        """
+        preds = self.control_flow_graph()
+        end = len(self.prog)
+
+        terminating = {end}
+        queue = deque([end])
+        while len(queue) > 0:
+            i = queue.popleft()
+            for p in preds[i]:
+                if p not in terminating:
+                    terminating.add(p)
+                    queue.append(p)
+
+        return terminating
+
+
+    def find_terminating_patch(self):
+        """
+        Finds the one nop or jmp instruction that we need to
+        flip so the program terminates normally.
+
+        If the program doesn't terminate, every instruction it runs
+        leads to the infinite loop. So, we only need to follow the
+        program from the start, and find an instruction that, when
+        flipped, takes us to an instruction that can reach
+        the end of the program.
+
+        Returns the index of the instruction to flip (or None if the
+        program already terminates, or there is no such instruction)
+        """
+        terminating = self.terminating_instructions()
+        if 0 in terminating:
+            return None
+
+        i = 0
+        visited = set()
+        while i not in visited and 0 <= i < len(self.prog):
+            visited.add(i)
+            op, _ = self.prog[i]
+            if op == Console.OP_NOP and self.next_pc(i, Console.OP_JMP) in terminating:
+                return i
+            elif op == Console.OP_JMP and self.next_pc(i, Console.OP_NOP) in terminating:
+                return i
+            i = self.next_pc(i)
+
+        return None
+
@@ -9,6 +9,12 @@ woooooo, my favorite part of Advent of Code: simulating computer architectures!
 
 My original solution was a very rote implementation of the instruction
 processing, but I then wrote a proper Console class in console.py
+
+Update: Part 2 originally tried flipping every nop/jmp and re-running
+the whole program each time. The Console class can now analyze the
+control-flow graph of the program to find out which instructions can
+reach the end of the program, which tells us exactly which
+instruction to flip (see Console.find_terminating_patch)
 """
 
 import util
@@ -28,25 +34,21 @@ def task1(console):
 
 
 def task2(console):
-    # We iterate through the instructions and, if we
-    # encounter a nop or jmp, we switch the instruction
-    # and try running the program
-    for i, (op, param) in enumerate(console.prog):
-        if op in ("nop", "jmp"):
-            # Reset console back to original state and program
-            # (undoing any previous changes to program)
-            console.reset()
-
-            # Replace instruction
-            if op == "nop":
-                console.prog[i] = ("jmp", param)
-            elif op == "jmp":
-                console.prog[i] = ("nop", param)
-
-            # Run console and check for normal termination
-            console.run()
-            if console.normal_termination():
-                return console.acc                
+    # Find the instruction we need to flip, and then run the fixed
+    # program (if there's nothing to flip, the program either already
+    # terminates, or there is no way to fix it with a single flip)
+    i = console.find_terminating_patch()
+
+    console.reset()
+    if i is not None:
+        console.flip(i)
+    console.run()
+    if not console.normal_termination():
+        return None
+
+    log("Instructions run:", console.profile)
+
+    return console.acc
     
 
 if __name__ == "__main__":
@@ -11,6 +11,12 @@ that saved me a lot of time.
 
 The second star uses brute force, with some very minor optimizations,
 but I'm pretty sure there's a more DP-ish solution for this.
+
+Update: Both parts are just a cellular automaton, so they now use
+the Grid's vectorized cellular automaton support, which updates the
+whole grid at once (instead of one seat at a time). For Part 2,
+the seats visible from each seat are found once, up front, instead
+of walking the line of sight in every generation.
 """
 
 import util
@@ -18,106 +24,53 @@ import math
 import sys
 import re
 
+import numpy as np
+
 from util import log
+from grid import Grid
 
-DIRECTIONS = [(-1, -1), (0, -1), (+1,-1),
-              (-1,  0),          (+1, 0),
-              (-1, +1), (0, +1), (+1,+1)]
 
-def find_occupied(grid, x, y, direction, immediate_only):
+def seat_rule(threshold):
     """
-    Checks if you can see an occupied seat from position x, y
-    looking in the given direction (specifying an x, y offset)
-    If immediate_only is true, we only look at seats immediately
-    adjacent to x, y
+    Returns an automaton rule (see Grid.step_automaton) that
+    updates all the seats at once, given the number of
+    occupied seats around each seat.
     """
-    dx, dy = direction
-    xx = x + dx
-    yy = y + dy
-
-    while 0 <= xx < grid.max_x and 0 <= yy < grid.max_y:
-        v = grid.get(xx, yy)
-
-        if v == "L":
-            return 0
-        elif v == "#":
-            return 1
-        elif v == "." and immediate_only:
-            return 0
-
-        xx = xx + dx
-        yy = yy + dy
+    def rule(seats, occupied):
+        new_seats = seats.copy()
+        new_seats[(seats == "L") & (occupied == 0)] = "#"
+        new_seats[(seats == "#") & (occupied >= threshold)] = "L"
+        return new_seats
 
-    return 0
+    return rule
 
 
-def get_new_value(grid, x, y, immediate_only, threshold):
+def find_stable_state(grid, immediate_only, threshold):
     """
-    Update the seat according to the rules given in the problem.
+    Find the number of occupied seats in the stable state.
     If immediate_only is True, we only look at seats immediately
-    adjacent to x, y (otherwise, we use line of sight). threshold
-    specifies the minimum number of occupied seat to flip an
-    occupied seat to an empty seat.
+    adjacent to each seat (otherwise, we use line of sight).
+    threshold specifies the minimum number of occupied seats
+    to flip an occupied seat to an empty seat.
     """
-    cur_value = grid.get(x, y)
-
-    if cur_value == ".":
-        return "."
+    grid = grid.copy()
 
-    occupied = 0
-    for dir in DIRECTIONS:
-        occupied += find_occupied(grid, x, y, dir, immediate_only)
-        if cur_value == "L" and occupied >= 1:
-            return "L"
-        elif cur_value == "#" and occupied >= threshold:
-            return "L"
-
-    if cur_value == "L" and occupied == 0:
-        return "#"
+    if immediate_only:
+        grid.run_until_stable(seat_rule(threshold), "#", Grid.DIRECTIONS)
     else:
-        return cur_value
+        # The seats visible from each seat never change,
+        # so we only need to find them once.
+        visible = grid.visible_neighbors(".")
+        grid.run_until_stable(seat_rule(threshold), "#", neighbors=visible)
 
+    return int(np.count_nonzero(grid.to_array() == "#"))
 
-def update_grid(grid, immediate_only, threshold):
-    """
-    Update the entire grid. See 'get_new_value' for meaning
-    of immediate_only and threshold.
-    """
-    new_grid = util.Grid.empty(grid.max_x, grid.max_y)
-    changes = 0
-    for x in range(grid.max_x):
-        for y in range(grid.max_y):
-            old_value = grid.get(x, y)
-            new_value = get_new_value(grid, x, y, immediate_only, threshold)
-            new_grid.set(x, y, new_value)
-
-            if old_value != new_value:
-                changes += 1
-
-    return new_grid, changes
-
-
-def find_stable_state(grid, immediate_only, threshold):
-    """
-    Find the number of occupied seats in the stable state.
-    """
-    while True:
-        grid, changes = update_grid(grid, immediate_only, threshold)
-
-        if changes == 0:
-            occupied = 0
-            for x in range(grid.max_x):
-                for y in range(grid.max_y):
-                    if grid.get(x, y) == "#":
-                        occupied += 1
-            return occupied
-        
 
 if __name__ == "__main__":
     util.set_debug(False)
 
-    sample = util.Grid.from_file("input/sample/11.in")
-    grid = util.Grid.from_file("input/11.in")
+    sample = Grid.from_file("input/sample/11.in", storage="bytes")
+    grid = Grid.from_file("input/11.in", storage="bytes")
 
     print("TASK 1")
     util.call_and_print(find_stable_state, sample, True, 4)
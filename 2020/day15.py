@@ -19,12 +19,21 @@ along, only needing a dictionary storing the last turn for
 each number). I'm still keeping my original solution since that's
 the one I wrote, but kudos to @ajwells256 for pointing out the
 more efficient one.
+
+UPDATE 2: memory_game_array implements that more efficient solution,
+storing the last turn for each number in a preallocated array (instead
+of a dictionary) and not keeping any other history, which keeps the
+second part at 120MB (the tasks now use it). spoken_numbers
+produces the same sequence lazily, for as long as we want. Running the file
+with --benchmark compares both solutions at 30M turns, and the array one
+at 300M turns.
 """
 
 import util
 import math
 import sys
 import re
+from array import array
 
 from util import log
 
@@ -63,28 +72,100 @@ def memory_game(numbers, target):
     return turns[target]
 
 
+def memory_game_array(numbers, target):
+    """
+    Same as memory_game, but only keeping track of the last turn
+    in which each number was said. Since a number can never be
+    larger than the number of turns, we can store those turns in
+    an array indexed by number (where 0 means "never said").
+    """
+    if target <= len(numbers):
+        return numbers[target-1]
+
+    last_turn = array("I", [0]) * max(target, max(numbers) + 1)
+    for turn, n in enumerate(numbers[:-1], start=1):
+        last_turn[n] = turn
+
+    # The number said in the previous turn (which we don't store
+    # in last_turn until we've worked out the next number)
+    number = numbers[-1]
+    for turn in range(len(numbers), target):
+        prev_turn = last_turn[number]
+        last_turn[number] = turn
+        number = turn - prev_turn if prev_turn else 0
+
+    return number
+
+
+def spoken_numbers(numbers, limit=None):
+    """
+    Generate the numbers said in the game (forever, if no limit
+    is given), growing the array of last turns as needed.
+    """
+    capacity = max(len(numbers), max(numbers) + 1, 1024)
+    last_turn = array("I", [0]) * capacity
+    number = None
+
+    for turn in range(1, len(numbers) + 1):
+        if limit is not None and turn > limit:
+            return
+        if number is not None:
+            last_turn[number] = turn - 1
+        number = numbers[turn-1]
+        yield number
+
+    turn = len(numbers) + 1
+    while limit is None or turn <= limit:
+        if turn >= capacity:
+            last_turn.extend(array("I", [0]) * capacity)
+            capacity *= 2
+
+        prev_turn = last_turn[number]
+        last_turn[number] = turn - 1
+        number = turn - 1 - prev_turn if prev_turn else 0
+        yield number
+        turn += 1
+
+
+def benchmark(numbers, targets):
+    """
+    Compare the time (and memory) needed by both solutions
+    """
+    for target in targets:
+        print(f"{target:,} turns (array of last turns: {4 * target / 2**20:.0f}MB)")
+        expected = util.call_and_time(memory_game_array, numbers, target)
+        if target <= 30_000_000:
+            assert util.call_and_time(memory_game, numbers, target) == expected
+        print()
+
+
 if __name__ == "__main__":
     util.set_debug(False)
 
     sample = util.read_ints("input/sample/15.in", sep=",")
+
+    if "--benchmark" in sys.argv:
+        benchmark(sample, [30_000_000, 300_000_000])
+        sys.exit(0)
+
     numbers = util.read_ints("input/15.in", sep=",")
 
     print("TASK 1")
-    util.call_and_print(memory_game, sample, 2020)
-    util.call_and_print(memory_game, [1,3,2], 2020)
-    util.call_and_print(memory_game, [2,1,3], 2020)
-    util.call_and_print(memory_game, [1,2,3], 2020)
-    util.call_and_print(memory_game, [2,3,1], 2020)
-    util.call_and_print(memory_game, [3,2,1], 2020)
-    util.call_and_print(memory_game, [3,1,2], 2020)
-    util.call_and_print(memory_game, numbers, 2020)
+    util.call_and_print(memory_game_array, sample, 2020)
+    util.call_and_print(memory_game_array, [1,3,2], 2020)
+    util.call_and_print(memory_game_array, [2,1,3], 2020)
+    util.call_and_print(memory_game_array, [1,2,3], 2020)
+    util.call_and_print(memory_game_array, [2,3,1], 2020)
+    util.call_and_print(memory_game_array, [3,2,1], 2020)
+    util.call_and_print(memory_game_array, [3,1,2], 2020)
+    util.call_and_print(memory_game_array, numbers, 2020)
 
     print("\nTASK 2")
-    util.call_and_print(memory_game, sample, 30000000)
-    util.call_and_print(memory_game, [1,3,2], 30000000)
-    util.call_and_print(memory_game, [2,1,3], 30000000)
-    util.call_and_print(memory_game, [1,2,3], 30000000)
-    util.call_and_print(memory_game, [2,3,1], 30000000)
-    util.call_and_print(memory_game, [3,2,1], 30000000)
-    util.call_and_print(memory_game, [3,1,2], 30000000)
-    util.call_and_print(memory_game, numbers, 30000000)
+    util.call_and_print(memory_game_array, sample, 30000000)
+    util.call_and_print(memory_game_array, [1,3,2], 30000000)
+    util.call_and_print(memory_game_array, [2,1,3], 30000000)
+    util.call_and_print(memory_game_array, [1,2,3], 30000000)
+    util.call_and_print(memory_game_array, [2,3,1], 30000000)
+    util.call_and_print(memory_game_array, [3,2,1], 30000000)
+    util.call_and_print(memory_game_array, [3,1,2], 30000000)
+    util.call_and_print(memory_game_array, numbers, 30000000)
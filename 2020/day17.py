@@ -10,12 +10,25 @@ data structure, when a dictionary mapping tuples to values (with some
 range checking) was all I needed. An OO approach worked out well for
 this program because it ensured I could abstract away most of the
 messiness of dealing with infnite 3d/4d space.
+
+Update: ConwayCube ends up storing (and checking) every cell in an
+ever-growing box, even though most of them are inactive. SparseConway
+only stores the active cells (in any number of dimensions), and finds
+the cells that could become active by having each active cell add
+itself to the neighbor count of its neighbors. Since all the cubes start
+at z=0 (and w=0, etc.), the space is also symmetric around zero in
+every dimension after the first two, so we only need to keep track
+of the cells where those coordinates are non-negative. Running the
+file with --benchmark compares both versions.
 """
 
 import util
+import itertools
 import math
+import operator
 import sys
 import re
+from collections import Counter
 
 from util import log
 
@@ -208,7 +221,99 @@ class ConwayCube:
         return n_active
 
 
-def task1(input):
+class SparseConway:
+    """
+    Class for Conway Cubes in any number of dimensions (two or more),
+    storing only the coordinates of the active cells in a set.
+
+    If symmetric is True, we only store the active cells where
+    every coordinate after the first two is non-negative (each of
+    them stands for all its mirror images across those dimensions)
+    """
+
+    def __init__(self, grid, dims=3, symmetric=True):
+        assert dims >= 2
+        self.dims = dims
+        self.symmetric = symmetric
+        self.active = {(x, y) + (0,) * (dims - 2)
+                       for y, row in enumerate(grid)
+                       for x, char in enumerate(row) if char == "#"}
+        self.offsets = [d for d in itertools.product((-1, 0, 1), repeat=dims) if any(d)]
+
+
+    def __neighbors(self, cell):
+        """
+        Produce all the neighbors of a cell
+        """
+        for offset in self.offsets:
+            yield tuple(map(operator.add, cell, offset))
+
+
+    def __mirrored_neighbors(self, cell):
+        """
+        Produce all the stored cells that are neighbors of a cell or
+        of its mirror images (once for each one of them)
+        """
+        options = []
+        for i, v in enumerate(cell):
+            # (coordinate, whether it's the cell's own coordinate)
+            dim_options = [(v - 1, False), (v, True), (v + 1, False)]
+            if i >= 2:
+                dim_options = [(c, own) for c, own in dim_options if c >= 0]
+                if v == 1:
+                    # The mirror image at -1 is also a neighbor of 0
+                    dim_options.append((0, False))
+            options.append(dim_options)
+
+        for combination in itertools.product(*options):
+            if not all(own for _, own in combination):
+                yield tuple(c for c, _ in combination)
+
+
+    def cycle(self):
+        """
+        Do one cycle
+        """
+        neighbors = self.__mirrored_neighbors if self.symmetric else self.__neighbors
+
+        counts = Counter()
+        for cell in self.active:
+            counts.update(neighbors(cell))
+
+        self.active = {cell for cell, n in counts.items()
+                       if n == 3 or (n == 2 and cell in self.active)}
+
+
+    def count_active(self):
+        """
+        Count the number of active cubes
+        """
+        if not self.symmetric:
+            return len(self.active)
+
+        # Each cell stands for 2^k cells, where k is the number
+        # of non-zero coordinates after the first two
+        return sum(2 ** sum(1 for v in cell[2:] if v != 0) for cell in self.active)
+
+
+def run_cycles(input, dims, n_cycles=6, symmetric=True):
+    """
+    Run a number of cycles with SparseConway, and return the
+    number of active cubes
+    """
+    cc = SparseConway(input, dims, symmetric)
+
+    for _ in range(n_cycles):
+        cc.cycle()
+
+    return cc.count_active()
+
+
+def task1(input, engine="sparse"):
+    if engine == "sparse":
+        return run_cycles(input, 3)
+
+    assert engine == "box", f"Unknown engine: {engine}"
     cc = ConwayCube()
     cc.from_grid(input)
 
@@ -218,7 +323,11 @@ def task1(input):
     return cc.count_active()
 
 
-def task2(input):
+def task2(input, engine="sparse"):
+    if engine == "sparse":
+        return run_cycles(input, 4)
+
+    assert engine == "box", f"Unknown engine: {engine}"
     cc = ConwayCube()
     cc.from_grid(input)
 
@@ -228,11 +337,34 @@ def task2(input):
     return cc.count_active()
 
 
+def benchmark(input):
+    """
+    Compare both versions (and the sparse version with and without
+    the symmetry) in 3d/4d, and the sparse version in more dimensions
+    """
+    for task in (task1, task2):
+        result = util.call_and_time(task, input, "box")
+        assert util.call_and_time(task, input, "sparse") == result
+    print()
+
+    for dims in (3, 4, 5, 6):
+        print(f"{dims}d")
+        result = util.call_and_time(run_cycles, input, dims, 6, True)
+        if dims <= 5:
+            assert util.call_and_time(run_cycles, input, dims, 6, False) == result
+        print()
+
+
 
 if __name__ == "__main__":
     util.set_debug(False)
 
     sample = util.read_strs("input/sample/17.in", sep="\n")
+
+    if "--benchmark" in sys.argv:
+        benchmark(sample)
+        sys.exit(0)
+
     grid = util.read_strs("input/17.in", sep="\n")
 
     print("TASK 1")
@@ -10,6 +10,11 @@ so you understand exactly what the problem is asking you to do. I arrived
 at a correct part 2 solution fairly quickly, and then spent a bunch of time
 tracking down a bug that stemmed from not having read the problem statement
 fully.
+
+Update: The check for game configurations we've already seen is
+now done with the general-purpose detect_cycle function (in
+aoc.algorithms), which plays one round at a time until either
+the game ends or it repeats a configuration.
 """
 
 import util
@@ -18,6 +23,7 @@ import sys
 import re
 
 from util import log
+from algorithms import detect_cycle
 
 
 def read_input(input_txt):
@@ -53,42 +59,50 @@ def play_game_r(decks, game_num=1, recursive=False):
 
     log(f"=== Game {game_num} ===")
     round = 1
-    configurations = set()
 
-    while len(decks[1]) > 0 and len(decks[2]) > 0:
+    def play_round(decks):
+        """
+        Plays one round of the game. Returns the updated decks,
+        or None if the game is over.
+        """
+        nonlocal round
+
         log(f"-- Round {round} (Game {game_num})--")
         log("Player 1's deck:", ", ".join([str(x) for x in decks[1]]))
         log("Player 2's deck:", ", ".join([str(x) for x in decks[2]]))
 
-        if hash_decks(decks) in configurations:
-            return 1, 2
-        else:
-            configurations.add(hash_decks(decks))
-
-            cards = {1: decks[1].pop(0), 2: decks[2].pop(0)}
-            log("Player 1 plays:", cards[1])
-            log("Player 2 plays:", cards[2])
-
-            if recursive and len(decks[1]) >= cards[1] and len(decks[2]) >= cards[2]:
-                log("Playing a sub-game to determine the winner...\n")
-                decks_copy = {}
-                decks_copy[1] = decks[1][:cards[1]]
-                decks_copy[2] = decks[2][:cards[2]]
-                winner, loser = play_game_r(decks_copy, game_num+1, True)
-            elif cards[1] > cards[2]:
-                winner = 1
-                loser = 2
-            elif cards[2] > cards[1]:
-                winner = 2
-                loser = 1
-            log(f"Player {winner} wins round {round} of game {game_num}!")
-
-            decks[winner].append(cards[winner])
-            decks[winner].append(cards[loser])
+        cards = {1: decks[1].pop(0), 2: decks[2].pop(0)}
+        log("Player 1 plays:", cards[1])
+        log("Player 2 plays:", cards[2])
+
+        if recursive and len(decks[1]) >= cards[1] and len(decks[2]) >= cards[2]:
+            log("Playing a sub-game to determine the winner...\n")
+            decks_copy = {}
+            decks_copy[1] = decks[1][:cards[1]]
+            decks_copy[2] = decks[2][:cards[2]]
+            winner, loser = play_game_r(decks_copy, game_num+1, True)
+        elif cards[1] > cards[2]:
+            winner = 1
+            loser = 2
+        elif cards[2] > cards[1]:
+            winner = 2
+            loser = 1
+        log(f"Player {winner} wins round {round} of game {game_num}!")
+
+        decks[winner].append(cards[winner])
+        decks[winner].append(cards[loser])
 
         round += 1
         log()
 
+        if len(decks[1]) == 0 or len(decks[2]) == 0:
+            return None
+        return decks
+
+    # If we see the same configuration twice, player 1 wins
+    if detect_cycle(hash_decks, play_round, decks) is not None:
+        return 1, 2
+
     if len(decks[1]) == 0:
         winner = 2
         loser = 1
@@ -19,12 +19,22 @@ linked list operations.
 
 Anyway, the moral of the story is that you should always use existing linked
 list implementations.
+
+Update: Turns out an even better linked list is no linked list at all:
+since the cups are labelled 1 to n, we can store the whole ring in a single
+array, where successor[label] is the label of the cup after it. CupRing
+does exactly that, so a move is just a few integer assignments (and
+a million cups only take 4MB). The original LinkedList is still used
+to double-check CupRing (run the file with --check), and running it
+with --benchmark compares both.
 """
 
 import util
 import math
+import random
 import sys
 import re
+from array import array
 
 from util import log
 
@@ -158,28 +168,153 @@ def play_game(cups, moves):
     return nodes[1]
 
 
+class CupRing:
+    """
+    A circle of cups labelled 1 to n, stored as an array where
+    successor[label] is the label of the cup that comes after
+    it (successor[0] is unused)
+    """
+
+    def __init__(self, cups, n_cups=None):
+        """
+        Constructor. Takes the labels of the first cups (which must
+        be the numbers from 1 to len(cups), in any order) and the
+        total number of cups. The remaining cups are labelled in
+        increasing order after the first ones.
+        """
+        assert sorted(cups) == list(range(1, len(cups) + 1))
+        self.n_cups = max(len(cups), n_cups or 0)
+
+        # By default, every cup is followed by the next label
+        self.successor = array("I", range(1, self.n_cups + 2))
+        for cup, next_cup in zip(cups, cups[1:]):
+            self.successor[cup] = next_cup
+
+        if self.n_cups > len(cups):
+            self.successor[cups[-1]] = len(cups) + 1
+            self.successor[self.n_cups] = cups[0]
+        else:
+            self.successor[cups[-1]] = cups[0]
+
+        self.current = cups[0]
+
+    def play(self, moves):
+        """
+        Play a number of moves of the game
+        """
+        successor = self.successor
+        n_cups = self.n_cups
+        current = self.current
+
+        for _ in range(moves):
+            a = successor[current]
+            b = successor[a]
+            c = successor[b]
+
+            destination = current - 1 or n_cups
+            while destination == a or destination == b or destination == c:
+                destination = destination - 1 or n_cups
+
+            # Move a, b, c after the destination cup
+            successor[current] = successor[c]
+            successor[c] = successor[destination]
+            successor[destination] = a
+
+            current = successor[current]
+
+        self.current = current
+
+    def labels(self, start=None):
+        """
+        Generate the labels of the cups (starting at the current
+        cup, or at the given label)
+        """
+        cup = self.current if start is None else start
+        for _ in range(self.n_cups):
+            yield cup
+            cup = self.successor[cup]
+
+    def __str__(self):
+        return " ".join(f"({cup})" if cup == self.current else str(cup)
+                        for cup in self.labels())
+
+
+def play_game_array(cups, moves, n_cups=None):
+    """
+    Same as play_game, but using a CupRing. Returns the ring.
+    """
+    ring = CupRing(cups, n_cups)
+    ring.play(moves)
+    return ring
+
+
+def check_engines(n_cups, moves, seed=2020):
+    """
+    Check that play_game and play_game_array produce the same
+    circle of cups, starting from a random order
+    """
+    cups = list(range(1, n_cups + 1))
+    random.Random(seed).shuffle(cups)
+
+    one_node = play_game(cups, moves)
+    ring = play_game_array(cups, moves)
+
+    return [int(x) for x in one_node.to_str().split()] == list(ring.labels(1))
+
+
+def benchmark():
+    """
+    Compare the time needed by both versions of the game
+    """
+    cups = [int(x) for x in "389125467"]
+
+    def linked_list_game(n_cups, moves):
+        one_node = play_game(cups + list(range(10, n_cups + 1)), moves)
+        return one_node.next.value, one_node.next.next.value
+
+    def array_game(n_cups, moves):
+        ring = play_game_array(cups, moves, n_cups)
+        return ring.successor[1], ring.successor[ring.successor[1]]
+
+    for n_cups, moves in ((1_000_000, 10_000_000), (10_000_000, 100_000_000)):
+        print(f"{n_cups:,} cups, {moves:,} moves "
+              f"(successor array: {4 * (n_cups + 1) / 2**20:.0f}MB)")
+        result = util.call_and_time(array_game, n_cups, moves)
+        if n_cups <= 1_000_000:
+            assert util.call_and_time(linked_list_game, n_cups, moves) == result
+        print()
+
+
 def task1(cups_txt, moves):
     cups = [int(x) for x in cups_txt]
 
-    one_node = play_game(cups, moves)
-    assert one_node.value == 1
+    ring = play_game_array(cups, moves)
 
-    return one_node.to_str(sep="")[1:]
+    return "".join(str(cup) for cup in ring.labels(1))[1:]
 
 
 def task2(cups_txt, moves):
     cups = [int(x) for x in cups_txt]
-    cups += list(range(max(cups)+1, 1000001))
 
-    one_node = play_game(cups, moves)
-    assert one_node.value == 1
+    ring = play_game_array(cups, moves, 1000000)
+    a = ring.successor[1]
+    b = ring.successor[a]
 
-    return one_node.next.value * one_node.next.next.value   
+    return a * b
 
 
 if __name__ == "__main__":
     util.set_debug(False)
 
+    if "--check" in sys.argv:
+        for n_cups, moves in ((9, 100), (10, 1000), (100, 10000), (1000, 100000)):
+            util.call_and_print(check_engines, n_cups, moves)
+        sys.exit(0)
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
+
     print("TASK 1")
     util.call_and_print(task1, "389125467", 10)
     util.call_and_print(task1, "389125467", 100)
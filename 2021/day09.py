@@ -13,6 +13,10 @@ handled by my Grid class.
 Other than that, a pretty straightforward application of flood filling.
 The code below is pretty similar to what I wrote to solve the problem,
 with some minor refactoring and cleaning up.
+
+Update: The flood filling is now done by the Grid class itself
+(with its label_components method), which finds all the basins
+in a single pass.
 """
 
 import util
@@ -21,6 +25,7 @@ import sys
 import re
 
 from util import log
+from grid import Grid
 
 
 def find_low_points(grid):
@@ -28,15 +33,11 @@ def find_low_points(grid):
     Finds the low points in a height map
     """
     low_points = []
-    for x in range(grid.max_x):
-        for y in range(grid.max_y):
-            v = grid.get(x,y)
-
-            dirs = [(x-1, y), (x+1, y), (x, y+1), (x, y-1)]
-            adjs = [grid.getdefault(dx, dy) for dx, dy in dirs]
+    for r, c, v in grid.items():
+        adjs = [grid.getdefault(r+dr, c+dc) for dr, dc in Grid.CARDINAL_DIRS]
 
-            if  all(v < a for a in adjs if a is not None):
-                low_points.append((x,y))
+        if all(v < a for a in adjs if a is not None):
+            low_points.append((r, c))
 
     return low_points
 
@@ -48,48 +49,27 @@ def task1(grid):
     low_points = find_low_points(grid)
 
     risk = 0
-    for x, y in low_points:
-        height = grid.get(x,y)
+    for r, c in low_points:
+        height = grid.get(r, c)
         risk += height + 1
 
     return risk
-    
-
-def basin_size(grid, x, y):
-    """
-    Find the size of a basin at coordinates (x, y) using flood filling
-    """
-
-    def basin_size_r(grid, x, y, visited):
-        if (x, y) in visited:
-            return 0
-        
-        visited.add((x,y))
-
-        v = grid.get(x,y)
-
-        dirs = [(x-1, y), (x+1, y), (x, y+1), (x, y-1)]
-
-        size = 1
-        for dx, dy in dirs:
-            a_v = grid.getdefault(dx,dy)
-            if a_v is not None and a_v > v and a_v < 9:
-                size += basin_size_r(grid, dx, dy, visited)
-
-        return size
-
-    return basin_size_r(grid, x, y, visited=set())
 
 
 def task2(grid):
     """
     Task 2: Find the size of the basins, and return the
     product of the top three sizes.
+
+    Every location (except the ones with height 9) is part
+    of exactly one basin, so the basins are just the connected
+    regions of locations with heights 0 through 8, which we
+    can find all at once (instead of flood filling from each
+    low point)
     """
-    low_points = find_low_points(grid)
+    _, sizes = grid.label_components(range(9))
 
-    sizes = [basin_size(grid, x, y) for x, y in low_points]
-    sizes.sort(reverse=True)
+    sizes = sorted(sizes.tolist(), reverse=True)
 
     return math.prod(sizes[:3])
         
@@ -97,8 +77,8 @@ def task2(grid):
 if __name__ == "__main__":
     util.set_debug(False)
 
-    sample = util.Grid.from_file("input/sample/09.in", cast=int)
-    input = util.Grid.from_file("input/09.in", cast=int)
+    sample = Grid.from_file("input/sample/09.in", cast=int, storage="numpy")
+    input = Grid.from_file("input/09.in", cast=int, storage="numpy")
 
     print("TASK 1")
     util.call_and_print(task1, sample)
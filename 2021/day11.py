@@ -14,6 +14,10 @@ for Part 2. I was fully expecting to start burning CPU in Part 2 because
 you needed some clever way to identify repeating patterns, so I was
 relieved when I got a (correct) solution simply by looping until all 100
 octopuses flashed.
+
+Update: step() now works on the whole grid at once (as a NumPy
+array), counting how many flashing neighbors each octopus has
+instead of visiting every octopus one at a time.
 """
 
 import util
@@ -21,7 +25,10 @@ import math
 import sys
 import re
 
+import numpy as np
+
 from util import log
+from grid import Grid, neighbor_counts
 
 
 def step(grid):
@@ -29,53 +36,32 @@ def step(grid):
     Perform one step of the simulation.
 
     Returns the number of flashes in this step.
-    """
 
-    flashes = set()
-
-    # Start by incrementing every position by one
-    for x in range(grid.max_x):
-        for y in range(grid.max_y):
-            v = grid.get(x, y)
-            grid.set(x, y, v+1)
+    The whole grid is updated at once, using NumPy
+    arrays: we start by incrementing every position
+    by one and, in each iteration of the loop, we flash
+    all the positions that have gone over 9 (and haven't
+    flashed yet), incrementing their neighbors. We stop
+    when there are no new flashes.
+    """
+    octopuses = grid.to_array()
+    flashed = np.zeros(octopuses.shape, dtype=bool)
 
+    octopuses += 1
 
     while True:
-        # In each iteration of this loop, we go through every position
-        # of the grid, and flashes the position if necessary.
-        # We break out of the loop if, at the end of the iteration.,
-        # there have been no flashes.
-
-        some_flashes = False
-        for x in range(grid.max_x):
-            for y in range(grid.max_y):
-                v = grid.get(x, y)
-
-                if v > 9 and (x, y) not in flashes:
-                    # If the value is greater than 9, and hasn't already been
-                    # flashed, we increment each adjancent position by one.
-                    # We don't initiate a "flashing chain reaction"; that
-                    # will be handled by the next iteration of the main
-                    # while loop.
-                    for (dx, dy) in util.Grid.DIRECTIONS:
-                        ax, ay = x+dx, y+dy
-                        av = grid.getdefault(ax, ay)
-                        if av is not None:
-                            grid.set(ax, ay, av+1)
-
-                    # Add this position to the set of flashes
-                    flashes.add((x, y))
-                    some_flashes = True
-
-        # If we didn't encounter any flashes, we're done.
-        if not some_flashes:
+        flashing = (octopuses > 9) & ~flashed
+        if not flashing.any():
             break
 
+        flashed |= flashing
+        octopuses += neighbor_counts(flashing, Grid.DIRECTIONS)
+
     # At the end of the step, we reset all the flashed positions to zero
-    for (x,y) in flashes:
-        grid.set(x, y, 0)
+    octopuses[flashed] = 0
+    grid.set_array(octopuses)
 
-    return len(flashes)
+    return int(np.count_nonzero(flashed))
 
 
 def task1(grid):
@@ -95,7 +81,7 @@ def task2(grid):
     """
     n = 1
     while True:
-        if step(grid) == 100:
+        if step(grid) == grid.rows * grid.cols:
             return n
         n += 1
 
@@ -103,8 +89,8 @@ def task2(grid):
 if __name__ == "__main__":
     util.set_debug(False)
 
-    sample = util.Grid.from_file("input/sample/11.in", cast=int)
-    input = util.Grid.from_file("input/11.in", cast=int)
+    sample = Grid.from_file("input/sample/11.in", cast=int, storage="numpy")
+    input = Grid.from_file("input/11.in", cast=int, storage="numpy")
 
     print("TASK 1")
     util.call_and_print(task1, sample.copy())
@@ -14,34 +14,35 @@ And then having to re-learn Dijkstra's from scratch, even though I
 really should review it before AoC starts each year. That said,
 after those hurdles, it was a pretty satisfying application of
 Dijkstra's algorithm on an atypical (non-graph) setting.
+
+Update: The search is now done with the general-purpose search
+function in my algorithms module, using A* (with the Manhattan
+distance as the heuristic). Running this file with --benchmark
+compares Dijkstra's and A* on the tiled grid.
 """
 
 import util
 import sys
 
-import heapq
 from util import log
+from grid import Grid
+from algorithms import search
 
 
-def get_risk(grid, x, y, tiling):
+def get_risk(grid, r, c, tiling):
     """
     Compute the risk, taking into account the tiling.
     """
 
-    tile_size = grid.max_x
-
-    tile_x = x // tile_size
-    tile_y = y // tile_size
+    tile_r = r // grid.rows
+    tile_c = c // grid.cols
 
-    if not (0 <= tile_x <= tiling-1) or not (0 <= tile_y <= tiling-1):
+    if not (0 <= tile_r <= tiling-1) or not (0 <= tile_c <= tiling-1):
         return None
 
-    ox = x % tile_size
-    oy = y % tile_size
+    risk = grid.get(r % grid.rows, c % grid.cols)
 
-    risk = grid.get(ox, oy)
-
-    tile_distance = tile_x + tile_y
+    tile_distance = tile_r + tile_c
 
     adjusted_risk = risk + tile_distance
 
@@ -52,74 +53,69 @@ def get_risk(grid, x, y, tiling):
     return adjusted_risk
 
 
-def find_min_risk(grid, tiling):
+def find_min_risk(grid, tiling, use_heuristic=True):
     """
-    Find the path with the lowest total risk, using Dijkstra's Algorithm.
+    Find the path with the lowest total risk, using Dijkstra's Algorithm
+    (or A*, using the Manhattan distance to the end as the heuristic,
+    which never overestimates the risk because every position
+    has a risk of at least 1)
+
+    Returns the search result (which includes the total risk,
+    and some statistics about the search)
     """
 
     start = (0, 0)
-    end = (grid.max_x*tiling-1, grid.max_y*tiling-1)
-
-    # List that we'll use like a priority queue with heapq
-    h = []
-
-    # Distance and previous-node dictionaries
-    node_dist = {}
-    node_dist[start] = 0
-    prev = {}
-    prev[start] = None
-
-    # Add the start node
-    heapq.heappush(h, (0, start))
-
-    # Ye olde Dikstra loop
-    while len(h) > 0:
-        dist, cur_node = heapq.heappop(h)
+    end = (grid.rows*tiling-1, grid.cols*tiling-1)
 
-        # We've reached the end and don't need to check further
-        if cur_node == end:
-            break
+    def neighbors(pos):
+        r, c = pos
+        for dr, dc in Grid.CARDINAL_DIRS:
+            nr, nc = r+dr, c+dc
+            adj_risk = get_risk(grid, nr, nc, tiling)
+            if adj_risk is not None:
+                yield (nr, nc), adj_risk
 
-        # Check the neighbors
-        x, y = cur_node
-        for dx, dy in util.Grid.CARDINAL_DIRS:
-            
-            nx, ny = x+dx, y+dy
+    def manhattan(pos):
+        return (end[0] - pos[0]) + (end[1] - pos[1])
 
-            adj_risk = get_risk(grid, nx, ny, tiling)
-
-            if adj_risk is None:
-                continue
-
-            # Update distance/prev/queue if necessary
-            new_distance = node_dist[cur_node] + adj_risk
-            if new_distance < node_dist.get((nx,ny), sys.maxsize):
-                node_dist[(nx,ny)] = new_distance
-                prev[(nx,ny)] = cur_node
-                heapq.heappush(h, (new_distance, (nx,ny)))
-
-    return node_dist[end]
+    return search(start, neighbors, [end],
+                  heuristic=manhattan if use_heuristic else None,
+                  track_paths=False)
 
 
 def task1(grid):
     """
     Task 1: Find the min-risk path with no tiling
     """
-    return find_min_risk(grid, tiling=1)
+    return find_min_risk(grid, tiling=1).cost
 
 
 def task2(grid):
     """
     Task 1: Find the min-risk path with 5x5 tiling
     """
-    return find_min_risk(grid, tiling=5)
+    return find_min_risk(grid, tiling=5).cost
+
+
+def benchmark(grid):
+    """
+    Compare Dijkstra's and A* on the 5x5 tiled grid
+    (the search result includes the number of
+    expanded states and heap pushes)
+    """
+    util.call_and_time(find_min_risk, grid, 5, False)
+    util.call_and_time(find_min_risk, grid, 5, True)
 
 
 if __name__ == "__main__":
     util.set_debug(False)
 
-    sample = util.Grid.from_file("input/sample/15.in", cast=int)
-    input = util.Grid.from_file("input/15.in", cast=int)
+    sample = Grid.from_file("input/sample/15.in", cast=int)
+    input = Grid.from_file("input/15.in", cast=int)
+
+    if "--benchmark" in sys.argv:
+        benchmark(input)
+        sys.exit(0)
 
     print("TASK 1")
     util.call_and_print(task1, sample)
@@ -14,15 +14,93 @@ The code below is effectively the same code I wrote to obtain the solution,
 except for some cleaning up. I invested in writing a Packet class in Part 1, 
 and that paid off handsomely in Part 2 (all I had to do was add an eval()
 method to the Packet class, and everything fell into place beautifully)
+
+Update: The original Packet class worked on a string of "0"s and "1"s,
+and created every sub-packet from a copy of the rest of the string
+(which made the whole thing quadratic in the length of the transmission).
+The transmission is now read through a BitReader, which reads bits
+from the hex digits as needed, and parsed iteratively into a stream
+of events that can be evaluated without ever building the packets
+(or recursing, so there's no limit on how deeply packets can be nested).
+Running the file with --benchmark decodes some multi-megabyte
+synthetic transmissions.
 """
 
 import util
+import functools
 import math
+import random
 import sys
 import re
 
 from util import log
 
+class BitReader:
+    """
+    Class for reading bits from a hex source, without having to
+    convert the whole source into binary. The source can be a hex
+    string, or any iterable of hex strings (e.g., the chunks of a
+    very large file), which are only read as we need more bits.
+    """
+
+    # Number of hex digits we add to the bit buffer at a time
+    HEX_DIGITS = 16
+
+    def __init__(self, source):
+        if isinstance(source, str):
+            source = [source]
+        self.chunks = iter(source)
+        self.chunk = ""
+        self.chunk_pos = 0
+
+        # Bits we've read from the source, but haven't consumed yet
+        self.buffer = 0
+        self.buffer_len = 0
+
+        # Number of bits consumed so far
+        self.position = 0
+
+    def refill(self):
+        """
+        Add the next few hex digits to the bit buffer
+        """
+        while self.chunk_pos >= len(self.chunk):
+            try:
+                self.chunk = next(self.chunks).strip()
+            except StopIteration:
+                raise EOFError("Ran out of bits") from None
+            self.chunk_pos = 0
+
+        digits = self.chunk[self.chunk_pos:self.chunk_pos+BitReader.HEX_DIGITS]
+        self.chunk_pos += len(digits)
+        self.buffer = (self.buffer << (4 * len(digits))) | int(digits, 16)
+        self.buffer_len += 4 * len(digits)
+
+    def read(self, n):
+        """
+        Consume the next n bits, and return them as an integer
+        """
+        while self.buffer_len < n:
+            self.refill()
+        self.buffer_len -= n
+        value = self.buffer >> self.buffer_len
+        self.buffer &= (1 << self.buffer_len) - 1
+        self.position += n
+        return value
+
+
+def read_hex_chunks(filename, chunk_size=1 << 16):
+    """
+    Read a (possibly very large) hex file in chunks
+    """
+    with open(filename) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if chunk == "":
+                return
+            yield chunk
+
+
 class Packet:
     """
     Class for representing packets
@@ -48,124 +126,79 @@ class Packet:
     TYPE_LT = 6
     TYPE_EQ = 7
 
-
-    def __init__(self, bin_str):
+    # Operation that combines the values of the sub-packets
+    # of each type of operator packet, two at a time
+    OPERATIONS = {
+        TYPE_SUM: lambda x, y: x + y,
+        TYPE_PRODUCT: lambda x, y: x * y,
+        TYPE_MINIMUM: min,
+        TYPE_MAXIMUM: max,
+        TYPE_GT: lambda x, y: 1 if x > y else 0,
+        TYPE_LT: lambda x, y: 1 if x < y else 0,
+        TYPE_EQ: lambda x, y: 1 if x == y else 0,
+    }
+
+    # Events produced by iter_packets
+    EVENT_LITERAL = 0
+    EVENT_OPEN = 1
+    EVENT_CLOSE = 2
+
+    def __init__(self, version, type, start):
         """
-        Constructor. Takes a binary string (e.g., "0101011101") as its
-        only parameter.
+        Constructor. Takes the version and type of the packet,
+        and the position of its first bit in the transmission.
         """
-        self.bin_str = bin_str
+        self.version = version
+        self.type = type
+        self.start = start
+        self.end = None
         self.sub_packets = []
 
-        if self.type == Packet.TYPE_LITERAL:
-            # This packet contains a literal value. We need to extract
-            # the value from the blocks after the header.
-
-            raw_bin_value = self.bin_str[Packet.HEADER_LEN:]
-
-            i = Packet.HEADER_LEN
-            bin_value = ""
-            self.len_value = 0
-            while True:
-                pad = self.bin_str[i]
-                bin_value += self.bin_str[i+1:i+Packet.LITERAL_VALUE_BLOCK_LEN]
-                self.len_value += Packet.LITERAL_VALUE_BLOCK_LEN
-                if pad == "0":
-                    break
-                i += Packet.LITERAL_VALUE_BLOCK_LEN
-
-            self.literal_value = int(bin_value, 2)
-
-        elif self.type != Packet.TYPE_LITERAL:
-            # This is an operator packet. We need to recursively compute
-            # the subpackets.
-            if self.length_type == Packet.SUBPACKET_LEN_TYPE_BITS:
-                lb = Packet.HEADER_LEN + 1
-                ub = lb + Packet.SUBPACKET_LEN_BITS_LEN
-                sub_packets_len = int(self.bin_str[lb:ub],2)
-
-                start = ub
-                while sub_packets_len != 0:
-                    assert sub_packets_len > 0
-
-                    p = Packet(self.bin_str[start:])
-                    self.sub_packets.append(p)
-                    sub_packets_len -= p.length
-                    start += p.length
+        # Only for literal packets
+        self.literal_value = None
 
-            elif self.length_type == Packet.SUBPACKET_LEN_TYPE_NUM:
-                lb = Packet.HEADER_LEN + 1
-                ub = lb + Packet.SUBPACKET_LEN_NUM_LEN
-                num_packets = int(self.bin_str[lb:ub], 2)
-
-                start = ub
-                for i in range(num_packets):
-                    p = Packet(self.bin_str[start:])
-                    self.sub_packets.append(p)
-                    start += p.length
-
-        # Might as well trim all the excess bits
-        self.bin_str = self.bin_str[:self.length]
+        # Only for operator packets
+        self.length_type = None
+        self.sub_packets_len = None
 
+    @property
+    def length(self):
+        return self.end - self.start
 
     def eval(self):
         """
         Evaluate the value of a packet, recursively evaluating
         sub-packets if necessary
         """
-        if self.type == Packet.TYPE_SUM:
-            return sum(p.eval() for p in self.sub_packets)
-        if self.type == Packet.TYPE_PRODUCT:
-            return math.prod(p.eval() for p in self.sub_packets)
-        if self.type == Packet.TYPE_MINIMUM:
-            return min(p.eval() for p in self.sub_packets)
-        if self.type == Packet.TYPE_MAXIMUM:
-            return max(p.eval() for p in self.sub_packets)
         if self.type == Packet.TYPE_LITERAL:
             return self.literal_value
-        if self.type in (Packet.TYPE_GT, Packet.TYPE_LT, Packet.TYPE_EQ):
-            p1 = self.sub_packets[0]
-            p2 = self.sub_packets[1]
-
-            if self.type == Packet.TYPE_GT:
-                return 1 if p1.eval() > p2.eval() else 0
-            if self.type == Packet.TYPE_LT:
-                return 1 if p1.eval() < p2.eval() else 0
-            if self.type == Packet.TYPE_EQ:
-                return 1 if p1.eval() == p2.eval() else 0
-
-    @property
-    def version(self):
-        return int(self.bin_str[:Packet.VERSION_LEN], 2)
-
-    @property
-    def type(self):
-        return int(self.bin_str[Packet.VERSION_LEN:Packet.HEADER_LEN], 2)
-
-    @property
-    def length_type(self):
-        return int(self.bin_str[Packet.HEADER_LEN], 2)
-
-    @property
-    def length(self):
-        if self.type == 4:
-            return 6 + self.len_value
-        else:
-            if self.length_type == 0:
-                return 22 + sum(p.length for p in self.sub_packets)
-            elif self.length_type == 1:
-                return 18 + sum(p.length for p in self.sub_packets)
-
+        return functools.reduce(Packet.OPERATIONS[self.type],
+                                (p.eval() for p in self.sub_packets))
 
     @classmethod
     def from_hex(cls, hex):
         """
-        Create a Packet object starting from a hex string
+        Create a Packet object (with all its sub-packets)
+        starting from a hex string
         """
-        h_size = len(hex) * 4
-        bin_str = bin(int(hex, 16))[2:].zfill(h_size)
-
-        return cls(bin_str)
+        stack = []
+        for event in iter_packets(BitReader(hex)):
+            if event[0] == Packet.EVENT_CLOSE:
+                packet = stack.pop()
+                packet.end = event[2]
+            else:
+                packet = cls(event[1], event[2], event[4])
+                if event[0] == Packet.EVENT_LITERAL:
+                    packet.literal_value = event[3]
+                    packet.end = event[5]
+                else:
+                    packet.length_type, packet.sub_packets_len = event[3]
+                    stack.append(packet)
+
+            if len(stack) == 0:
+                return packet
+            if packet is not stack[-1]:
+                stack[-1].sub_packets.append(packet)
 
     def __str__(self):
         """
@@ -176,38 +209,130 @@ class Packet:
         else:
             s = f"V={self.version} T={self.type} LT={self.length_type} "
             if self.length_type == 0:
-                s += f"SPL={int(self.bin_str[7:22],2)} "
+                s += f"SPL={self.sub_packets_len} "
             elif self.length_type == 1:
-                s += f"SPN={int(self.bin_str[7:18],2)} "
+                s += f"SPN={self.sub_packets_len} "
             return s + f"PACKETS={len(self.sub_packets)} len={self.length}"
 
 
-def sum_versions(packet):
+def iter_packets(reader):
     """
-    Recursively add up the versions from all the packets
-    (and their subpackets)
+    Parse a transmission from a BitReader, producing a stream
+    of events (in the order in which the packets appear):
+
+    - (EVENT_LITERAL, version, type, value, start, end) for literal packets
+    - (EVENT_OPEN, version, type, (length_type, length), start) when
+      an operator packet starts
+    - (EVENT_CLOSE, type, end) when an operator packet ends
+
+    The parsing is done iteratively, with an explicit stack of
+    the operator packets we're inside of, so there is no limit
+    on how deeply packets can be nested.
     """
+    read = reader.read
 
-    rv = packet.version
+    # For every open operator packet, we keep track of
+    # its type, and either the position where its sub-packets
+    # end, or the number of sub-packets left to read.
+    stack = []
 
-    for p in packet.sub_packets:
-        rv += sum_versions(p)
+    while True:
+        start = reader.position
+        version = read(Packet.VERSION_LEN)
+        type = read(Packet.TYPE_LEN)
 
-    return rv
+        if type == Packet.TYPE_LITERAL:
+            value = 0
+            while True:
+                block = read(Packet.LITERAL_VALUE_BLOCK_LEN)
+                value = (value << 4) | (block & 0xF)
+                if block & 0x10 == 0:
+                    break
+            yield (Packet.EVENT_LITERAL, version, type, value, start, reader.position)
+            done = True
+        else:
+            length_type = read(1)
+            if length_type == Packet.SUBPACKET_LEN_TYPE_BITS:
+                length = read(Packet.SUBPACKET_LEN_BITS_LEN)
+                stack.append([type, reader.position + length, None])
+            else:
+                length = read(Packet.SUBPACKET_LEN_NUM_LEN)
+                stack.append([type, None, length])
+            yield (Packet.EVENT_OPEN, version, type, (length_type, length), start)
+
+            # An operator packet with no sub-packets is already done
+            done = length == 0
+            if done:
+                stack.pop()
+                yield (Packet.EVENT_CLOSE, type, reader.position)
+
+        # If we finished a packet, we may have also finished
+        # the packet it's inside of (and so on)
+        while done:
+            if len(stack) == 0:
+                return
+            frame = stack[-1]
+            if frame[2] is not None:
+                frame[2] -= 1
+                done = frame[2] == 0
+            else:
+                done = reader.position >= frame[1]
+            if done:
+                stack.pop()
+                yield (Packet.EVENT_CLOSE, frame[0], reader.position)
+
+
+def evaluate(events):
+    """
+    Evaluate a transmission from its stream of events. Instead of
+    building the packets, we only keep track of the value of each
+    operator packet we're inside of (combining the value of each
+    sub-packet with the value so far, as soon as we know it)
+    """
+    # Values so far of the open operator packets (None if
+    # we haven't seen any sub-packets yet)
+    stack = [[None, None]]
+    operations = Packet.OPERATIONS
+
+    for event in events:
+        if event[0] == Packet.EVENT_OPEN:
+            stack.append([event[2], None])
+            continue
+
+        if event[0] == Packet.EVENT_LITERAL:
+            value = event[3]
+        else:
+            value = stack.pop()[1]
+
+        frame = stack[-1]
+        if frame[1] is None:
+            frame[1] = value
+        else:
+            frame[1] = operations[frame[0]](frame[1], value)
+
+    return stack[0][1]
+
+
+def sum_versions(events):
+    """
+    Add up the versions from all the packets
+    (and their subpackets)
+    """
+    return sum(event[1] for event in events if event[0] != Packet.EVENT_CLOSE)
 
 
 def task1(hex):
     """
     Task 1: Add up the versions in all the packets.
     """    
-    return sum_versions(Packet.from_hex(hex))
+    return sum_versions(iter_packets(BitReader(hex)))
 
 
 def eval(hex):
     """
     Task 2: Evaluate a packet
     """
-    return Packet.from_hex(hex).eval()
+    return evaluate(iter_packets(BitReader(hex)))
 
 
 def test_packets():
@@ -233,9 +358,75 @@ def test_packets():
     print()
 
 
+def synthetic_transmission(n_groups, group_size, depth, seed=2021):
+    """
+    Generate a (large) synthetic transmission: a sum of n_groups
+    groups, where each group is a chain of depth single-sub-packet
+    operators, wrapped around a sum of group_size literals (with
+    its length given in bits).
+
+    Returns the transmission (as hex), the sum of the versions,
+    and the value of the transmission.
+    """
+    rng = random.Random(seed)
+    bits = []
+    version_sum = 0
+    value = 0
+
+    def header(type):
+        nonlocal version_sum
+        version = rng.randrange(8)
+        version_sum += version
+        return f"{version:03b}{type:03b}"
+
+    bits.append(header(Packet.TYPE_SUM) + f"1{n_groups:011b}")
+    for _ in range(n_groups):
+        for _ in range(depth):
+            type = rng.choice((Packet.TYPE_SUM, Packet.TYPE_PRODUCT,
+                               Packet.TYPE_MINIMUM, Packet.TYPE_MAXIMUM))
+            bits.append(header(type) + f"1{1:011b}")
+
+        literals = []
+        for _ in range(group_size):
+            literal = rng.randrange(1 << 16)
+            value += literal
+            nibbles = [(literal >> shift) & 0xF for shift in (12, 8, 4, 0)]
+            literals.append(header(Packet.TYPE_LITERAL) +
+                            "".join(f"1{n:04b}" for n in nibbles[:-1]) +
+                            f"0{nibbles[-1]:04b}")
+        literals = "".join(literals)
+        bits.append(header(Packet.TYPE_SUM) + f"0{len(literals):015b}" + literals)
+
+    bits = "".join(bits)
+    bits += "0" * (-len(bits) % 64)
+
+    hex = "".join(f"{int(bits[i:i+64], 2):016X}" for i in range(0, len(bits), 64))
+
+    return hex, version_sum, value
+
+
+def benchmark():
+    """
+    Time decoding a few large synthetic transmissions
+    """
+    for n_groups, group_size, depth in ((2000, 100, 10), (2000, 400, 10), (1, 1000, 200_000)):
+        hex, version_sum, value = synthetic_transmission(n_groups, group_size, depth)
+        print(f"{len(hex) / 1e6:.1f}M hex digits ({n_groups} groups of "
+              f"{group_size} literals, nested {depth} deep)")
+
+        # Read the transmission in chunks, as if it were a large file
+        chunks = [hex[i:i+65536] for i in range(0, len(hex), 65536)]
+        assert util.call_and_time(sum_versions, iter_packets(BitReader(chunks))) == version_sum
+        assert util.call_and_time(evaluate, iter_packets(BitReader(chunks))) == value
+
+
 if __name__ == "__main__":
     util.set_debug(False)
 
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
+
     test_packets()
 
     input = util.read_strs("input/16.in")[0]
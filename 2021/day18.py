@@ -24,10 +24,23 @@ I dread to think what this code would've initially looked like
 if I was rushing to produce something that would solve the
 problem.
 
+Update: Turns out we don't actually need the tree. The only
+things that matter are the regular numbers (in order) and how
+deeply nested each one is, so FlatNumber stores just that in two
+lists, and explodes/splits them in a single pass over the lists
+(instead of searching the tree from the root after every action).
+The tasks use FlatNumber by default (the Tree version can still
+be used with engine="tree"), and part 2 can split the pairs of
+numbers across several processes. Running the file with --check
+checks that both versions produce the same numbers.
 """
 
 import util
 import math
+import random
+import sys
+from functools import partial
+from multiprocessing import Pool
 
 from util import log
 
@@ -301,10 +314,169 @@ class Tree:
         return tree
 
 
-def task1(input):
+class FlatNumber:
+    """
+    Class for representing snailfish numbers as a list of
+    regular numbers (from left to right), and a list with
+    the depth of each number (i.e., how many pairs it's in)
+    """
+
+    def __init__(self, values, depths):
+        self.values = values
+        self.depths = depths
+
+    @classmethod
+    def from_str(cls, s):
+        """
+        Create a number from its text representation
+        """
+        values = []
+        depths = []
+        depth = 0
+        digits = ""
+        for c in s:
+            if c.isdigit():
+                digits += c
+                continue
+            if digits:
+                values.append(int(digits))
+                depths.append(depth)
+                digits = ""
+            if c == "[":
+                depth += 1
+            elif c == "]":
+                depth -= 1
+
+        return cls(values, depths)
+
+    def add(self, other):
+        """
+        Adds two numbers (without modifying them)
+        """
+        number = FlatNumber(self.values + other.values,
+                            [d + 1 for d in self.depths] + [d + 1 for d in other.depths])
+        number.reduce()
+
+        return number
+
+    def explode(self, i):
+        """
+        Explode the pair that starts at position i
+        """
+        values = self.values
+        if i > 0:
+            values[i-1] += values[i]
+        if i + 2 < len(values):
+            values[i+2] += values[i+1]
+        values[i:i+2] = [0]
+        self.depths[i:i+2] = [self.depths[i] - 1]
+
+    def reduce(self):
+        """
+        Reduce the number. Adding two reduced numbers can only produce
+        pairs nested inside four pairs (which explode into regular numbers
+        at depth 4), so we can first explode all of them from left to right.
+        After that, splitting a number can only produce a pair that has to
+        explode immediately, which only changes the numbers next to it.
+        """
+        values = self.values
+        depths = self.depths
+
+        i = 0
+        while i < len(values):
+            if depths[i] > 4:
+                self.explode(i)
+            i += 1
+
+        i = 0
+        while i < len(values):
+            value = values[i]
+            if value < 10:
+                i += 1
+                continue
+
+            depth = depths[i] + 1
+            values[i:i+1] = [value // 2, value - value // 2]
+            depths[i:i+1] = [depth, depth]
+            if depth > 4:
+                self.explode(i)
+                # The number to the left may now need splitting
+                i = max(i - 1, 0)
+
+    def magnitude(self):
+        """
+        Compute the magnitude of the number, by folding the numbers
+        into their pairs (with a stack of (magnitude, depth) tuples)
+        """
+        stack = []
+        for value, depth in zip(self.values, self.depths):
+            while len(stack) > 0 and stack[-1][1] == depth:
+                left, _ = stack.pop()
+                value = 3*left + 2*value
+                depth -= 1
+            stack.append((value, depth))
+
+        return stack[0][0]
+
+    def to_list(self):
+        """
+        Convert the number to a list representation (same as Tree.to_list)
+        """
+        stack = []
+        for value, depth in zip(self.values, self.depths):
+            while len(stack) > 0 and stack[-1][1] == depth:
+                left, _ = stack.pop()
+                value = [left, value]
+                depth -= 1
+            stack.append((value, depth))
+
+        return stack[0][0]
+
+    def __str__(self):
+        return str(self.to_list()).replace(" ", "")
+
+
+def random_number(rng, depth=0):
+    """
+    Generate a random (reduced) snailfish number, as a list
+    """
+    if depth > 0 and (depth == 4 or rng.random() < 0.3):
+        return rng.randint(0, 9)
+    return [random_number(rng, depth + 1), random_number(rng, depth + 1)]
+
+
+def check_equivalence(n_numbers, seed=2021):
+    """
+    Check that adding up random numbers produces the same numbers
+    (and magnitudes) with FlatNumber and with Tree
+    """
+    rng = random.Random(seed)
+    numbers = [random_number(rng) for _ in range(n_numbers)]
+
+    tree = Tree.from_list(numbers[0])
+    flat = FlatNumber.from_str(str(numbers[0]))
+    for lst in numbers[1:]:
+        tree = tree.add(Tree.from_list(lst))
+        flat = flat.add(FlatNumber.from_str(str(lst)))
+        if tree.to_list() != flat.to_list() or tree.magnitude() != flat.magnitude():
+            return False
+
+    return True
+
+
+def task1(input, engine="flat"):
     """
     Task 1: Add up all the snailfish numbers, and return the magnitude
     """
+    if engine == "flat":
+        numbers = [FlatNumber.from_str(l) for l in input]
+        result = numbers[0]
+        for number in numbers[1:]:
+            result = result.add(number)
+
+        return result.magnitude()
+
+    assert engine == "tree", f"Unknown engine: {engine}"
 
     trees = [Tree.from_list(eval(l)) for l in input]
     trees.reverse()
@@ -320,10 +492,30 @@ def task1(input):
     return trees[0].magnitude()
 
 
-def task2(input):
+def max_magnitude_from(numbers, i):
+    """
+    Find the largest magnitude of the sums of numbers[i]
+    with every other number
+    """
+    return max(numbers[i].add(number).magnitude()
+               for j, number in enumerate(numbers) if j != i)
+
+
+def task2(input, engine="flat", processes=None):
     """
     Task 2: Find the sum with the largest magnitude
+    (optionally, splitting the work across several processes)
     """
+    if engine == "flat":
+        numbers = [FlatNumber.from_str(l) for l in input]
+        max_magnitude_fn = partial(max_magnitude_from, numbers)
+        if processes is None:
+            return max(map(max_magnitude_fn, range(len(numbers))))
+
+        with Pool(processes) as pool:
+            return max(pool.map(max_magnitude_fn, range(len(numbers))))
+
+    assert engine == "tree", f"Unknown engine: {engine}"
 
     max_magnitude = 0
     for lst1 in input:
@@ -344,6 +536,11 @@ def task2(input):
 if __name__ == "__main__":
     util.set_debug(False)
 
+    if "--check" in sys.argv:
+        for seed in range(10):
+            util.call_and_print(check_equivalence, 200, seed)
+        sys.exit(0)
+
     sample = util.read_strs("input/sample/18.in", sep="\n")
     input = util.read_strs("input/18.in", sep="\n")
 
@@ -31,12 +31,28 @@ ways of transforming the coordinates.
 My solution originally ran in close to two minutes, but I managed
 to bring it down to 40 seconds, after a few optimizations and
 after some judicious use of @lru_cache.
+
+Update: solve() now uses a much faster approach by default (the original
+one is still available with engine="brute_force"). The squared distances
+between every pair of beacons in a scanner don't change when we rotate or
+move the scanner, so two scanners that share 12 beacons must also share
+(at least) 66 of those distances. We only try to align scanners that do,
+and we align them by rotating all the beacons with each of the 24 rotations
+(as NumPy matrix products), and checking whether 12 of the beacons end
+up at the same offset from the beacons of the other scanner. Running
+the file with --benchmark compares both approaches.
 """
 
 import util
+import itertools
 import math
+import random
+import sys
+from collections import Counter, deque
 from functools import cached_property, lru_cache
 
+import numpy as np
+
 from util import log
 
 
@@ -319,12 +335,144 @@ def read_input(input):
         scanners.append(Scanner(i, coords))
     return scanners
 
-def solve(input):
+def proper_rotations():
+    """
+    Produces the 24 rotation matrices that can turn a scanner around
+    (i.e., the matrices with a single -1 or 1 in each row and column,
+    leaving out the 24 mirror images, which have determinant -1)
+    """
+    rotations = []
+    for axes in itertools.permutations(range(3)):
+        for signs in itertools.product((-1, 1), repeat=3):
+            rotation = np.zeros((3, 3), dtype=np.int64)
+            for row, (axis, sign) in enumerate(zip(axes, signs)):
+                rotation[row, axis] = sign
+            if round(np.linalg.det(rotation)) == 1:
+                rotations.append(rotation)
+
+    return np.array(rotations)
+
+
+ROTATIONS = proper_rotations()
+
+# Number of beacons two scanners need to have in common, and the number
+# of distances between those beacons (which is 12 choose 2)
+MIN_COMMON_BEACONS = 12
+MIN_COMMON_DISTANCES = MIN_COMMON_BEACONS * (MIN_COMMON_BEACONS - 1) // 2
+
+
+def distance_fingerprint(points):
+    """
+    Computes the squared distances between every pair of points, which
+    don't change when we rotate or move the points. Returns a Counter
+    (since the same distance can come up more than once)
+    """
+    diffs = points[:, np.newaxis, :] - points[np.newaxis, :, :]
+    distances = (diffs ** 2).sum(axis=2)
+    i, j = np.triu_indices(len(points), k=1)
+
+    return Counter(distances[i, j].tolist())
+
+
+def align(fixed_points, points):
+    """
+    Tries to align some points (relative to a scanner) with points whose
+    absolute coordinates we know. If there is a rotation that makes
+    MIN_COMMON_BEACONS of the points be at the same offset from some
+    of the fixed points, returns the rotation and the offset (which is
+    also the position of the scanner). Otherwise, returns None.
+    """
+    # Rotate all the points with all the rotations at once
+    rotated = np.einsum("rij,pj->rpi", ROTATIONS, points)
+
+    # Offsets between every fixed point and every rotated point (with
+    # each offset packed into a single integer, 21 bits per coordinate,
+    # so it's faster to find the most common one)
+    offsets = fixed_points[np.newaxis, :, np.newaxis, :] - rotated[:, np.newaxis, :, :]
+    offsets = offsets.reshape(len(ROTATIONS), -1, 3) + (1 << 20)
+    keys = (offsets[..., 0] << 42) | (offsets[..., 1] << 21) | offsets[..., 2]
+
+    for r, rotation_keys in enumerate(keys):
+        values, counts = np.unique(rotation_keys, return_counts=True)
+        best = counts.argmax()
+        if counts[best] >= MIN_COMMON_BEACONS:
+            offset = offsets[r][np.flatnonzero(rotation_keys == values[best])[0]]
+            return ROTATIONS[r], offset - (1 << 20)
+
+    return None
+
+
+def common_distances(fingerprint1, fingerprint2):
+    """
+    Number of distances two fingerprints have in common
+    """
+    common = fingerprint1.keys() & fingerprint2.keys()
+    return sum(min(fingerprint1[d], fingerprint2[d]) for d in common)
+
+
+def locate_scanners(scanners):
+    """
+    Finds the absolute coordinates of all the scanners and beacons,
+    given a list of arrays with the coordinates of the beacons in
+    each scanner (relative to that scanner)
+
+    Returns a list with the position of each scanner, and a list
+    with the absolute coordinates of the beacons in each scanner.
+    """
+    fingerprints = [distance_fingerprint(points) for points in scanners]
+
+    positions = [None] * len(scanners)
+    beacons = [None] * len(scanners)
+    positions[0] = np.zeros(3, dtype=np.int64)
+    beacons[0] = scanners[0]
+
+    # Starting from scanner 0, we align every other scanner that
+    # shares enough distances with a scanner we've already located
+    queue = deque([0])
+    while len(queue) > 0:
+        i = queue.popleft()
+        for j, points in enumerate(scanners):
+            if positions[j] is not None:
+                continue
+
+            if common_distances(fingerprints[i], fingerprints[j]) < MIN_COMMON_DISTANCES:
+                continue
+
+            alignment = align(beacons[i], points)
+            if alignment is not None:
+                rotation, offset = alignment
+                positions[j] = offset
+                beacons[j] = points @ rotation.T + offset
+                queue.append(j)
+
+    assert all(p is not None for p in positions), "Couldn't locate all the scanners"
+
+    return positions, beacons
+
+
+ENGINES = ("fingerprint", "brute_force")
+
+
+def solve(input, engine="fingerprint"):
     """
     Tasks 1 + 2: Finds the number of beacons and the largest manhattan
     distance between the scanners.
     """
     scanners = read_input(input)
+
+    if engine == "fingerprint":
+        points = [np.array([b.rel_coords for b in s.beacons], dtype=np.int64)
+                  for s in scanners]
+        positions, beacons = locate_scanners(points)
+
+        beacon_coords = {tuple(b) for scanner_beacons in beacons
+                                  for b in scanner_beacons.tolist()}
+        positions = [tuple(p) for p in np.array(positions).tolist()]
+        max_dist = max(coords_manhattan(p1, p2) for p1 in positions for p2 in positions)
+
+        return len(beacon_coords), max_dist
+
+    assert engine == "brute_force", f"Unknown engine: {engine}"
     
     # Compute the coordinates of all the scanners and beacons
     compute_coords(scanners)
@@ -347,10 +495,94 @@ def solve(input):
     return len(beacon_coords), max_dist
 
 
+def synthetic_input(n_scanners, seed=2021):
+    """
+    Generates an input with the same shape as the actual input: scanners
+    that can see beacons up to 1000 units away (on each axis), where each
+    scanner shares at least 12 beacons with the previous one, and the
+    beacons in each scanner are rotated randomly and shuffled.
+
+    Returns the input, and the expected answer.
+    """
+    rng = random.Random(seed)
+
+    # Scanners are placed along a random walk (taking long
+    # steps along one axis, and short steps along the others)
+    positions = [(0, 0, 0)]
+    for _ in range(n_scanners - 1):
+        step = [rng.randint(-200, 200) for _ in range(3)]
+        step[rng.randrange(3)] = rng.choice((-1, 1)) * rng.randint(500, 800)
+        positions.append(tuple(p + s for p, s in zip(positions[-1], step)))
+
+    def random_beacon(lows, highs):
+        return tuple(rng.randint(l, h) for l, h in zip(lows, highs))
+
+    def count_visible(beacons, pos, lows=None, highs=None):
+        lows = lows or [p - 1000 for p in pos]
+        highs = highs or [p + 1000 for p in pos]
+        return sum(all(l <= c <= h for c, l, h in zip(b, lows, highs)) for b in beacons)
+
+    # Every scanner needs to share 12 beacons with the previous one
+    # (so we add beacons to the region both can see, if needed), and
+    # then we add more beacons until it can see around 26 of them
+    beacons = set()
+    for i, pos in enumerate(positions):
+        if i > 0:
+            prev = positions[i-1]
+            lows = [max(p1, p2) - 1000 for p1, p2 in zip(pos, prev)]
+            highs = [min(p1, p2) + 1000 for p1, p2 in zip(pos, prev)]
+            while count_visible(beacons, pos, lows, highs) < MIN_COMMON_BEACONS:
+                beacons.add(random_beacon(lows, highs))
+
+        target = rng.randint(25, 27)
+        while count_visible(beacons, pos) < target:
+            beacons.add(random_beacon([p - 1000 for p in pos], [p + 1000 for p in pos]))
+
+    visible = [[b for b in beacons if all(abs(c - p) <= 1000 for c, p in zip(b, pos))]
+               for pos in positions]
+
+    input = []
+    for i, (pos, scanner_beacons) in enumerate(zip(positions, visible)):
+        rotation = ROTATIONS[0] if i == 0 else rng.choice(ROTATIONS)
+        rel_coords = (np.array(scanner_beacons) - pos) @ rotation
+        lines = [f"{x},{y},{z}" for x, y, z in rel_coords.tolist()]
+        rng.shuffle(lines)
+        input.append("\n".join([f"--- scanner {i} ---"] + lines))
+
+    expected = (len({b for v in visible for b in v}),
+                max(coords_manhattan(p1, p2) for p1 in positions for p2 in positions))
+
+    return input, expected
+
+
+def benchmark(sample):
+    """
+    Compare both approaches on the sample, and time the fingerprint
+    approach on larger synthetic inputs (the brute force approach
+    expects scanners to share exactly 12 beacons, like in the
+    actual inputs, so it can get stuck on synthetic inputs)
+    """
+    print(f"Sample ({len(sample)} scanners)")
+    assert util.call_and_time(solve, sample, "fingerprint") == (79, 3621)
+    assert util.call_and_time(solve, sample, "brute_force") == (79, 3621)
+    print()
+
+    for n_scanners in (30, 100):
+        input, expected = synthetic_input(n_scanners)
+        print(f"Synthetic input ({n_scanners} scanners)")
+        assert util.call_and_time(solve, input, "fingerprint") == expected
+        print()
+
+
 if __name__ == "__main__":
     util.set_debug(False)
 
     sample = util.read_strs("input/sample/19.in", sep="\n\n")
+
+    if "--benchmark" in sys.argv:
+        benchmark(sample)
+        sys.exit(0)
+
     input = util.read_strs("input/19.in", sep="\n\n")
 
     print("TASK 1 + 2")
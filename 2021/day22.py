@@ -19,13 +19,27 @@ principle (although, not gonna lie, I also followed the "let's throw stuff at th
 wall and see what sticks" principle on this one). Fortunately, the "intersection" 
 operation I had already implemented was pretty solid, and things ultimately 
 worked out.
+
+Update: The subtracted cubes form a tree that keeps growing (every new
+intersection is pushed into every subtracted list), and computing the volume
+means walking that whole tree, so the original solution gets very slow with
+lots of overlapping cubes. reboot() can now also use a "signed" engine, which
+keeps a flat list of cuboids (in NumPy arrays, so we can intersect a new cube
+with all of them at once), each with a count of how many times its volume
+has to be added (or, if negative, subtracted). The same cuboid can come up
+many times, so every once in a while we add up their counts (and drop them
+if they cancel out). Running the file with --benchmark compares both
+engines on random, heavily overlapping reboot steps.
 """
 
 import util
 import math
+import random
 import sys
 import re
 
+import numpy as np
+
 from util import log
 
 
@@ -137,11 +151,20 @@ class Cube:
         return f"{self.toggle} x={x1}..{x2},y={y1}..{y2},z={z1}..{z2}"
 
 
-def reboot(cubes, bounding_cube=None):
+ENGINES = ("recursive", "signed")
+
+
+def reboot(cubes, bounding_cube=None, engine="signed"):
     """
     Reboot the reactor by processing the cubes (ignoring those outside
-    the bounding cube, if any)
+    the bounding cube, if any), using one of the ENGINES
+
+    Note that the recursive engine modifies the cubes
+    (so they can't be used in another reboot)
     """
+    if engine == "signed":
+        return reboot_signed(cubes, bounding_cube)
+    assert engine == "recursive", f"Unknown engine: {engine}"
 
     on_cubes = []
     for toggle, cube in cubes:
@@ -162,6 +185,94 @@ def reboot(cubes, bounding_cube=None):
     return sum(c.volume for c in on_cubes)
 
 
+def reboot_signed(cubes, bounding_cube=None):
+    """
+    Reboot the reactor using signed cuboids (inclusion/exclusion): we keep
+    a flat list of cuboids (as NumPy arrays with their min/max points), each
+    with a count of how many times we have to add their volume (or subtract
+    it, if the count is negative).
+
+    Every new cube (on or off) cancels out its intersection with everything
+    we already have (by adding the intersection with the opposite count),
+    and then, if it's an on cube, we add the cube itself. Whenever the
+    list doubles in size, we merge identical cuboids (adding up their
+    counts) and drop the ones whose counts cancel out.
+    """
+    min_points = np.empty((0, 3), dtype=np.int64)
+    max_points = np.empty((0, 3), dtype=np.int64)
+    counts = np.empty(0, dtype=np.int64)
+    merged_size = 1
+
+    for toggle, cube in cubes:
+        if bounding_cube is not None and not cube.inside(bounding_cube):
+            continue
+
+        cube_min = np.array(cube.min_point, dtype=np.int64)
+        cube_max = np.array(cube.max_point, dtype=np.int64)
+
+        intr_min = np.maximum(min_points, cube_min)
+        intr_max = np.minimum(max_points, cube_max)
+        overlaps = (intr_min <= intr_max).all(axis=1)
+
+        new_min = [min_points, intr_min[overlaps]]
+        new_max = [max_points, intr_max[overlaps]]
+        new_counts = [counts, -counts[overlaps]]
+        if toggle == "on":
+            new_min.append(cube_min[np.newaxis])
+            new_max.append(cube_max[np.newaxis])
+            new_counts.append(np.ones(1, dtype=np.int64))
+
+        min_points = np.concatenate(new_min)
+        max_points = np.concatenate(new_max)
+        counts = np.concatenate(new_counts)
+
+        if len(counts) > 2 * merged_size:
+            cuboids, index = np.unique(np.hstack((min_points, max_points)),
+                                       axis=0, return_inverse=True)
+            merged_counts = np.zeros(len(cuboids), dtype=np.int64)
+            np.add.at(merged_counts, index.ravel(), counts)
+
+            keep = merged_counts != 0
+            min_points = cuboids[keep, :3]
+            max_points = cuboids[keep, 3:]
+            counts = merged_counts[keep]
+            merged_size = max(len(counts), 1)
+
+    volumes = (max_points - min_points + 1).prod(axis=1)
+    return int((volumes * counts).sum())
+
+
+def random_steps(n_steps, size=1000, max_side=600, seed=2021):
+    """
+    Generate random (and heavily overlapping) reboot steps
+    """
+    rng = random.Random(seed)
+    steps = []
+    for _ in range(n_steps):
+        toggle = rng.choice(("on", "on", "off"))
+        bounds = []
+        for _ in range(3):
+            lo = rng.randint(-size, size - 1)
+            bounds += [lo, min(size, lo + rng.randint(0, max_side))]
+        x1, x2, y1, y2, z1, z2 = bounds
+        steps.append(f"{toggle} x={x1}..{x2},y={y1}..{y2},z={z1}..{z2}")
+
+    return steps
+
+
+def benchmark():
+    """
+    Compare both engines on random reboot steps
+    """
+    for n_steps in (50, 100, 200, 1000, 2000):
+        steps = random_steps(n_steps)
+        print(f"{n_steps} steps")
+        volume = util.call_and_time(reboot, read_input(steps), None, "signed")
+        if n_steps <= 1000:
+            assert util.call_and_time(reboot, read_input(steps), None, "recursive") == volume
+        print()
+
+
 def read_input(input):
     """
     Reads the input
@@ -196,6 +307,10 @@ def task2(input):
 if __name__ == "__main__":
     util.set_debug(False)
 
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
+
     sample1 = util.read_strs("input/sample/22-1.in", sep="\n")
     sample2 = util.read_strs("input/sample/22-2.in", sep="\n")
     sample3 = util.read_strs("input/sample/22-3.in", sep="\n")
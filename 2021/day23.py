@@ -25,10 +25,18 @@ tasks). Despite optimizing the code as much as I could, I suspect
 the game tree could be cut down even further. Additionally, 
 instead of recursively exploring the game tree, this can probably 
 be re-written to use Dijkstra's or A*.
+
+Update: I did re-write it to use A*! The game states are now
+explored with the general-purpose search function in my
+algorithms module, using a heuristic based on how far each
+ring is from its target peg. Running this file with --benchmark
+compares Dijkstra's and A* on the game tree.
 """
 
 import util
-import operator
+import sys
+
+from algorithms import search
 
 
 class Peg:
@@ -175,10 +183,6 @@ class GeneralHanoi:
                      Peg(1)]
         self.peg_size = peg_size
 
-        # We use this to cache the lists of possible moves
-        # for a given configuration of the pegs/rings.
-        self.moves_cache = {}
-
     def reachable(self, src, dst):
         """
         Check if a ring is reachable from the source ring to the
@@ -268,105 +272,110 @@ class GeneralHanoi:
         return all(p.done for p in self.pegs if not p.auxiliary)
 
     @property
-    def hash(self):
+    def state(self):
         """
-        Computes a string hash of the game state, which we use for
-        caching/memoization
+        Returns the state of the game (the rings in each peg)
+        as a tuple of tuples, which we use as the states
+        of the search.
         """
-        h = ""
-        for peg in self.pegs:
-            h += "".join(peg.rings)
-            h += "." * (peg.capacity - len(peg.rings))
-        return h
+        return tuple(tuple(peg.rings) for peg in self.pegs)
 
-    def solve(self, max_energy=None, memo=None):
+    def load(self, state):
         """
-        Find the solution with the lowest total energy.
-
-        Parameters:
-        - max_energy: the maximum energy we're willing to consume
-          (this is based off the best solution we've found
-          so far; no point exploring solutions that would have
-          higher energy)
-        - memo: A dictionary for memoization
-
-        Returns the minimum energy required to reach the
-        final state of the game.
+        Set the rings in each peg from a state (see the state property)
         """
+        for peg, rings in zip(self.pegs, state):
+            peg.rings = list(rings)
 
-        if memo is None:
-            memo = {}
+    def next_states(self, state):
+        """
+        Given a state, return all the states we can reach with
+        a single move, along with the energy required to make
+        that move.
+        """
+        self.load(state)
 
-        # Computing the hash is expensive(-ish), so let's
-        # do it only once.
-        hash = self.hash
+        next_states = []
+        for i, _ in enumerate(self.pegs):
+            for src, dst, energy, _ in self.possible_moves(i):
+                # Build the next state directly (instead of
+                # making the move, and then undoing it)
+                next_state = list(state)
+                next_state[src] = state[src][:-1]
+                next_state[dst] = state[dst] + state[src][-1:]
+                next_states.append((tuple(next_state), energy))
 
-        # Check if we can return a result from the memoization
-        # dictionary.
-        if hash in memo:
-            return memo[hash]
+        return next_states
 
-        # Base case: The game is done, and no energy is required
-        # to reach the final state.
-        if self.done:
-            return 0
+    def is_done(self, state):
+        """
+        Check if a state is the final state of the game
+        (if all the rings are in their target pegs)
+        """
+        for letter, target in GeneralHanoi.TARGET.items():
+            if state[target] != (letter,) * self.peg_size:
+                return False
+        return True
 
-        # Compute the next possible moves (potentially extracting
-        # them from the moves cache)
-        if hash in self.moves_cache:
-            all_moves = self.moves_cache[hash]
-        else:
-            all_moves = []
-            for i, _ in enumerate(self.pegs):
-                all_moves += self.possible_moves(i)
-
-            # Greedy optimization: start by checking the moves that
-            # move rings into their target pegs, followed by the moves
-            # in ascending cost
-            all_moves.sort(key=operator.itemgetter(2))
-            all_moves.sort(key=operator.itemgetter(3), reverse=True)
-            self.moves_cache[hash] = all_moves
-
-        if len(all_moves) == 0:
-            # Base case: No moves, we're stuck
-            memo[hash] = None
-            return None
-        else:
-            # Recursive case: we explore all possible next moves. Once we
-            # find a solution, we start skipping any path that would lead
-            # to a solution with higher energy.
-            
-            best_energy = None
-            for src, dst, energy, _ in all_moves:
-                # If this move exhausts the energy we have available
-                # (i.e., if it would have a higher cost than the best solution
-                # so far), we skip it
-                if max_energy is not None and max_energy - energy < 0:
+    def min_energy(self, state):
+        """
+        Heuristic for the search: a lower bound on the energy
+        required to reach the final state of the game.
+
+        Every ring that is not already settled at the bottom
+        of its target peg will have to:
+
+        - Move out of its current peg (if it's not an auxiliary
+          peg), which we know the exact cost of.
+        - Move along the hallway to its target peg (or, if it's
+          already in its target peg, move out of the way and
+          back, which takes at least two hallway steps)
+        - Move into one of the unsettled positions of its target
+          peg (we know the total cost of filling up those
+          positions, regardless of the order we fill them in)
+
+        Since every move pays for the hallway steps it takes,
+        this never overestimates the energy.
+        """
+        energy = 0
+        for letter, target in GeneralHanoi.TARGET.items():
+            rings = state[target]
+            settled = 0
+            while settled < len(rings) and rings[settled] == letter:
+                settled += 1
+
+            # Cost of moving into the unsettled positions
+            unsettled = self.peg_size - settled
+            energy += unsettled * (unsettled + 1) // 2 * GeneralHanoi.ENERGY[letter]
+
+        for i, rings in enumerate(state):
+            peg = self.pegs[i]
+            for j, letter in enumerate(rings):
+                target = GeneralHanoi.TARGET[letter]
+
+                if i == target and all(r == letter for r in rings[:j+1]):
+                    # Settled ring
                     continue
 
-                # Make the move, and make the recursive call
-                self.move(src, dst)
-                new_max_energy = max_energy - energy if max_energy is not None else None
-                next_energy = self.solve(new_max_energy, memo)
+                if not peg.auxiliary:
+                    energy += (self.peg_size - j) * GeneralHanoi.ENERGY[letter]
 
-                if next_energy is not None:
-                    total_energy = energy + next_energy
-                    if best_energy is None or total_energy < best_energy:
-                        # If we found a solution, and it's better than what we've
-                        # seen so far in this loop, update best_energy
-                        best_energy = total_energy
+                hallway_steps = abs(target - i) if i != target else 2
+                energy += hallway_steps * GeneralHanoi.ENERGY[letter]
 
-                    if max_energy is None or total_energy < max_energy:
-                        # If we found a solution, and it's better than anything
-                        # we've seen so far, update max_energy
-                        max_energy = total_energy
+        return energy
 
-                # Undo the move
-                self.move(dst, src)
+    def solve(self, use_heuristic=True):
+        """
+        Find the solution with the lowest total energy.
 
-            # Return solution (if any) and update the memoization dictionary
-            memo[hash] = best_energy
-            return best_energy
+        Returns the search result, which includes the minimum
+        energy required to reach the final state of the game
+        (as well as some statistics about the search)
+        """
+        return search(self.state, self.next_states, self.is_done,
+                      heuristic=self.min_energy if use_heuristic else None,
+                      track_paths=False)
 
     def __str__(self):
         return "\n".join(f"{i} {p}" for i, p in enumerate(self.pegs))
@@ -377,7 +386,7 @@ def task1(input):
     Task 1: Solve with pegs of size 2
     """
     hanoi = GeneralHanoi(input, peg_size=2)
-    return hanoi.solve()
+    return hanoi.solve().cost
 
 
 def task2(input):
@@ -385,12 +394,36 @@ def task2(input):
     Task 2: Solve with pegs of size 4
     """
     hanoi = GeneralHanoi(input, peg_size=4)
-    return hanoi.solve()
+    return hanoi.solve().cost
+
+
+def solve(input, peg_size, use_heuristic):
+    """
+    Helper function for the benchmark (returns the search result)
+    """
+    hanoi = GeneralHanoi(input, peg_size)
+    return hanoi.solve(use_heuristic)
+
+
+def benchmark(input1, input2):
+    """
+    Compare Dijkstra's and A* on both tasks (the search
+    result includes the number of expanded states and
+    heap pushes)
+    """
+    for input, peg_size in ((input1, 2), (input2, 4)):
+        util.call_and_time(solve, input, peg_size, False)
+        util.call_and_time(solve, input, peg_size, True)
 
 
 if __name__ == "__main__":
     util.set_debug(False)
 
+    if "--benchmark" in sys.argv:
+        benchmark([["B","B"],["C","A"],["D","A"],["C","D"]],
+                  [["B","D","D","B"],["C","B","C","A"],["D","A","B","A"],["C","C","A","D"]])
+        sys.exit(0)
+
     print("TASK 1")
     util.call_and_print(task1, [["A","B"],["D","C"],["C","B"],["A","D"]])
     util.call_and_print(task1, [["B","B"],["C","A"],["D","A"],["C","D"]])
@@ -26,61 +26,255 @@ process of producing a valid model number (which basically
 turned this into a code analysis problem). The code_analysis
 function explains how valid numbers can be deduced from the
 provided code.
+
+Update: The ALU program is now parsed and compiled once (into a
+Python function per digit), and can also run many model numbers
+at once with NumPy. The model numbers are now found with a general
+search over the blocks of the program (remembering the values of z
+that can't lead to a valid number), so we don't need to rely on
+the assumptions made by code_analysis (which is still used
+to double-check the solver in the benchmark).
 """
 
 import util
+import itertools
 import math
+import random
+import sys
 from functools import cached_property, lru_cache
 
+import numpy as np
+
 from util import log
 
-class ALU:
+def parse_program(program):
     """
-    Class for representing an ALU
+    Parse an ALU program into a list of (op, a, b) tuples, where b
+    is either a variable name, an integer, or None (for inp)
+    """
+    instructions = []
+    for inst in program:
+        tokens = inst.split()
+        op, a = tokens[0], tokens[1]
+        b = None
+        if len(tokens) == 3:
+            b = tokens[2] if tokens[2] in ALU.VARIABLES else int(tokens[2])
+        instructions.append((op, a, b))
+
+    return instructions
+
 
-    This is only used to validate whether a model number is valid
+def split_blocks(instructions):
     """
+    Split the instructions into blocks, one per inp instruction
+    (any instructions before the first inp are part of the
+    first block)
+    """
+    blocks = [[]]
+    for inst in instructions:
+        if inst[0] == "inp" and any(i[0] == "inp" for i in blocks[-1]):
+            blocks.append([])
+        blocks[-1].append(inst)
 
-    def __init__(self, program, input):
-        self.program = program
-        self.input = input[:]
-        self.vars = {"w":0, "x":0, "y":0, "z":0}
+    return blocks
 
-    def run(self):
-        """
-        Run the ALU program. Doesn't return anything, but
-        we can check the values of the variables after
-        calling this method.
-        """
-        for inst in self.program:
-            tokens = inst.split()
-            op = tokens[0]
-            a = tokens[1]
-            a_value = self.vars[a]
-
-            if len(tokens) == 3:
-                b = tokens[2]
-                if b in ("w", "x", "y", "z"):
-                    b_value = self.vars[b]
-                else:
-                    b_value = int(b)
+
+def trunc_div(a, b):
+    """
+    Integer division rounding towards zero (as the ALU does)
+    """
+    assert b != 0
+    if (a < 0) == (b < 0):
+        return a // b
+    return -(-a // b)
+
+
+def trunc_div_vectorized(a, b):
+    """
+    Integer division rounding towards zero, on NumPy arrays
+    """
+    return np.where((a < 0) == (b < 0), a // b, -(-a // b))
+
+
+def compile_block(block, vectorized=False):
+    """
+    Compile a block of instructions into a Python function that takes
+    the input digit and the values of w, x, y, z (as integers, or
+    as NumPy arrays if vectorized is True), and returns the new
+    values of w, x, y, z.
+
+    Unlike the original ALU, this doesn't check for invalid
+    divisions or modulos.
+    """
+    lines = []
+    for op, a, b in block:
+        if op == "inp":
+            lines.append(f"{a} = digit")
+        elif op == "add":
+            lines.append(f"{a} = {a} + {b}")
+        elif op == "mul" and b == 0:
+            lines.append(f"{a} = 0")
+        elif op == "mul":
+            lines.append(f"{a} = {a} * {b}")
+        elif op == "div" and b != 1:
+            lines.append(f"{a} = div({a}, {b})")
+        elif op == "mod":
+            lines.append(f"{a} = {a} % {b}")
+        elif op == "eql":
+            lines.append(f"{a} = 1 * ({a} == {b})")
+
+    source = "def block(digit, w, x, y, z):\n"
+    source += "".join(f"    {line}\n" for line in lines)
+    source += "    return w, x, y, z\n"
+
+    namespace = {"div": trunc_div_vectorized if vectorized else trunc_div}
+    exec(source, namespace)
+
+    return namespace["block"]
+
+
+def live_variables(blocks):
+    """
+    Find which variables each block actually depends on (i.e., which
+    variables are read before they are written in that block, or
+    in later blocks). Since we only check z at the end of the
+    program, for MONAD programs this is just z.
+
+    Returns a list of tuples of variable indexes (in ALU.VARIABLES)
+    """
+    live = {"z"}
+    result = []
+
+    for block in reversed(blocks):
+        for op, a, b in reversed(block):
+            if a not in live:
+                # The result of this instruction is never used
+                continue
+            if op == "inp" or (op == "mul" and b == 0):
+                live.discard(a)
+            elif isinstance(b, str):
+                live.add(b)
+        result.append(tuple(i for i, v in enumerate(ALU.VARIABLES) if v in live))
+
+    return result[::-1]
+
+
+def mul_intervals(a, b):
+    """
+    Multiply two (lo, hi) intervals (where the bounds can be infinite)
+    """
+    products = [0 if 0 in (x, y) else x * y for x in a for y in b]
+    return (min(products), max(products))
+
+
+def z_bounds(blocks):
+    """
+    Find, for each block, a bound on z such that, if z is at least
+    that bound before the block, it can't be zero at the end of the
+    program (or math.inf, if we can't prove such a bound exists).
+
+    If z can only be modified by dividing it by a positive constant,
+    multiplying it by a value >= 1, or adding a value >= 0, then
+    z can't shrink faster than by dividing it by the product
+    of all the divisors in the remaining blocks. We check this
+    by tracking the range of values of every variable through the
+    whole program. This only works if z is never negative, so if
+    we can't prove that at the start of every block, there is no bound.
+    """
+    intervals = {"w": (0, 0), "x": (0, 0), "y": (0, 0), "z": (0, 0)}
+    divisors = []
+
+    for block in blocks:
+        if intervals["z"][0] < 0:
+            return [math.inf] * len(blocks)
+
+        divisor = 1
+        for op, a, b in block:
+            ia = intervals[a]
+            ib = intervals[b] if isinstance(b, str) else (b, b)
 
             if op == "inp":
-                input = int(self.input.pop(0))
-                self.vars[a] = input
+                result = (1, 9)
             elif op == "add":
-                self.vars[a] = a_value + b_value
+                result = (ia[0] + ib[0], ia[1] + ib[1])
             elif op == "mul":
-                self.vars[a] = a_value * b_value
-            elif op == "div":
-                assert b_value != 0
-                self.vars[a] = a_value // b_value
-            elif op == "mod":
-                assert a_value >= 0
-                assert b_value > 0
-                self.vars[a] = a_value % b_value
+                result = mul_intervals(ia, ib)
+            elif op == "div" and ib[0] == ib[1] and ib[0] > 0 and ia[0] >= 0:
+                result = (ia[0] // ib[0], ia[1] // ib[0])
+            elif op == "mod" and ib[0] == ib[1] and ib[0] > 0:
+                result = (0, min(ia[1], ib[0] - 1))
             elif op == "eql":
-                self.vars[a] = 1 if a_value == b_value else 0
+                result = (0, 1)
+            else:
+                result = (-math.inf, math.inf)
+            intervals[a] = result
+
+            if a != "z" or divisor is None:
+                continue
+            if op == "div" and ib[0] == ib[1] and ib[0] > 0:
+                divisor *= ib[0]
+            elif not ((op == "mul" and ib[0] >= 1) or (op == "add" and ib[0] >= 0)):
+                divisor = None
+
+        divisors.append(divisor)
+
+    bounds = []
+    bound = 1
+    for divisor in reversed(divisors):
+        bound = math.inf if divisor is None else bound * divisor
+        bounds.append(bound)
+
+    return bounds[::-1]
+
+
+class ALU:
+    """
+    Class for representing an ALU
+
+    The program is parsed and compiled once (into one Python
+    function per input digit), and can then be run on as many
+    inputs as we want, either one at a time (run) or many at
+    once, using NumPy (run_batch)
+    """
+
+    VARIABLES = ("w", "x", "y", "z")
+
+    def __init__(self, program):
+        self.blocks = split_blocks(parse_program(program))
+        self.functions = [compile_block(block) for block in self.blocks]
+        self.vectorized = [compile_block(block, vectorized=True) for block in self.blocks]
+        self.live = live_variables(self.blocks)
+        self.z_bounds = z_bounds(self.blocks)
+        self.vars = dict.fromkeys(ALU.VARIABLES, 0)
+
+    def run(self, input):
+        """
+        Run the ALU program on a list of digits, and return the values
+        of the variables (which we can also check in self.vars)
+        """
+        assert len(input) == len(self.functions)
+        values = (0, 0, 0, 0)
+        for fn, digit in zip(self.functions, input):
+            values = fn(digit, *values)
+
+        self.vars = dict(zip(ALU.VARIABLES, values))
+        return self.vars
+
+    def run_batch(self, inputs):
+        """
+        Run the ALU program on many inputs at once. Takes a 2D array
+        with one row per input (and one column per digit), and returns
+        the values of the variables as a dictionary of arrays
+        """
+        inputs = np.asarray(inputs, dtype=np.int64)
+        assert inputs.shape[1] == len(self.vectorized)
+        zeros = np.zeros(inputs.shape[0], dtype=np.int64)
+        values = (zeros, zeros, zeros, zeros)
+        for i, fn in enumerate(self.vectorized):
+            values = fn(inputs[:, i], *values)
+
+        return {v: np.broadcast_to(values[i], zeros.shape)
+                for i, v in enumerate(ALU.VARIABLES)}
 
 
 def code_analysis(program):
@@ -171,13 +365,13 @@ def validate(program, model_number):
     program.
     """
     digits = [int(c) for c in str(model_number)]
-    alu = ALU(program, digits)
-    alu.run()
+    alu = ALU(program)
+    alu.run(digits)
 
     return alu.vars["z"] == 0
 
 
-def solve(program, target_digit):
+def solve_by_analysis(program, target_digit):
     """
     Solve the problem for a given target digit (i.e., we want as many
     of the digits to be equal to that target)
@@ -195,13 +389,167 @@ def solve(program, target_digit):
     return model_number
 
 
+def valid_model_numbers(program, digits=range(9, 0, -1)):
+    """
+    Generate all the valid model numbers (with the digits tried in
+    the given order, so the default order produces them from
+    largest to smallest), without making any assumptions
+    about the program.
+
+    This is a depth-first search over the blocks of the program
+    (one per digit), where the state before each block is the
+    value of the variables it depends on (i.e., just z for MONAD
+    programs). Whenever we find a state, at a given block, from
+    which no valid model number can be reached, we remember it,
+    so we never explore it again. We also skip any states where
+    z is too large to ever get back to zero (see z_bounds)
+    """
+    alu = ALU(program)
+    functions = alu.functions
+    live = alu.live
+    bounds = alu.z_bounds
+    last = len(functions) - 1
+    dead = [set() for _ in functions]
+
+    def search(i, values):
+        if values[3] >= bounds[i]:
+            return
+
+        key = tuple(values[v] for v in live[i])
+        if key in dead[i]:
+            return
+
+        found = False
+        fn = functions[i]
+        for digit in digits:
+            new_values = fn(digit, *values)
+            if i == last:
+                if new_values[3] == 0:
+                    found = True
+                    yield (digit,)
+            else:
+                for suffix in search(i + 1, new_values):
+                    found = True
+                    yield (digit,) + suffix
+
+        if not found:
+            dead[i].add(key)
+
+    for model_number in search(0, (0, 0, 0, 0)):
+        yield "".join(str(d) for d in model_number)
+
+
+def solve(program, largest=True):
+    """
+    Find the largest (or smallest) valid model number
+    """
+    digits = range(9, 0, -1) if largest else range(1, 10)
+    model_number = next(valid_model_numbers(program, digits))
+
+    assert validate(program, model_number)
+
+    return model_number
+
+
+def synthetic_monad(seed=2021):
+    """
+    Generate a random program with the same structure as
+    the MONAD programs in the actual inputs
+    """
+    rng = random.Random(seed)
+
+    # Pair up the 14 digits like balanced parentheses, where the
+    # first digit in each pair pushes a value onto the "stack",
+    # and the second one checks it and pops it
+    params = [None] * 14
+    stack = []
+    for i in range(14):
+        if len(stack) < 14 - i and (len(stack) == 0 or rng.random() < 0.5):
+            stack.append(i)
+            params[i] = (1, rng.randint(10, 16), rng.randint(1, 16))
+        else:
+            j = stack.pop()
+            c = params[j][2]
+            params[i] = (26, -rng.randint(max(c - 8, 0), c + 8) , rng.randint(1, 16))
+
+    program = []
+    for a, b, c in params:
+        program += ["inp w", "mul x 0", "add x z", "mod x 26", f"div z {a}",
+                    f"add x {b}", "eql x w", "eql x 0", "mul y 0", "add y 25",
+                    "mul y x", "add y 1", "mul z y", "mul y 0", "add y w",
+                    f"add y {c}", "mul y x", "add z y"]
+
+    return program
+
+
+# Program where z is negative between blocks (and every model number
+# is valid), which z_bounds must not use to prune anything
+NEGATIVE_Z_PROGRAM = ["inp w", "add z -20", "add y z",
+                      "inp w", "mul y 0", "add y z", "div y 1", "mul z 0", "add z 100",
+                      "inp w", "add z y", "add z y", "add z y", "add z y", "add z y"]
+
+# Program with a div z after a z update that z_bounds can't bound
+# (which must give up on that block instead of crashing)
+NON_MONOTONE_Z_PROGRAM = ["inp w", "add z -1", "div z 2",
+                          "inp w", "add z w", "div z 2",
+                          "inp w", "add z w", "add z -5", "div z 3"]
+
+
+def check_solver(program, n_digits):
+    """
+    Check that valid_model_numbers finds exactly the same model
+    numbers as trying every possible model number
+    """
+    expected = ["".join(map(str, digits))
+                for digits in itertools.product(range(9, 0, -1), repeat=n_digits)
+                if ALU(program).run(list(digits))["z"] == 0]
+
+    return list(valid_model_numbers(program)) == expected
+
+
+def benchmark(program):
+    """
+    Time the compiled ALU (one model number at a time, and in
+    batches) and the solver on a program
+    """
+    alu = ALU(program)
+    rng = np.random.default_rng(2021)
+    inputs = rng.integers(1, 10, size=(100_000, len(alu.functions)))
+
+    def run_one_at_a_time(inputs):
+        return [alu.run(row)["z"] for row in inputs.tolist()]
+
+    def run_batch(inputs):
+        return alu.run_batch(inputs)["z"].tolist()
+
+    def checksum(fn, inputs):
+        return sum(z % 1_000_003 for z in fn(inputs))
+
+    assert util.call_and_time(checksum, run_one_at_a_time, inputs) == \
+           util.call_and_time(checksum, run_batch, inputs)
+
+    largest = util.call_and_time(solve, program, True)
+    smallest = util.call_and_time(solve, program, False)
+    assert largest == solve_by_analysis(program, 9)
+    assert smallest == solve_by_analysis(program, 1)
+
+
 if __name__ == "__main__":
     util.set_debug(False)
 
+    if "--check" in sys.argv:
+        util.call_and_print(check_solver, NEGATIVE_Z_PROGRAM, 3)
+        util.call_and_print(check_solver, NON_MONOTONE_Z_PROGRAM, 3)
+        sys.exit(0)
+
+    if "--benchmark" in sys.argv:
+        benchmark(synthetic_monad())
+        sys.exit(0)
+
     input = util.read_strs("input/24.in", sep="\n")
 
     print("TASK 1")
-    util.call_and_print(solve, input, 9)
+    util.call_and_print(solve, input, True)
 
     print("TASK 2")
-    util.call_and_print(solve, input, 1)
+    util.call_and_print(solve, input, False)
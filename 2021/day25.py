@@ -7,63 +7,58 @@ https://adventofcode.com/2021/day/25
 
 Well, it's over! As usual, the last problem was a bit of a gimme,
 but still challenging enough to make it fun.
+
+Update: The simulation now moves each herd all at once, by
+shifting the whole grid (as a NumPy array) instead of
+checking one position at a time.
 """
 
 import util
 
-def half_step(grid, herd):
+import numpy as np
+
+from grid import Grid, shift
+
+
+def half_step(cucumbers, herd, direction):
     """
-    Update the grid for just one herd
+    Update the grid (as a NumPy array) for just one herd.
+
+    All the sea cucumbers in the herd move at once: the ones
+    that can move are the ones with an empty position in
+    front of them (wrapping around the edges of the grid).
     """
-    new_grid = util.Grid.empty(grid.max_x, grid.max_y, ".")
-
-    moves = 0    
-    for x in range(grid.max_x):
-        for y in range(grid.max_y):
-            if herd == ">" and grid.get(x, y) == ">":
-                next_x = 0 if x + 1 == grid.max_x else x + 1
-                if grid.get(next_x, y) == ".":
-                    moves += 1
-                    new_grid.set(x, y, ".")
-                    new_grid.set(next_x, y, ">")
-                else:
-                    new_grid.set(x,y,">")
-            elif herd == "v" and grid.get(x, y) == "v":
-                next_y = 0 if y + 1 == grid.max_y else y + 1
-                if grid.get(x, next_y) == ".":
-                    moves += 1
-                    new_grid.set(x, y, ".")
-                    new_grid.set(x, next_y, "v")                    
-                else:
-                    new_grid.set(x,y,"v")
-            elif herd == ">" and grid.get(x,y) == "v":
-                new_grid.set(x,y,"v")
-            elif herd == "v" and grid.get(x,y) == ">":
-                new_grid.set(x,y,">")
-
-    return new_grid, moves
-
-
-def step(grid):
+    dr, dc = direction
+
+    moving = (cucumbers == herd) & (shift(cucumbers, dr, dc, "wrap") == ".")
+    new_cucumbers = cucumbers.copy()
+    new_cucumbers[moving] = "."
+    new_cucumbers[shift(moving, -dr, -dc, "wrap")] = herd
+
+    return new_cucumbers, int(np.count_nonzero(moving))
+
+
+def step(cucumbers):
     """
     Do a full step of the simulation (update the grid with
     both herds)
     """
-    grid, moves1 = half_step(grid, ">")
-    grid, moves2 = half_step(grid, "v")
+    cucumbers, moves1 = half_step(cucumbers, ">", Grid.RIGHT)
+    cucumbers, moves2 = half_step(cucumbers, "v", Grid.DOWN)
 
-    return grid, moves1 + moves2
+    return cucumbers, moves1 + moves2
 
 
 def solve(grid):
     """
     Find the step number when no moves take place.
     """
+    cucumbers = grid.to_array()
     num_steps = 1
-    
+
     while True:
-        grid, moves = step(grid)
-        
+        cucumbers, moves = step(cucumbers)
+
         if moves == 0:
             return num_steps
         num_steps += 1
@@ -72,8 +67,8 @@ def solve(grid):
 if __name__ == "__main__":
     util.set_debug(False)
 
-    sample = util.Grid.from_file("input/sample/25.in")
-    input = util.Grid.from_file("input/25.in")
+    sample = Grid.from_file("input/sample/25.in", storage="bytes")
+    input = Grid.from_file("input/25.in", storage="bytes")
 
     print("TASK 1")
     util.call_and_print(solve, sample)
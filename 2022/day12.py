@@ -15,6 +15,11 @@ sat down and wrote down some common algorithms for Advent of
 Code. So, instead of having to spend a bunch of time reviewing
 (and re-coding) Breadth-First Search, I was just able to copy-paste
 my implementation in algorithms.py, and use that as a starting point.
+
+Update: Instead of copy-pasting, this now uses the general-purpose
+search function in algorithms.py. Part 2 also runs a single search
+from all the possible starting points (instead of one search per
+starting point).
 """
 
 import util
@@ -23,69 +28,52 @@ import sys
 import re
 
 from util import log
+from grid import Grid
+from algorithms import search
 
-def climb(grid, start_x, start_y):
-    """
-    Starting at (start_x, start_y) find the shortest path to
-    the location of the grid containing an "E". We only
-    return the distance, not the actual path.
 
-    This function uses breadth-first search, adapted from
-    the grid_bfs function in my algorithms.py module
+def elevation(grid, r, c):
     """
+    Return the elevation at (r, c), taking into account
+    that the start ("S") and end ("E") have elevations
+    "a" and "z", respectively.
+    """
+    v = grid.get(r, c)
+    if v == "S":
+        return ord("a")
+    elif v == "E":
+        return ord("z")
+    else:
+        return ord(v)
 
-    # Queue
-    q = []
-    q.append((start_x,start_y))
-
-    # Set of visited locations
-    visited = {(start_x,start_y)}
-
-    # Distance and previous-location dictionaries
-    dist = {}
-    dist[(start_x,start_y)] = 0
-    target = None
-
-    # Ye olde BFS loop
-    while len(q) > 0:
-        cur = q.pop(0)
-
-        cx, cy = cur
-
-        cur_elev = grid.get(cx, cy)
 
-        # Adjust if we're at the start
-        if cur_elev == "S":
-            cur_elev = "a"
+def climb(grid, starts):
+    """
+    Starting at any of the given (row, col) locations, find the
+    shortest path to the location of the grid containing an "E".
+    We only return the distance, not the actual path.
 
-        # Check if we've reached the target
-        if cur_elev == "E":
-            target = cur
-            break
+    This function uses the general-purpose search function in my
+    algorithms.py module (with all moves having a cost of 1, which
+    makes it a breadth-first search)
+    """
 
-        # Check the neighbors
-        for dx, dy in util.Grid.CARDINAL_DIRS:
-            neigh = cx+dx, cy+dy
-            nx, ny = neigh
-            if grid.valid(nx, ny) and neigh not in visited:
-                neigh_elev = grid.get(nx, ny)
+    def neighbors(pos):
+        r, c = pos
+        cur_elev = elevation(grid, r, c)
+        for dr, dc in Grid.CARDINAL_DIRS:
+            nr, nc = r+dr, c+dc
+            if grid.valid(nr, nc) and elevation(grid, nr, nc) <= cur_elev + 1:
+                yield (nr, nc), 1
 
-                # Adjust if we're at the target
-                if neigh_elev == "E":
-                    neigh_elev = "z"
+    def is_target(pos):
+        return grid.get(*pos) == "E"
 
-                if ord('a') <= ord(neigh_elev) <= ord(cur_elev) + 1:
-                    visited.add(neigh)
-                    dist[neigh] = dist[cur] + 1
-                    q.append(neigh)
-    
+    result = search(starts, neighbors, is_target,
+                    multi_source=True, track_paths=False)
 
-    if target is None:
-        # If there was no path to the target, return None
-        return None
-    else:
-        # Otherwise, return the number of steps
-        return dist[target]
+    # If there was no path to the target, this will be None
+    return result.cost
 
 
 def task1(grid):
@@ -94,49 +82,31 @@ def task1(grid):
     """
 
     # Find the starting position
-    start = None
-    for x in range(0, grid.max_x):
-        for y in range(0, grid.max_y):
-            if grid.get(x, y) == "S":
-                start = (x, y)
-                break
-        if start is not None: break
-        
-    # Find the number of steps
-    sx, sy = start
-    steps = climb(grid, sx, sy)
+    start = grid.find_value("S")
 
-    return steps
+    # Find the number of steps
+    return climb(grid, [start])
 
 
 def task2(grid):
     """
     Find the shortest path starting from multiple possible locations
+
+    Instead of searching from each possible starting point,
+    we do a single search starting from all of them at once.
     """
 
     # Find all the possible starting points
-    starts = set()
-    for x in range(0, grid.max_x):
-        for y in range(0, grid.max_y):
-            if grid.get(x, y) in ("S", "a"):
-                starts.add((x,y))
-
-    # Find all the paths
-    path_lengths = set()
-    for x, y in starts:
-        steps = climb(grid, x, y)
-        if steps is not None:
-            path_lengths.add(steps)
+    starts = [(r, c) for r, c, v in grid.items() if v in ("S", "a")]
 
-    # Return the shortest path
-    return min(path_lengths)
+    return climb(grid, starts)
 
 
 if __name__ == "__main__":
     util.set_debug(False)
 
-    sample = util.Grid.from_file("input/sample/12.in")
-    input = util.Grid.from_file("input/12.in")
+    sample = Grid.from_file("input/sample/12.in")
+    input = Grid.from_file("input/12.in")
 
     print("TASK 1")
     util.call_and_print(task1, sample)
@@ -44,6 +44,14 @@ problem space:
 My solution still takes 30-40 seconds to run, which I suspect I could
 improve if I used bitfields to keep track of the remaining/open
 valves, instead of using sets.
+
+Update: I did switch to bitfields, and also changed the approach
+a bit: instead of searching for the best path for every possible
+set of valves, we explore all the paths once, and keep track
+of the best pressure for each set of open valves. For Part 2, we
+then just need to find the best pair of disjoint sets (which we
+can do efficiently with some dynamic programming). Both parts
+now run in well under a second.
 """
 
 import util
@@ -51,6 +59,8 @@ import math
 import sys
 import re
 
+import numpy as np
+
 
 class Valve:
     """
@@ -182,109 +192,106 @@ def parse_input(input):
     return valves
 
 
-def find_path(graph, cur_node, remaining_valves, open_valves, time):
+def best_pressures(graph, time):
     """
-    Recursively explore all the paths starting at cur_node that take
-    "time" minutes or less (where following an edge reduces the time by the
-    weight of the edge), and return the path with the highest
-    score (i.e., highest pressure)    
+    Explore all the paths starting at AA that take "time" minutes
+    or less, and find the highest pressure we can release for
+    every possible set of open valves.
+
+    We index the valves (other than AA) from 0 to n-1, so a set
+    of open valves can be represented as a bitmask (where bit i
+    is set if valve i is open). Instead of keeping track of the
+    total flow rate as we go along, we add up the pressure each
+    valve will release from the moment it is opened until
+    the time runs out.
+
+    Returns a NumPy array of size 2^n, where element i is the
+    highest pressure we can release by opening exactly the
+    valves in bitmask i (or zero if that set of valves
+    can't be opened in time)
     """
+    names = [name for name in graph if name != "AA"]
+    n = len(names)
 
-    # Open the valve at the current node
-    remaining_valves = remaining_valves - {cur_node}
-    open_valves = open_valves | {cur_node}
+    flow = [graph[name].flow_rate for name in names]
+    dist = [[graph[v1].dist[v2] for v2 in names] for v1 in names]
+    start_dist = [graph["AA"].dist[v] for v in names]
 
-    # Compute the total pressure from all the open valves
-    pressure = 0
-    for ov in open_valves:
-        pressure += graph[ov].flow_rate
-        
-    # If there's no more valves left to explore, we can
-    # just compute the total pressure for the remaining time
-    if len(remaining_valves) == 0:
-        return [cur_node], pressure * time
-
-    # Explore the paths starting with each of the remaining valves.
-    best_path = []
-    best_score = pressure * time
-    for r in remaining_valves:
-        dist = graph[cur_node].dist[r]
-        if time - dist <= 1:
-            continue
-        tpres = (dist + 1) * pressure
-        rpath, score = find_path(graph, r, remaining_valves, open_valves, time-dist-1)
-        if tpres + score > best_score:
-            best_score = tpres + score
-            best_path = rpath
+    best = [0] * (1 << n)
 
-    # Return the best path and score
-    return [cur_node] + best_path, best_score
+    def explore(cur, open_valves, time_left, pressure):
+        if pressure > best[open_valves]:
+            best[open_valves] = pressure
 
+        cur_dist = dist[cur]
+        for valve in range(n):
+            bit = 1 << valve
+            if open_valves & bit:
+                continue
 
-def task1(graph):
-    """
-    Task 1: Find the best path starting at AA, with a time limit of 30
-    """
-    remaining_valves = set(graph.keys())
-    remaining_valves.remove("AA")
+            # Time left after moving to the valve and opening it
+            t = time_left - cur_dist[valve] - 1
+            if t <= 0:
+                continue
 
-    path, score = find_path(graph, "AA", remaining_valves, set(), 30)
+            explore(valve, open_valves | bit, t, pressure + flow[valve] * t)
 
-    return score
-    
+    for valve in range(n):
+        t = time - start_dist[valve] - 1
+        if t > 0:
+            explore(valve, 1 << valve, t, flow[valve] * t)
 
-def task2(graph):
+    return np.array(best, dtype=np.int64)
+
+
+def best_subset_pressures(best):
     """
-    Task 2: Divide the valves into all possible pairs of disjoint
-    sets. For each pair, find the best score for each set (one for
-    the player, another for the elephant). Add them together, and
-    returning the maximum.
+    Given the array returned by best_pressures, compute an array
+    where element i is the highest pressure we can release by
+    opening any *subset* of the valves in bitmask i.
+
+    This uses the "sum over subsets" dynamic programming
+    technique (with max instead of sum): after processing bit k,
+    element i contains the best pressure of all the bitmasks that
+    match i except (possibly) in bits 0..k being unset. We process
+    every bit at once with NumPy, by reshaping the array so that
+    the bitmasks with bit k unset/set are in separate columns.
     """
-    remaining_valves = list(graph.keys())
-    remaining_valves.remove("AA")
-
-    # The way we compute the disjoint sets, we're always
-    # going to end up computing the same pair of subsets twice
-    # (flipping whether they're assigned to the player or the elephant)
-    # So, we keep track of the scores we've already computed.
-    memo = {}
-
-    best_score = 0
-
-    # We compute the disjoint sets by essentially using a bitfield
-    # where 0 assigns a valve to the player and 1 to the elephant
-    # (and we iterate through all values from 0 to 2^valves)
-    for i in range(0, 2**len(remaining_valves)):
-        s = f"{i:b}".rjust(len(remaining_valves), "0")
-        player = set()
-        elephant = set()
-        for incl, valve in zip(s, remaining_valves):
-            if incl == "0":
-                player.add(valve)
-            else:
-                elephant.add(valve)
+    best = best.copy()
+    n = best.size.bit_length() - 1
 
-        player = frozenset(player)
-        elephant = frozenset(elephant)
+    for k in range(n):
+        view = best.reshape(-1, 2, 1 << k)
+        np.maximum(view[:, 1, :], view[:, 0, :], out=view[:, 1, :])
 
-        if player in memo:
-            path1, score1 = memo[player]
-        else:
-            path1, score1 = find_path(graph, "AA", set(player), set(), 26)
-            memo[player] = (path1, score1)
+    return best
 
-        if elephant in memo:
-            path2, score2 = memo[elephant]
-        else:
-            path2, score2 = find_path(graph, "AA", set(elephant), set(), 26)
-            memo[elephant] = (path2, score2)
 
-        score = score1 + score2
+def task1(graph):
+    """
+    Task 1: Find the best path starting at AA, with a time limit of 30
+    """
+    return int(best_pressures(graph, 30).max())
+    
 
-        if score > best_score:
-            best_score = score
+def task2(graph):
+    """
+    Task 2: The player and the elephant will never open the same
+    valves, so we need to find the pair of disjoint sets of valves
+    with the highest combined pressure (one set for the player and
+    another for the elephant).
+
+    Since any set of valves the player doesn't open could be opened
+    by the elephant, we can just check every bitmask i, and combine
+    the best pressure for any subset of i (for the player) with the
+    best pressure for any subset of its complement (for the elephant).
+    Conveniently, if the array has 2^n elements, the complement of
+    i is at position 2^n - 1 - i, so we just need to reverse
+    the array.
+    """
+    best = best_subset_pressures(best_pressures(graph, 26))
 
-    return best_score
+    return int((best + best[::-1]).max())
 
 
 if __name__ == "__main__":
@@ -21,6 +21,21 @@ it turned out the rocks actually grow by the same amount
 each cycle. I ended up using that information to manually
 compute the answer, but I'll eventually get around
 to adding code that finds out that value automatically.
+
+Update: I eventually got around to it! The game is now
+simulated with the general-purpose detect_cycle function
+(in aoc.algorithms), using the index of the next piece,
+the index of the next move, and the shape of the top rows
+of the tower as a "fingerprint" of the state of the game.
+Once we see the same fingerprint twice, we know the tower
+will keep growing by the same amount every cycle, so we can
+extrapolate its height after any number of pieces.
+
+I also replaced the Grid (and drawing/undrawing the pieces
+one cell at a time) with a chamber where each row is a 7-bit
+integer, and each piece is a list of row bitmasks. Checking
+for collisions is then just a bitwise AND, and the chamber
+only grows as high as the tower of rocks.
 """
 
 import util
@@ -29,11 +44,20 @@ import sys
 import re
 
 from util import log
+from algorithms import detect_cycle
 
 
 class Tetris:
     """
     Class for keeping track of a Tetris game
+
+    The chamber is stored as a bytearray of rows (from the
+    bottom up), where each row is a bitmask of the cells that
+    are occupied by rocks (the leftmost column is the most
+    significant bit). Pieces are also stored as lists of row
+    bitmasks, so checking whether a piece collides with the
+    rocks is just a bitwise AND, and settling a piece is
+    just a bitwise OR.
     """
 
     PIECE1 = [["#", "#", "#", "#"]]
@@ -56,213 +80,187 @@ class Tetris:
 
     PIECES=[PIECE1, PIECE2, PIECE3, PIECE4, PIECE5]
 
+    # Number of rows at the top of the tower we use
+    # as a fingerprint of the state of the game
+    FINGERPRINT_ROWS = 30
 
-    def __init__(self, width, height):
+    def __init__(self, width, moves):
         """
         Constructor
         """
-        # Create an empty Grid to represent the game
-        # Note: in my Grid class, the upper-left corner
-        # is position (0,0).
-        self.grid = util.Grid.empty(width, height+1, ".")
-        self.height = height
+        assert width <= 8, "Each row must fit in a byte"
         self.width = width
 
-        # The tallest rock (initially the ground)
-        self.tallest_y = height+1
+        # The rows of the chamber, from the bottom up. We only
+        # add rows when a piece settles on them, so the number
+        # of rows is the height of the tower.
+        self.chamber = bytearray()
+
+        # Masks for the left and right walls
+        self.left_wall = 1 << (width - 1)
+        self.right_wall = 1
+
+        # The pieces as lists of row bitmasks (from the bottom
+        # up), already placed two units away from the left wall.
+        self.piece_masks = [self.to_masks(piece, 2) for piece in Tetris.PIECES]
 
         # Index into the PIECES array
         self.piece_i = 0
 
-        # The current piece (the piece that is currently
-        # falling)
-        self.cur_piece = None
+        # The left/right movements, and the index of the next one
+        self.moves = moves
+        self.moves_i = 0
 
-    def new_piece(self):
+    def to_masks(self, pattern, x):
         """
-        Start dropping a new piece.
+        Converts a piece pattern into a list of row bitmasks (from
+        the bottom up), with its left edge at column x
         """
-        assert self.cur_piece is None
-
-        # Compute initial coordinates
-        piece_y = self.tallest_y - 3 - len(Tetris.PIECES[self.piece_i])
-        piece_x = 2
+        masks = []
+        for row in reversed(pattern):
+            mask = 0
+            for i, c in enumerate(row):
+                if c == "#":
+                    mask |= 1 << (self.width - 1 - (x + i))
+            masks.append(mask)
+        return masks
 
-        # Create the Piece object
-        p = Piece(self, Tetris.PIECES[self.piece_i], piece_x, piece_y)
-        self.cur_piece = p
-        self.piece_i = (self.piece_i + 1) % len(Tetris.PIECES)
+    @property
+    def tower_height(self):
+        """
+        Height of the tower of rocks
+        """
+        return len(self.chamber)
 
-        # Draw it into the grid
-        p.draw()
+    def fingerprint(self):
+        """
+        Returns a fingerprint of the state of the game: the next
+        piece, the next move, and the top rows of the tower.
+        """
+        return self.piece_i, self.moves_i, bytes(self.chamber[-Tetris.FINGERPRINT_ROWS:])
 
-    def move_piece(self, move):
+    def collides(self, masks, y):
         """
-        Moves a piece left ("<"), right (">"), or down ("v")
+        Checks whether a piece (given as row bitmasks) with
+        its bottom row at row y collides with the rocks
+        (or the floor)
         """
-        x = self.cur_piece.x
-        y = self.cur_piece.y
-
-        # Compute the updated coordinates, but don't
-        # change the piece yet
-        if move == "<":
-            x -= 1
-        elif move == ">":
-            x += 1
-        elif move == "v":
-            y += 1
-
-        # Let's make sure this move is valid
-        if not self.cur_piece.validate(x, y):
-            return False
-        else:
-            # If it is, "undraw" the piece from its current
-            # location, and draw it in the new location.
-            self.cur_piece.undraw()
-            self.cur_piece.x = x
-            self.cur_piece.y = y
-            self.cur_piece.draw()
+        if y < 0:
             return True
 
-    def stop_piece(self):
+        chamber = self.chamber
+        n_rows = len(chamber)
+        for i, mask in enumerate(masks):
+            if y + i >= n_rows:
+                break
+            if chamber[y + i] & mask:
+                return True
+        return False
+
+    def settle(self, masks, y):
         """
-        Update the state of the game to reflect that the current
-        piece has come to a stop.
+        Adds a piece (given as row bitmasks) with its
+        bottom row at row y to the rocks
         """
-        self.cur_piece.stopped = True
-        self.cur_piece.draw()
-        self.tallest_y = min(self.cur_piece.y, self.tallest_y)
-        self.cur_piece = None
-
-    def play_game(self, n_pieces, moves):
+        chamber = self.chamber
+        for i, mask in enumerate(masks):
+            if y + i < len(chamber):
+                chamber[y + i] |= mask
+            else:
+                chamber.append(mask)
+
+    def drop_piece(self):
         """
-        Play one game of Tetris
+        Drop a new piece, and move it until it stops
         """
-        moves_i = 0
+        masks = self.piece_masks[self.piece_i]
+        self.piece_i = (self.piece_i + 1) % len(self.piece_masks)
+
+        # The bottom edge of the piece starts three
+        # units above the highest rock
+        y = len(self.chamber) + 3
+
+        # Keep moving it until it stops
+        while True:
+            # Move the piece left/right according
+            # to the provided movements (if it doesn't
+            # hit a wall or a rock)
+            next_move = self.moves[self.moves_i]
+            self.moves_i = (self.moves_i + 1) % len(self.moves)
+            if next_move == "<":
+                if not any(mask & self.left_wall for mask in masks):
+                    moved = [mask << 1 for mask in masks]
+                    if not self.collides(moved, y):
+                        masks = moved
+            elif next_move == ">":
+                if not any(mask & self.right_wall for mask in masks):
+                    moved = [mask >> 1 for mask in masks]
+                    if not self.collides(moved, y):
+                        masks = moved
+
+            # Move the piece down. If it doesn't move,
+            # we're done with this piece
+            if self.collides(masks, y - 1):
+                self.settle(masks, y)
+                break
+            y -= 1
+
+        return self
+
+    def play_game(self, n_pieces):
+        """
+        Play one game of Tetris, and return the height
+        of the tower after n_pieces pieces.
 
-        for _ in range(n_pieces):
-            # Drop a new piece
-            self.new_piece()
+        We stop simulating the game as soon as it starts
+        repeating itself, and extrapolate the height from there.
+        """
+        cycle = detect_cycle(Tetris.fingerprint, Tetris.drop_piece, self,
+                             value_fn=lambda t: t.tower_height,
+                             max_steps=n_pieces)
 
-            # Keep moving it until it stops
-            while True:
-                # Move the piece left/right according
-                # to the provided movements
-                next_move = moves[moves_i]
-                moves_i = (moves_i + 1) % len(moves)
-                self.move_piece(next_move)
+        if cycle is None:
+            # We simulated all the pieces without
+            # finding a cycle
+            return self.tower_height
 
-                # Move the piece down. If it doesn't move,
-                # we're done with this piece
-                moved = self.move_piece("v")
-                if not moved:
-                    self.stop_piece()
-                    break
+        log(f"Found a cycle of {cycle.length} pieces starting at piece {cycle.start}")
 
+        return cycle.value_at(n_pieces)
 
     def render(self, n=8):
         """
-        Print the bottom n rows of the game
+        Print the top n rows of the game
         """
-        rows = ["".join(str(x) for x in row) for row in self.grid._grid[self.grid.max_y-n:]]
-        print("\n".join(rows))
+        for row in reversed(self.chamber[-n:]):
+            print("".join("#" if row & (1 << (self.width - 1 - x)) else "."
+                          for x in range(self.width)))
         print("-" * self.width)
         print()
 
 
-class Piece:
+def tower_height(n_pieces, moves):
     """
-    Class for keeping track an individual piece.
+    Returns the height of the tower after dropping n_pieces pieces
     """
+    # Create the game and play it
+    tetris = Tetris(7, moves)
 
-    def __init__(self, tetris, pattern, x, y):
-        self.tetris = tetris
-        
-        # The pattern attribute is effectively a pointed into
-        # a specific pattern in the Tetris.PIECES list.
-        self.pattern = pattern
-        
-        # The x and y coordinates refer to the top-left corner
-        # of the piece.
-        self.x = x
-        self.y = y
-        self.width = len(self.pattern[0])
-        self.height = len(self.pattern)
-        self.stopped = False
-
-    def draw(self):
-        """
-        Draw the piece on the game grid
-        """
-        y = self.y
-        for row in self.pattern:
-            x = self.x
-            for c in row:
-                if c == "#":
-                    if self.stopped:
-                        self.tetris.grid.set(x, y, "#")
-                    else:
-                        self.tetris.grid.set(x, y, "@")
-                x += 1
-            y += 1
-
-    def undraw(self):
-        """
-        Remove the piece from the game grid
-        """
-        y = self.y
-        for row in self.pattern:
-            x = self.x
-            for c in row:
-                if c == "#":
-                    self.tetris.grid.set(x, y, ".")
-                x += 1
-            y += 1            
+    return tetris.play_game(n_pieces)
 
-    def validate(self, x, y):
-        """
-        Validate that the piece can be moved
-        """
-        # Make sure the left edge of the piece
-        # is inside the game grid
-        if x < 0 or x > self.tetris.width:
-            return False
-
-        # Make sure the right edge of the piece
-        # is inside the game grid
-        if x + self.width > self.tetris.width:
-            return False
-
-        # Make sure the bottom of the piece is
-        # inside the game grid
-        if y + self.height > self.tetris.height+1:
-            return False
-
-        # Do some rudimentary collision detection
-        # to check whether we would overlap with other
-        # pieces.
-        iy = y
-        for row in self.pattern:
-            ix = x
-            for c in row:
-                if c == "#" and self.tetris.grid.get(ix, iy) == "#":
-                    return False
-                ix += 1
-            iy += 1
-
-        return True        
-        
-
-def task1(n_pieces, moves):
-    # Maximum possible height (all vertical pieces stacked
-    # on top of each other)
-    height = (n_pieces * 4) + 1
 
-    # Create the game and play it
-    tetris = Tetris(7, height)
-    tetris.play_game(2022, moves)
+def task1(moves):
+    """
+    Task 1: Height of the tower after 2022 pieces
+    """
+    return tower_height(2022, moves)
 
-    return height - tetris.tallest_y + 1
+
+def task2(moves):
+    """
+    Task 2: Height of the tower after 1,000,000,000,000 pieces
+    """
+    return tower_height(1_000_000_000_000, moves)
 
 
 if __name__ == "__main__":
@@ -272,5 +270,9 @@ if __name__ == "__main__":
     input = list(util.read_strs("input/17.in", sep="\n")[0])
 
     print("TASK 1")
-    util.call_and_print(task1, 2022, sample)
-    util.call_and_print(task1, 2022, input)
+    util.call_and_print(task1, sample)
+    util.call_and_print(task1, input)
+
+    print("\nTASK 2")
+    util.call_and_print(task2, sample)
+    util.call_and_print(task2, input)
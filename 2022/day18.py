@@ -10,6 +10,11 @@ felt more like a fun puzzle than a gratuitously difficult problem.
 Part 1 was pretty straightforward and, for Part 2, I ended up
 using BFS to find all the connected components (and then
 subtracting the ones that corresponded to air)
+
+Update: The connected components are now found with the
+label_components function in my grid module, which doesn't
+use recursion (so we no longer have to raise the
+recursion limit)
 """
 
 import util
@@ -17,7 +22,10 @@ import math
 import sys
 import re
 
+import numpy as np
+
 from util import log
+from grid import label_components
 
 
 DIRECTIONS = [(-1,0,0),
@@ -27,18 +35,16 @@ DIRECTIONS = [(-1,0,0),
                (0,0,1),
                (0,0,-1)]
 
-# We need to increase the recursion limit for BFS to work
-# in this problem
-sys.setrecursionlimit(7500)
 
-def find_connected_volumes(cubes):
+def find_trapped_air(cubes):
     """
-    Find the connected volumes in the provided cubes. We take the
+    Find the air trapped inside the lava. We take the
     approach of defining a bounding volume around the cubes
-    (that would correspond to the air *around* the lava, as opposed
-    to the air trapped inside it). We then use BFS to find the
-    connected volumes, distinguishing between "air volumes" and
-    "lava volumes"
+    (that includes the air *around* the lava, as opposed
+    to the air trapped inside it). We then find the connected
+    volumes of air in one pass: the one that includes the corner
+    of the bounding volume is the air around the lava, and
+    all the others are trapped inside it.
     """
 
     # Set the bounds of the bounding volume
@@ -49,59 +55,17 @@ def find_connected_volumes(cubes):
     min_z = min(z for _, _, z in cubes) - 1
     max_z = max(z for _, _, z in cubes) + 1    
 
-    def bfs3d(volume, x, y, z, is_lava, visited):
-        """
-        BFS function that does most of the heavy lifting.
-        """
-
-        # Skip coordinates that are out of bounds
-        if not (min_x <= x <= max_x and min_y <= y <= max_y and min_z <= z <= max_z):
-            return
-
-        # Skip coordinates we have visited
-        if (x, y, z) in visited:
-            return
-
-        # If we're filling a lava volume, skip
-        # the coordinates if they don't correspond
-        # to a cube. Similarly, skip coordinates
-        # that correspond to a cube if we're filling
-        # an air volume
-        is_cube = (x, y, z) in cubes
-        if is_lava and not is_cube:
-            return
-        if not is_lava and is_cube:
-            return
-
-        # Add the coordinates to the volume and visited sets
-        visited.add((x,y,z))
-        volume.add((x,y,z))
-
-        # Recursively check neighboring coordinates
-        for dx, dy, dz in DIRECTIONS:
-            bfs3d(volume, x+dx, y+dy, z+dz, is_lava, visited)
-
-    # Check every coordinate in the bounding volume (most of these
-    # will get skipped as we fill in the visited set)
-    visited = set()
-    volumes = []
-    for x in range(min_x, max_x+1):
-        for y in range(min_y, max_y+1):
-            for z in range(min_z, max_z+1):
-                if (x,y,z) not in visited:
-                    # Will this be a lava volume?
-                    is_lava = (x, y, z) in cubes
+    # 3D array with True for air and False for lava
+    air = np.ones((max_x-min_x+1, max_y-min_y+1, max_z-min_z+1), dtype=bool)
+    for x, y, z in cubes:
+        air[x-min_x, y-min_y, z-min_z] = False
 
-                    # Determine the volume starting at x, y, z
-                    volume = set()
-                    bfs3d(volume, x, y, z, is_lava, visited)
-                    volumes.append((volume, is_lava))
+    labels, _ = label_components(air)
+    outside = labels[0, 0, 0]
 
-    # The first volume (starting at coordinates min_x, min_y, min_z)
-    # corresponds to the bounding volume, so we discard it.
-    volumes.pop(0)
+    trapped = np.argwhere(air & (labels != outside))
 
-    return volumes
+    return {(x+min_x, y+min_y, z+min_z) for x, y, z in trapped.tolist()}
 
 
 def count_exposed(cubes, exclude_air=False):
@@ -120,13 +84,9 @@ def count_exposed(cubes, exclude_air=False):
                 total_exposed += 1
 
     if exclude_air:
-        # If we're excluding air, find the connected volumes,
-        # and subtract the ones that are made up of air.
-        volumes = find_connected_volumes(cubes)
-
-        for volume, is_lava in volumes:
-            if not is_lava:
-                total_exposed -= count_exposed(volume)        
+        # If we're excluding air, subtract the surfaces
+        # of the air trapped inside the lava
+        total_exposed -= count_exposed(find_trapped_air(cubes))
 
     return total_exposed
 
@@ -26,14 +26,29 @@ two other pruning strategies mentioned in the subreddit:
 (2) If you are able to build a geode robot, only explore that option
     (it is pointless to explore paths were you don't create the geode
     robot, since they'll always result in fewer geodes)
+
+Update: I later rewrote the search as a branch and bound (using the
+general-purpose branch_and_bound in aoc.algorithms). Instead of
+branching at every minute, we branch on which robot to build next,
+and skip ahead to the minute when we can build it. The upper bound
+is also much tighter: instead of assuming we can build a geode robot
+every minute, we simulate a relaxed version of the problem where ore
+is free and we can build one robot of each type every minute. Each
+blueprint gets its own bounded memo, and the blueprints are searched
+in parallel. Running the file with --benchmark reports how many
+states were explored and pruned (by each pruning rule) per blueprint.
 """
 
 import util
 import math
 import sys
 import re
+from collections import Counter
+from functools import partial
+from multiprocessing import Pool
 
 from util import log
+from algorithms import branch_and_bound
 
 
 class Blueprint:
@@ -53,129 +68,169 @@ class Blueprint:
         self.geode_cost_obsidian = geode_cost_obsidian
 
 
-def find_max_geodes(blueprint, ore, clay, obsidian, geode, 
-                    ore_robots, clay_robots, obsidian_robots, geode_robots, 
-                    minutes, best_score=0, memo={}):
-    """
-    Do a depth-first search of every possible action in every minute, and
-    return the maximum number of geodes that can be generated. Along
-    the way, do some judicious pruning of the search space.
-
-    The ore, clay, obsidian, and geode parameters specify how many of each we have.
-
-    The *_robots parameters specify how many of each robot we have.
-
-    minutes is the number of minutes left
-
-    best_score is used to keep track of the maximum number of geodes we've
-    found so far (the "best score" so far)
-
-    memo is a dictionary for memoization
-    """
-
-    # Memoization
-    score = memo.get((ore, clay, obsidian, geode, ore_robots, clay_robots, obsidian_robots, geode_robots, minutes))
-    if score is not None:
-        return score
-
-    # We compute the maximum possible number of geodes we could generate
-    # starting from the current state. This is the number of geodes we
-    # would generate if we were able to create a new geode robot every
-    # minute of our remaining time (and added it to the number of)
-    # geodes we already have. If that number is not larger than the
-    # best score we've found so far, then this is not a productive
-    # path to explore (since it can't possible be better than the
-    # best score we've already found)
-    max_possible_geodes = geode + (minutes * (2*geode_robots + minutes))/2
-    if max_possible_geodes < best_score:
-        return 0
-
-    # If time's up, return the number of geodes
-    if minutes == 0:
-        return geode
-
-    # Explore every possible action, and find the maximum number of geodes
-    # starting from that action. We then pick the largest of all these values.
-    scores = []
-
-    # If we have enough minerals to build a geode robot, see what happens
-    # if we build it.
-    if ore >= blueprint.geode_cost_ore and obsidian >= blueprint.geode_cost_obsidian:
-        score = find_max_geodes(blueprint,
-                                ore + ore_robots - blueprint.geode_cost_ore,
-                                clay + clay_robots,
-                                obsidian + obsidian_robots - blueprint.geode_cost_obsidian,
-                                geode + geode_robots,
-                                ore_robots, clay_robots, obsidian_robots, geode_robots+1,
-                                minutes - 1, best_score, memo)
-        best_score = max(best_score, score)
-        scores.append(score)
-    else:
-        # Notice how we don't explore any other options if we're able to build
-        # a geode robot, since that's always the best action to take (if we
-        # have enough minerals for it)
-
-        # If we have enough minerals to build an obsidian robot, see what happens
-        # if we build it *unless* we already have enough obsidian robots to
-        # generate the obsidian for a geode robot (if so, getting more obsidian
-        # robots is pointless)
-        if obsidian_robots < blueprint.geode_cost_obsidian and ore >= blueprint.obsidian_cost_ore and clay >= blueprint.obsidian_cost_clay:
-            score = find_max_geodes(blueprint,
-                                    ore + ore_robots - blueprint.obsidian_cost_ore,
-                                    clay + clay_robots - blueprint.obsidian_cost_clay,
-                                    obsidian + obsidian_robots,
-                                    geode + geode_robots,
-                                    ore_robots, clay_robots, obsidian_robots+1, geode_robots,
-                                    minutes - 1, best_score, memo)
-            best_score = max(best_score, score)
-            scores.append(score)
-
-        # If we have enough minerals to build a clay robot, see what happens
-        # if we build it *unless* we already have enough clay robots to
-        # generate the clay for an obsidian robot (if so, getting more clay
-        # robots is pointless)
-        if clay_robots < blueprint.obsidian_cost_clay and ore >= blueprint.clay_cost:
-            score = find_max_geodes(blueprint,
-                                    ore + ore_robots - blueprint.clay_cost,
-                                    clay + clay_robots,
-                                    obsidian + obsidian_robots,
-                                    geode + geode_robots,
-                                    ore_robots, clay_robots+1, obsidian_robots, geode_robots,
-                                    minutes - 1, best_score, memo)
-            best_score = max(best_score, score)
-            scores.append(score)            
-
-        # If we have enough minerals to build an ore robot, see what happens
-        # if we build it *unless* we already have enough ore robots to
-        # generate the ore for whatever robot requires the most ore
-        # (if so, getting more ore robots is pointless)
-        if ore_robots < max(blueprint.clay_cost, blueprint.obsidian_cost_ore, blueprint.geode_cost_ore) and ore >= blueprint.ore_cost:
-            score = find_max_geodes(blueprint,
-                                    ore + ore_robots - blueprint.ore_cost,
-                                    clay + clay_robots,
-                                    obsidian + obsidian_robots,
-                                    geode + geode_robots,
-                                    ore_robots+1, clay_robots, obsidian_robots, geode_robots,
-                                    minutes - 1, best_score, memo)
-            best_score = max(best_score, score)
-            scores.append(score)     
-
-        # See what happens if we don't do anything.
-        score = find_max_geodes(blueprint,
-                                ore + ore_robots,
-                                clay + clay_robots,
-                                obsidian + obsidian_robots,
-                                geode + geode_robots,
-                                ore_robots, clay_robots, obsidian_robots, geode_robots,
-                                minutes - 1, best_score, memo)
-        
-        scores.append(score)
-
-    # Return the best score, and update the memoization dictionary
-    best_score = max(scores)
-    memo[(ore, clay, obsidian, geode, ore_robots, clay_robots, obsidian_robots, geode_robots, minutes)] = best_score
-
-    return best_score
+# Indices of the resources/robots in a state
+ORE, CLAY, OBSIDIAN = 0, 1, 2
+
+
+def initial_state(minutes):
+    """
+    Returns the initial state of the search, with the given number of minutes.
+
+    A state is a tuple with the minutes left, the ore, clay, and obsidian
+    we have, the number of ore, clay, and obsidian robots we have, and
+    the number of geodes we'll have opened by the end of the time
+    (we count all the geodes a geode robot will open as soon as we
+    build it, so we don't need to keep track of the geode robots)
+    """
+    return (minutes, 0, 0, 0, 1, 0, 0, 0)
+
+
+def robot_costs(blueprint):
+    """
+    Returns the cost of each type of robot (geode, obsidian, clay, ore),
+    in that order (which is also the order in which we'll explore the
+    options when searching), as (robot, ore, clay, obsidian) tuples.
+    Geode robots are represented with None.
+    """
+    return [(None, blueprint.geode_cost_ore, 0, blueprint.geode_cost_obsidian),
+            (OBSIDIAN, blueprint.obsidian_cost_ore, blueprint.obsidian_cost_clay, 0),
+            (CLAY, blueprint.clay_cost, 0, 0),
+            (ORE, blueprint.ore_cost, 0, 0)]
+
+
+def next_states(blueprint, state, stats):
+    """
+    Returns the states we can reach by deciding which robot to
+    build next. Instead of branching at every minute, we skip
+    ahead to the minute when that robot can be built (so waiting
+    around is never a branch of its own; it's implied by whatever
+    robot we decide to build next)
+
+    Along the way, we apply the following pruning rules (and keep
+    track of how many states each rule pruned in stats):
+
+    - max_robots: If we already produce enough of a mineral per minute
+      to build any robot that depends on it, there's no point in
+      building more robots that produce that mineral.
+    - geode_now: If we can build a geode robot right now, we
+      only explore that option.
+    - no_time: Don't build a robot if there is no time left for it
+      to be useful.
+    """
+    minutes, ore, clay, obsidian, ore_r, clay_r, obsidian_r, geodes = state
+    resources = (ore, clay, obsidian)
+    rates = (ore_r, clay_r, obsidian_r)
+    max_rates = (max(blueprint.ore_cost, blueprint.clay_cost,
+                     blueprint.obsidian_cost_ore, blueprint.geode_cost_ore),
+                 blueprint.obsidian_cost_clay,
+                 blueprint.geode_cost_obsidian)
+
+    robots = robot_costs(blueprint)
+    states = []
+    for robot, *costs in robots:
+        if robot is not None and rates[robot] >= max_rates[robot]:
+            stats["pruned_max_robots"] += 1
+            continue
+
+        # Minutes we need to wait until we have enough minerals
+        # for the robot (if we don't produce one of the minerals
+        # we need, we can't build this robot at all yet)
+        wait = 0
+        for have, rate, cost in zip(resources, rates, costs):
+            if have < cost:
+                if rate == 0:
+                    break
+                wait = max(wait, -((have - cost) // rate))
+        else:
+            # Building the robot takes one more minute, and the robot
+            # is only useful if there's at least one minute left after that
+            # (and, for non-geode robots, one more minute to then use
+            # what it produced)
+            left = minutes - wait - 1
+            if left <= (0 if robot is None else 1):
+                stats["pruned_no_time"] += 1
+                continue
+
+            new = [h + r*(wait+1) - c for h, r, c in zip(resources, rates, costs)]
+            new_rates = list(rates)
+            new_geodes = geodes
+            if robot is None:
+                new_geodes += left
+            else:
+                new_rates[robot] += 1
+            states.append((left, *new, *new_rates, new_geodes))
+
+            if robot is None and wait == 0:
+                stats["pruned_geode_now"] += len(robots) - 1
+                break
+
+    return states
+
+
+def max_geodes_bound(blueprint, state):
+    """
+    Returns an upper bound on the number of geodes we could open
+    starting from a given state.
+
+    We compute it by relaxing the rules: we pretend ore is free, and
+    that every minute we can build one robot of *each* type (as
+    long as we have the clay and obsidian for it).
+    """
+    minutes, _, clay, obsidian, _, clay_r, obsidian_r, geodes = state
+    for left in range(minutes - 1, -1, -1):
+        build_geode = obsidian >= blueprint.geode_cost_obsidian
+        build_obsidian = clay >= blueprint.obsidian_cost_clay
+        clay += clay_r
+        obsidian += obsidian_r
+        if build_geode:
+            obsidian -= blueprint.geode_cost_obsidian
+            geodes += left
+        if build_obsidian:
+            clay -= blueprint.obsidian_cost_clay
+            obsidian_r += 1
+        clay_r += 1
+    return geodes
+
+
+def find_max_geodes(blueprint, minutes, max_memo=1_000_000):
+    """
+    Find the maximum number of geodes that can be opened with a
+    blueprint in the given number of minutes, using branch and bound.
+
+    Each call uses its own (bounded) memo of explored states.
+
+    Returns the number of geodes, and a Counter with the number of
+    states explored and pruned (by each pruning rule)
+    """
+    stats = Counter()
+    geodes, _, stats = branch_and_bound(initial_state(minutes),
+                                        lambda s: next_states(blueprint, s, stats),
+                                        value=lambda s: s[-1],
+                                        upper_bound=lambda s: max_geodes_bound(blueprint, s),
+                                        key=lambda s: s,
+                                        max_memo=max_memo,
+                                        stats=stats)
+    return geodes, stats
+
+
+def max_geodes_all(blueprints, minutes, processes=8):
+    """
+    Find the maximum number of geodes for each blueprint, searching
+    the blueprints in parallel (each blueprint is independent of the
+    others, so we give each one to a separate worker process)
+
+    Returns a list of (geodes, stats) tuples, one per blueprint
+    """
+    if len(blueprints) == 0:
+        return []
+
+    with Pool(processes=max(1, min(processes, len(blueprints)))) as pool:
+        results = pool.map(partial(find_max_geodes, minutes=minutes), blueprints)
+
+    for b, (num_geodes, stats) in zip(blueprints, results):
+        log(f"Blueprint {b.id} produces {num_geodes} geodes {dict(stats)}")
+
+    return results
 
 
 # f-String for parsing the input
@@ -200,15 +255,9 @@ def task1(blueprints):
     """
     Task 1: Find the quality level of each blueprint and return the sum.
     """
-    quality_levels = []
-    for i, b in enumerate(blueprints):
-        num_geodes = find_max_geodes(b,0,0,0,0,1,0,0,0,24, memo={})
-        
-        log(f"Blueprint {i+1} produces {num_geodes} geodes")
-
-        quality_levels.append((i+1)*num_geodes)
+    results = max_geodes_all(blueprints, 24)
 
-    return sum(quality_levels)
+    return sum(b.id * num_geodes for b, (num_geodes, _) in zip(blueprints, results))
 
 
 def task2(blueprints):
@@ -216,14 +265,24 @@ def task2(blueprints):
     Task 2: Multiply the maximum number of geodes produced by the
             first three blueprints.
     """
-    geodes = []
-    for i, b in enumerate(blueprints[:3]):
-        num_geodes = find_max_geodes(b,0,0,0,0,1,0,0,0,32, memo={})
-        log(f"Blueprint {i+1} produces {num_geodes} geodes")
+    results = max_geodes_all(blueprints[:3], 32)
 
-        geodes.append(num_geodes)
+    return math.prod(num_geodes for num_geodes, _ in results)
 
-    return math.prod(geodes)
+
+def benchmark(blueprints):
+    """
+    Time each task, and print the number of states explored and
+    pruned (by each pruning rule) for each blueprint
+    """
+    for minutes, bps in ((24, blueprints), (32, blueprints[:3])):
+        print(f"{minutes} MINUTES")
+        results = util.call_and_time(max_geodes_all, bps, minutes)
+        for b, (num_geodes, stats) in zip(bps, results):
+            pruned = ", ".join(f"{k[7:]}={v}" for k, v in sorted(stats.items())
+                               if k.startswith("pruned_"))
+            print(f"  Blueprint {b.id:2}: {num_geodes:2} geodes, "
+                  f"{stats['explored']} explored, pruned: {pruned}")
 
 
 if __name__ == "__main__":
@@ -235,6 +294,10 @@ if __name__ == "__main__":
     sample_blueprints = parse_input(sample)
     blueprints = parse_input(input)
 
+    if "--benchmark" in sys.argv:
+        benchmark(blueprints)
+        sys.exit(0)
+
     print("TASK 1")
     util.call_and_print(task1, sample_blueprints)
     util.call_and_print(task1, blueprints)
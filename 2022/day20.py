@@ -46,12 +46,26 @@ And we shift E six times:
 
 The fact that A appears at the end now is just a representation issue; 
 the lists at the start and end are the same arrangement of values.
+
+Update: Moving a node one swap at a time means a single mix takes
+O(n^2) time, which is fine for the actual input (5,000 values) but
+not much more than that. mix_blocked does the same thing with a
+BlockedList, which splits the list into blocks of roughly sqrt(n)
+values, and keeps track of the block sizes in a Fenwick tree
+(so we can quickly find the position of a value, or the value
+at a given position). Moving a value then takes roughly O(sqrt(n))
+time. Running the file with --benchmark compares both versions
+(and reports how many moves per second we can do). The tasks now
+use mix_blocked, and running the file with --check checks it
+against the original mix on random lists.
 """
 
 import util
 import math
+import random
 import sys
 import re
+import time
 
 from util import log
 
@@ -119,6 +133,189 @@ def log_list(node0):
     log(", ".join(str(x) for x in vals))
 
 
+class BlockedList:
+    """
+    A list of (hashable, distinct) items split into blocks, with
+    a Fenwick tree over the sizes of the blocks, so that finding
+    the position of an item, and inserting or removing an item
+    at a given position, only take O(sqrt(n)) time.
+    """
+
+    def __init__(self, items, block_size=None):
+        self.length = len(items)
+        self.block_size = block_size or max(16, math.isqrt(self.length))
+        self.rebuild(items)
+
+    def rebuild(self, items=None):
+        """
+        Split the items into blocks of the same size (this needs
+        to be done whenever a block gets too big)
+        """
+        if items is None:
+            items = [item for block in self.blocks for item in block]
+
+        size = self.block_size
+        self.blocks = [items[i:i+size] for i in range(0, len(items), size)] or [[]]
+        self.block_of = {item: b for b, block in enumerate(self.blocks) for item in block}
+
+        # Fenwick tree over the block sizes (self.tree[i] is the
+        # sum of the sizes of blocks i-(i&-i)+1 to i, 1-based)
+        self.tree = [0] * (len(self.blocks) + 1)
+        for b, block in enumerate(self.blocks, start=1):
+            self.tree[b] += len(block)
+            parent = b + (b & -b)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[b]
+
+        # Highest power of two that fits in the tree
+        self.top = 1 << (len(self.blocks).bit_length() - 1)
+
+    def _update(self, b, delta):
+        """
+        Add delta to the size of block b (0-based)
+        """
+        tree = self.tree
+        b += 1
+        while b < len(tree):
+            tree[b] += delta
+            b += b & -b
+
+    def _find(self, index):
+        """
+        Find the block containing a position, returning the
+        block number and the position within the block
+        """
+        tree = self.tree
+        b = 0
+        step = self.top
+        while step:
+            if b + step < len(tree) and tree[b + step] <= index:
+                b += step
+                index -= tree[b]
+            step >>= 1
+
+        return b, index
+
+    def _prefix(self, b):
+        """
+        Number of items in the blocks before block b
+        """
+        tree = self.tree
+        total = 0
+        while b:
+            total += tree[b]
+            b -= b & -b
+
+        return total
+
+    def index(self, item):
+        """
+        Find the position of an item in the list
+        """
+        b = self.block_of[item]
+        return self._prefix(b) + self.blocks[b].index(item)
+
+    def __getitem__(self, index):
+        b, i = self._find(index % self.length)
+        return self.blocks[b][i]
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+    def move(self, item, offset):
+        """
+        Move an item offset positions to the right (or to the left,
+        if offset is negative), as if the list was circular
+        """
+        if self.length == 1:
+            # A single item can't move anywhere
+            return
+
+        b = self.block_of[item]
+        i = self.blocks[b].index(item)
+        index = self._prefix(b) + i
+        del self.blocks[b][i]
+        self._update(b, -1)
+
+        # Once we take the item out, the list has one less item
+        new_index = (index + offset) % (self.length - 1)
+        if new_index == 0:
+            # Same arrangement (in a circular list) as moving it to the end
+            new_index = self.length - 1
+
+        if new_index == self.length - 1:
+            b = len(self.blocks) - 1
+            self.blocks[b].append(item)
+        else:
+            b, i = self._find(new_index)
+            self.blocks[b].insert(i, item)
+        self._update(b, 1)
+        self.block_of[item] = b
+
+        if len(self.blocks[b]) > 2 * self.block_size:
+            self.rebuild()
+
+
+def mix_blocked(values, key=1, n_mix=1):
+    """
+    Same as mix, but using a BlockedList (of the positions
+    of the values in the original list)
+    """
+    values = [v*key for v in values]
+    lst = BlockedList(list(range(len(values))))
+
+    for _ in range(n_mix):
+        for i, v in enumerate(values):
+            lst.move(i, v)
+
+    start = lst.index(values.index(0))
+
+    return sum(values[lst[start + i]] for i in (1000, 2000, 3000))
+
+
+def check_engines(n_lists, seed=2022):
+    """
+    Check that mix and mix_blocked give the same result on
+    random lists (of different sizes, and with or without
+    the decryption key). As in the input, every list has
+    exactly one zero.
+    """
+    rng = random.Random(seed)
+    for _ in range(n_lists):
+        n = rng.randint(2, 60)
+        values = [rng.randint(1, 100) * rng.choice((-1, 1)) for _ in range(n)]
+        values[rng.randrange(n)] = 0
+        key = rng.choice((1, 811589153))
+        n_mix = rng.randint(1, 3)
+        if mix(values, key, n_mix) != mix_blocked(values, key, n_mix):
+            return False
+
+    return mix_blocked([0]) == 0
+
+
+def benchmark():
+    """
+    Compare both versions of the mixing on random lists
+    """
+    rng = random.Random(2022)
+    for n, n_mix in ((2_000, 1), (5_000, 10), (100_000, 1), (100_000, 10)):
+        values = [rng.randint(-10_000, 10_000) for _ in range(n)]
+        values[rng.randrange(n)] = 0
+
+        print(f"{n:,} values, {n_mix} mix(es)")
+        start = time.perf_counter()
+        result = util.call_and_time(mix_blocked, values, 811589153, n_mix)
+        elapsed = time.perf_counter() - start
+        print(f"{n * n_mix / elapsed:,.0f} moves/s")
+        if n <= 2_000:
+            assert util.call_and_time(mix, values, 811589153, n_mix) == result
+        print()
+
+
 def mix(values, key=1, n_mix=1):
     """
     Perform the mixing operation, optionally providing a "decryption key"
@@ -160,13 +357,21 @@ def mix(values, key=1, n_mix=1):
 if __name__ == "__main__":
     util.set_debug(False)
 
+    if "--benchmark" in sys.argv:
+        benchmark()
+        sys.exit(0)
+
+    if "--check" in sys.argv:
+        util.call_and_print(check_engines, 300)
+        sys.exit(0)
+
     sample = util.read_ints("input/sample/20.in", sep="\n")
     input = util.read_ints("input/20.in", sep="\n")
 
     print("TASK 1")
-    util.call_and_print(mix, sample)
-    util.call_and_print(mix, input)
+    util.call_and_print(mix_blocked, sample)
+    util.call_and_print(mix_blocked, input)
 
     print("\nTASK 2")
-    util.call_and_print(mix, sample, 811589153, 10)
-    util.call_and_print(mix, input, 811589153, 10)
+    util.call_and_print(mix_blocked, sample, 811589153, 10)
+    util.call_and_print(mix_blocked, input, 811589153, 10)
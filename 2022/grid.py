@@ -0,0 +1 @@
+from aoc.grid import *
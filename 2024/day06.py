@@ -13,6 +13,14 @@ realized you only needed to try the open positions along
 the guards original patrol, which reduced the running
 time considerably (but I still wonder if there is a less
 brute force-ish approach)
+
+Update: Running hundreds of patrols spends most of its time
+on per-cell Grid lookups and on sets of tuples, so the tasks
+now use patrol_cells, which runs the patrol on a flat bytearray
+(with an extra "outside" column at the end of every row, so
+checking if the guard left the grid is a single lookup) and
+records the visited directions as a bitmask per cell (instead
+of running the patrol on the Grid itself).
 """
 
 import util
@@ -20,48 +28,50 @@ from grid import Grid
 
 from util import log
 
-class InfiniteLoopException(Exception):
-    """Exception thrown when the guard falls into an infinite loop"""
-    pass
-
-def patrol(grid: Grid, sr: int, sc: int) -> set[tuple[int, int]]:
-    """Run a patrol of the grid
+OPEN, OBSTACLE, OUTSIDE = 0, 1, 2
 
-    Returns the number of steps, or raises
-    InfiniteLoopException if the guard gets
-    stuck in a loop
-    """
-    r, c = sr, sc
-    dr, dc = Grid.UP
-    visited = set()
-    visited_dir = set()
 
-    while grid.valid(r, c):
-        # If the guard visits the same position
-        # again, moving in the same direction,
-        # then they've fallen into a loop
-        vec = (r,c,dr,dc)
-        if vec in visited_dir:
-            raise InfiniteLoopException
+def to_cells(grid: Grid) -> tuple[bytearray, int]:
+    """Convert the grid into a flat bytearray of OPEN/OBSTACLE
+    cells, where every row ends with an OUTSIDE cell
 
-        # Update visited sets
-        visited.add((r,c))
-        visited_dir.add((r,c,dr,dc))
+    Returns the bytearray and the width of each row
+    """
+    cells = bytearray()
+    for r in range(grid.rows):
+        cells += bytes(OBSTACLE if grid.get(r, c) == "#" else OPEN
+                       for c in range(grid.cols))
+        cells.append(OUTSIDE)
 
-        # Next position
-        nr, nc = r + dr, c + dc
+    return cells, grid.cols + 1
 
-        # Update position/direction if there's an obstacle
-        if grid.getdefault(nr, nc) == "#":
-            dr, dc = grid.CLOCKWISE[(dr, dc)]
-            # Careful: if we encounter an obstacle, we turn
-            # but we don't take a step (there could be an
-            # obstacle in front of us after turning)
-            nr, nc = r, c
 
-        r, c = nr, nc
+def patrol_cells(cells: bytearray, width: int, start: int) -> bytearray | None:
+    """Run a patrol on a flat grid (see to_cells)
 
-    return visited
+    Returns a bytearray with, for each cell, a bitmask of the
+    directions the guard was facing when visiting it (or None
+    if the guard gets stuck in a loop)
+    """
+    # Up, right, down, left (i.e., turning clockwise)
+    offsets = (-width, 1, width, -1)
+    n = len(cells)
+    seen = bytearray(n)
+    pos, d = start, 0
+
+    while True:
+        bit = 1 << d
+        if seen[pos] & bit:
+            return None
+        seen[pos] |= bit
+
+        nxt = pos + offsets[d]
+        if nxt < 0 or nxt >= n or cells[nxt] == OUTSIDE:
+            return seen
+        if cells[nxt] == OBSTACLE:
+            d = (d + 1) % 4
+        else:
+            pos = nxt
 
 
 def count_steps(grid: Grid) -> int:
@@ -74,9 +84,11 @@ def count_steps(grid: Grid) -> int:
 
     sr, sc = rv
 
-    visited = patrol(grid, sr, sc)
+    cells, width = to_cells(grid)
+    seen = patrol_cells(cells, width, sr * width + sc)
+    assert seen is not None
 
-    return len(visited)
+    return len(seen) - seen.count(0)
 
 
 def count_stuck(grid: Grid) -> int:
@@ -95,17 +107,19 @@ def count_stuck(grid: Grid) -> int:
     # an obstacle in each one of them (except
     # the starting position)
 
-    visited = patrol(grid, sr, sc)
-    visited.remove((sr, sc))
+    cells, width = to_cells(grid)
+    start = sr * width + sc
+    seen = patrol_cells(cells, width, start)
+    assert seen is not None
 
     total = 0
-    for r, c in visited:
-        grid.set(r, c, "#")
-        try:
-            patrol(grid, sr, sc)
-        except InfiniteLoopException:
+    for pos, directions in enumerate(seen):
+        if directions == 0 or pos == start:
+            continue
+        cells[pos] = OBSTACLE
+        if patrol_cells(cells, width, start) is None:
             total += 1
-        grid.set(r, c, ".")
+        cells[pos] = OPEN
 
     return total
 
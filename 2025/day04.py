@@ -5,6 +5,10 @@ https://adventofcode.com/2025/day/4
 Once again, having a ready-made Grid class
 made solving this kind of problem pretty
 striaghtforward.
+
+Update: Both parts now update the whole grid at once
+(using the Grid's cellular automaton support), instead
+of checking one roll of paper at a time.
 """
 
 import util
@@ -12,26 +16,28 @@ import math
 import sys
 import re
 
+import numpy as np
+import numpy.typing as npt
+
 from util import log
-from grid import Grid
+from grid import Grid, neighbor_counts
 
 
-def is_accessible(grid: Grid, r: int, c: int) -> bool:
+def accessible_rolls(rolls: npt.NDArray[np.str_], adjacent: npt.NDArray[np.int64]) -> npt.NDArray[np.bool_]:
     """
-    Checks if a position on the grid contains a roll 
-    of paper and, if so, checks whether it is accessible.  
+    Given the contents of the grid (as an array), and the number
+    of rolls of paper adjacent to each position, returns a
+    boolean array with the accessible rolls of paper.
     """
-    v = grid.get(r, c)
+    return (rolls == "@") & (adjacent < 4)
 
-    if v == "@":
-        num_adj = 0
-        for dr, dc in Grid.DIRECTIONS:
-            if grid.getdefault(r+dr, c+dc) == "@":
-                num_adj += 1
-        if num_adj < 4:
-            return True
 
-    return False
+def remove_accessible(rolls: npt.NDArray[np.str_], adjacent: npt.NDArray[np.int64]) -> npt.NDArray[np.str_]:
+    """
+    Automaton rule (see Grid.step_automaton) that removes
+    all the accessible rolls of paper.
+    """
+    return np.where(accessible_rolls(rolls, adjacent), ".", rolls)
 
 
 def count_accessible(g: Grid) -> int:
@@ -39,47 +45,33 @@ def count_accessible(g: Grid) -> int:
     Counts the number of accessible rolls of paper
     on the grid
     """
-    accessible = 0
-    for r in range(g.rows):
-        for c in range(g.cols):
-            if is_accessible(g, r, c):
-                accessible += 1
-                    
-    return accessible
+    rolls = g.to_array()
+    adjacent = neighbor_counts(rolls == "@", Grid.DIRECTIONS)
+
+    return int(np.count_nonzero(accessible_rolls(rolls, adjacent)))
 
 
 def count_removed(g: Grid) -> int:
     """
     Count the number of rolls of paper that can be removed
     """
-    total_removed = 0
-
-    # In each iteration, we go through the entire grid,
-    # and remove accessible rolls of paper as we encounter
-    # them. If we go through the grid and don't remove
-    # anything, we're done.
-    while True:
-        removed = 0
-
-        for r in range(g.rows):
-            for c in range(g.cols):
-                if is_accessible(g, r, c):
-                    removed += 1
-                    g.set(r, c, ".")
-
-        total_removed += removed
+    initial_rolls = np.count_nonzero(g.to_array() == "@")
 
-        if removed == 0:
-            break
+    # In each step, we remove all the accessible rolls of
+    # paper at once. Removing a roll can only make other rolls
+    # more accessible, so we end up removing the same rolls
+    # as if we removed them one at a time. If a step doesn't
+    # remove anything, we're done.
+    g.run_until_stable(remove_accessible, "@", Grid.DIRECTIONS)
 
-    return total_removed
+    return int(initial_rolls - np.count_nonzero(g.to_array() == "@"))
 
 
 if __name__ == "__main__":
     util.set_debug(False)
 
-    sample = Grid.from_file("input/sample/04.in")
-    input = Grid.from_file("input/04.in")
+    sample = Grid.from_file("input/sample/04.in", storage="bytes")
+    input = Grid.from_file("input/04.in", storage="bytes")
 
     print("TASK 1")
     util.call_and_print(count_accessible, sample)
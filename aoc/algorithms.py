@@ -3,22 +3,41 @@ This file contains a couple of useful algorithms that tend to
 come in handy in some Advent of Code problems.
 
 - Depth-First Search on graphs
-- Depth-First Search on grids (using my util.Grid class)
-- Breadth-First Search on grids
+- Depth-First Search on grids (using my aoc.grid.Grid class)
+- Breadth-First Search on grids (plus a faster version that works
+  directly on Grid objects, and supports grids that change over time)
 - Dijkstra's shortest path algorithm
+- A general-purpose shortest path search (Dijkstra/A*) on
+  implicit graphs (where we only know how to get the
+  neighbors of a state)
+- Branch and bound (for finding the best solution in a large
+  tree of possible choices)
+- Cycle detection (for simulations that eventually repeat
+  themselves, so we can extrapolate far into the future)
 
 Each algorithm includes a test_algorithm function with a simple
 test to show how to set up the data structures and use the algorithm.
 Running this Python file will run all the tests.
 """
 
+from __future__ import annotations
+
+from array import array
+from collections import Counter, deque
+from collections.abc import Callable, Collection, Hashable, Iterable, Mapping, Sequence
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
 ###############################################################################
 # 
 #  GRAPH DEPTH-FIRST SEARCH
 # 
 ###############################################################################   
 
-def dfs(graph, start_node, visit_func=print):
+def dfs(graph: Mapping[Any, Sequence[Any]], start_node: Any,
+        visit_func: Callable[[Any], object] = print) -> None:
     """
     Depth-first search (DFS) on a graph
 
@@ -32,19 +51,25 @@ def dfs(graph, start_node, visit_func=print):
     Returns: nothing
     """
 
-    def dfs_r(graph, start_node, visit_func, visited):
-        if start_node in visited:
-            return
-
-        visited.add(start_node)
-        visit_func(start_node)
-        for neighbor in graph[start_node]:
-            dfs_r(graph, neighbor, visit_func, visited)
-
-    # Call the recursive function with an empty set of visited nodes
-    dfs_r(graph, start_node, visit_func, visited=set())
-
-def test_graph_dfs():
+    # Instead of using recursion (which can easily exceed the
+    # recursion limit on large graphs), we keep our own stack.
+    # Neighbors are pushed in reverse order, so they are visited
+    # in the same order as in a recursive DFS.
+    visited: set[Any] = set()
+    stack = [start_node]
+
+    while len(stack) > 0:
+        node = stack.pop()
+        if node in visited:
+            continue
+
+        visited.add(node)
+        visit_func(node)
+        for neighbor in reversed(graph[node]):
+            if neighbor not in visited:
+                stack.append(neighbor)
+
+def test_graph_dfs() -> None:
     graph = {"A": ["B", "C"],
              "B": ["A", "C", "D", "E"],
              "C": ["A", "B", "D", "E"],
@@ -65,9 +90,11 @@ def test_graph_dfs():
 # 
 ###############################################################################       
 
-from util import Grid
+from aoc.grid import Grid
 
-def grid_dfs(grid, x, y, visit_func, iswall_func):
+def grid_dfs(grid: Grid[Any], x: int, y: int,
+             visit_func: Callable[[Grid[Any], int, int], object],
+             iswall_func: Callable[[Grid[Any], int, int], bool]) -> None:
     """
     Depth-first search (DFS) on a grid.
 
@@ -85,23 +112,25 @@ def grid_dfs(grid, x, y, visit_func, iswall_func):
     Returns: nothing
     """
 
-    def grid_dfs_r(grid, x, y, visit_func, iswall_func, visited):
-        if iswall_func(grid, x, y):
-            return
+    # Like in dfs, we keep our own stack instead of using recursion.
+    # (to flood fill all the regions of a grid at once, see
+    # Grid.label_components instead)
+    visited: set[tuple[int, int]] = set()
+    stack = [(x, y)]
+
+    while len(stack) > 0:
+        x, y = stack.pop()
+
+        if (x,y) in visited or iswall_func(grid, x, y):
+            continue
 
-        if (x,y) in visited:
-            return
-        
         visited.add((x,y))
         visit_func(grid, x, y)
 
-        for dx, dy in Grid.CARDINAL_DIRS:
-            grid_dfs_r(grid, x+dx, y+dy, visit_func, iswall_func, visited)
-
-    # Call the recursive function with an empty set of visited nodes
-    grid_dfs_r(grid, x, y, visit_func, iswall_func, visited=set())
+        for dx, dy in reversed(Grid.CARDINAL_DIRS):
+            stack.append((x+dx, y+dy))
 
-def test_grid_dfs():
+def test_grid_dfs() -> None:
 
     # We're going to test our Grid DFS by doing flood-filling
 
@@ -119,16 +148,16 @@ def test_grid_dfs():
 
     grid = Grid.from_string(grid_str)
 
-    def visit(grid, x, y):
+    def visit(grid: Grid[Any], x: int, y: int) -> None:
         grid.set(x, y, "x")
 
-    def is_wall(grid, x, y):
+    def is_wall(grid: Grid[Any], x: int, y: int) -> bool:
         v = grid.getdefault(x, y, "#")
         return v == "#"
 
     print(grid)
 
-    grid_dfs(grid, 7, 5, visit, is_wall)
+    grid_dfs(grid, 5, 7, visit, is_wall)
 
     print()
     print(grid)
@@ -144,9 +173,9 @@ def test_grid_dfs():
 # 
 ###############################################################################       
 
-from util import Grid
-
-def grid_bfs(grid, x, y, iswall_func, istarget_func):
+def grid_bfs(grid: Grid[Any], x: int, y: int,
+             iswall_func: Callable[[Grid[Any], int, int], bool],
+             istarget_func: Callable[[Grid[Any], int, int], bool]) -> list[Any]:
     """
     Breadth-first search (BFS) on a grid.
 
@@ -169,7 +198,7 @@ def grid_bfs(grid, x, y, iswall_func, istarget_func):
     """
 
     # Queue
-    q = []
+    q: deque[tuple[int, int]] = deque()
     q.append((x,y))
 
     # Set of visited locations
@@ -178,13 +207,13 @@ def grid_bfs(grid, x, y, iswall_func, istarget_func):
     # Distance and previous-location dictionaries
     dist = {}
     dist[(x,y)] = 0
-    prev = {}
+    prev: dict[Any, Any] = {}
     prev[(x,y)] = None
     target = None
 
     # Ye olde BFS loop
     while len(q) > 0:
-        cur = q.pop(0)
+        cur = q.popleft()
 
         cx, cy = cur
 
@@ -212,7 +241,7 @@ def grid_bfs(grid, x, y, iswall_func, istarget_func):
 
     return path
 
-def test_grid_bfs():
+def test_grid_bfs() -> None:
 
     # We're going to test our Grid BFS by searching for the
     # shortest path in a maze
@@ -231,18 +260,18 @@ def test_grid_bfs():
 
     grid = Grid.from_string(grid_str)
 
-    def is_wall(grid, x, y):
+    def is_wall(grid: Grid[Any], x: int, y: int) -> bool:
         v = grid.getdefault(x, y, "#")
         return v == "#"
 
-    def is_target(grid, x, y):
+    def is_target(grid: Grid[Any], x: int, y: int) -> bool:
         v = grid.get(x, y)
         return v == "X"
 
 
     print(grid)
 
-    path = grid_bfs(grid, 0, 1, is_wall, is_target)
+    path = grid_bfs(grid, 1, 0, is_wall, is_target)
 
     # Let's update the grid to highlight the path
     for x,y in path:
@@ -251,6 +280,232 @@ def test_grid_bfs():
     print()
     print(grid)
 
+
+class GridBFSResult:
+    """
+    The result of running grid_bfs_fast. Positions in the grid
+    are encoded as integers (see the encode/decode methods),
+    and the distances to every position reached in the search
+    are stored in a flat array (with -1 for positions that
+    were not reached)
+    """
+
+    def __init__(self, rows: int, cols: int, period: int, dist: array[int],
+                 prev: array[int] | None, target: int | None) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.period = period
+
+        # Flat array of distances, indexed by encoded position
+        self.dist = dist
+
+        # Flat array of previous positions (or None if we
+        # didn't keep track of paths)
+        self._prev = prev
+
+        # Encoded target we reached (or None if we didn't reach any)
+        self._target = target
+
+    def encode(self, row: int, col: int, t: int = 0) -> int:
+        """
+        Encode a position (and time step, if the grid
+        changes over time) as an integer
+        """
+        return ((t % self.period) * self.rows + row) * self.cols + col
+
+    def decode(self, index: int) -> tuple[int, ...]:
+        """
+        Decode an integer into a (row, col) position (or
+        (row, col, t) if the grid changes over time, where t
+        is the time step modulo the period)
+        """
+        t, cell = divmod(index, self.rows * self.cols)
+        row, col = divmod(cell, self.cols)
+        if self.period == 1:
+            return (row, col)
+        return (row, col, t)
+
+    @property
+    def found(self) -> bool:
+        """
+        Returns True if we reached a target
+        """
+        return self._target is not None
+
+    @property
+    def target(self) -> tuple[int, ...] | None:
+        """
+        Returns the target we reached (or None)
+        """
+        if self._target is None:
+            return None
+        return self.decode(self._target)
+
+    @property
+    def distance(self) -> int | None:
+        """
+        Returns the distance to the target we reached (or None)
+        """
+        if self._target is None:
+            return None
+        return self.dist[self._target]
+
+    def distance_to(self, row: int, col: int, t: int = 0) -> int | None:
+        """
+        Returns the distance to a position (or None if the
+        position was not reached)
+        """
+        d = self.dist[self.encode(row, col, t)]
+        return None if d < 0 else d
+
+    def path(self) -> list[tuple[int, ...]] | None:
+        """
+        Generate the path from a starting position to the target
+        (as a list of positions, see decode)
+        """
+        if self._prev is None:
+            raise ValueError("The search did not keep track of paths (see track_paths)")
+
+        if self._target is None:
+            return None
+
+        path = [self._target]
+        while self._prev[path[-1]] != -1:
+            path.append(self._prev[path[-1]])
+        path.reverse()
+
+        return [self.decode(index) for index in path]
+
+
+def grid_bfs_fast(grid: Grid[Any], starts: Iterable[tuple[int, ...]],
+                  targets: Iterable[tuple[int, int]] | None = None,
+                  walls: Collection[Any] = ("#",),
+                  open_cells: npt.NDArray[np.bool_] | None = None,
+                  moves: Iterable[tuple[int, int]] = Grid.CARDINAL_DIRS,
+                  track_paths: bool = False) -> GridBFSResult:
+    """
+    Breadth-first search (BFS) on a grid, optimized for large grids.
+
+    Instead of working with (x, y) tuples, and calling functions
+    to check every position, each position is encoded as a single
+    integer, and we figure out all the positions we can move into
+    before starting the search. Distances are stored in a flat
+    array, and the path is only tracked if we ask for it.
+
+    This also supports grids where the open positions change over
+    time (e.g., because there are moving obstacles). In that case,
+    the search is done over (row, col, t) positions, where t is
+    the time step modulo the period of the obstacles.
+
+    Parameters:
+    - grid: The grid (an aoc.grid.Grid object) to do BFS on
+    - starts: List of starting positions. Each position is a
+              (row, col) tuple, or (row, col, t) if we're
+              starting at a specific time step.
+    - targets: Collection of (row, col) positions we're looking for
+               (at any time step). The search stops as soon as it
+               reaches one of them. If None, the search visits every
+               reachable position.
+    - walls: Values of the grid that we can't move into
+    - open_cells: Optionally, a boolean NumPy array indicating which
+                  positions we can move into (instead of using the
+                  walls). This can be a 2D array (rows x cols) or,
+                  if the grid changes over time, a 3D array
+                  (period x rows x cols), where open_cells[t % period]
+                  are the open positions at time step t.
+    - moves: The (row, col) offsets we can move in. Include (0, 0)
+             to allow staying put (which only makes sense if the
+             grid changes over time)
+    - track_paths: Keep track of previous positions, so we can
+                   generate paths (see GridBFSResult.path)
+
+    Returns: A GridBFSResult object
+    """
+
+    rows, cols = grid.rows, grid.cols
+    n = rows * cols
+
+    if open_cells is None:
+        open_cells = ~np.isin(grid.to_array(), list(walls))
+    if open_cells.ndim == 2:
+        open_cells = open_cells[np.newaxis]
+
+    period = open_cells.shape[0]
+    is_open = open_cells.ravel().tolist()
+
+    # Neighbors of every position (ignoring time), as encoded positions
+    adj = []
+    for r in range(rows):
+        for c in range(cols):
+            adj.append([(r+dr) * cols + (c+dc) for dr, dc in moves
+                        if 0 <= r+dr < rows and 0 <= c+dc < cols])
+
+    target_cells: set[int]
+    if targets is None:
+        target_cells = set()
+    else:
+        target_cells = {r * cols + c for r, c in targets}
+
+    dist = array("l", [-1]) * (period * n)
+    prev = array("l", [-1]) * (period * n) if track_paths else None
+    result = GridBFSResult(rows, cols, period, dist, prev, None)
+
+    q: deque[int] = deque()
+    for start in starts:
+        index = result.encode(*start)
+        dist[index] = 0
+        q.append(index)
+
+    # Ye olde BFS loop
+    while len(q) > 0:
+        cur = q.popleft()
+        t, cell = divmod(cur, n)
+
+        # Check if we've reached the target
+        if cell in target_cells:
+            result._target = cur
+            break
+
+        # Check the neighbors (at the next time step)
+        base = ((t + 1) % period) * n
+        d = dist[cur] + 1
+        for neigh_cell in adj[cell]:
+            neigh = base + neigh_cell
+            if is_open[neigh] and dist[neigh] < 0:
+                dist[neigh] = d
+                if prev is not None:
+                    prev[neigh] = cur
+                q.append(neigh)
+
+    return result
+
+def test_grid_bfs_fast() -> None:
+
+    # Same maze as in test_grid_bfs
+
+    grid_str = \
+"""
+################
+...###.........#
+##.###.###.##.##
+##.###.###.##.##
+##......#..#...X
+##.###.######.##
+##...#........##
+################
+"""
+
+    grid = Grid.from_string(grid_str)
+
+    target = grid.find_value("X")
+    assert target is not None
+    result = grid_bfs_fast(grid, [(1, 0)], [target], track_paths=True)
+
+    path = result.path()
+    assert path is not None
+    print(f"Distance: {result.distance}")
+    print(grid.str_with_markers([(pos[0], pos[1]) for pos in path], "█"))
+
 ###############################################################################
 # 
 #  DIJKSTRA
@@ -258,9 +513,10 @@ def test_grid_bfs():
 ###############################################################################    
 
 import heapq
-import sys
+import itertools
 
-def dijkstra(graph, from_node, to_node):
+def dijkstra(graph: Mapping[Any, Sequence[tuple[Any, float]]], from_node: Any,
+             to_node: Any) -> tuple[float | None, list[Any] | None]:
     """
     Dijkstra's shortest-path algorithm
 
@@ -273,48 +529,17 @@ def dijkstra(graph, from_node, to_node):
                           distance between
 
     Returns: The shortest distance, and the shortest path
+             (or None, None if to_node can't be reached
+             from from_node)
     """
 
-    # List that we'll use like a priority queue with heapq
-    h = []
+    result = search(from_node,
+                    lambda node: graph.get(node, []),
+                    target=[to_node])
 
-    # Distance and previous-node dictionaries
-    node_dist = {}
-    node_dist[from_node] = 0
-    prev = {}
-    prev[from_node] = None
+    return result.cost, result.path()
 
-    # Add the start node
-    heapq.heappush(h, (0, from_node))
-
-    # Ye olde Dikstra loop
-    while len(h) > 0:
-        dist, cur_node = heapq.heappop(h)
-
-        # We've reached the end and don't need to check further
-        if cur_node == to_node:
-            break
-
-        # Check the neighbors
-        for neighbor, distance in graph[cur_node]:
-            # Update distance/prev/queue if necessary
-            new_distance = node_dist[cur_node] + distance
-            if new_distance < node_dist.get(neighbor, sys.maxsize):
-                node_dist[neighbor] = new_distance
-                prev[neighbor] = cur_node
-                heapq.heappush(h, (new_distance, neighbor))
-
-    # Generate path
-    path = [to_node]
-    node = to_node
-    while node != from_node:
-        node = prev[node]
-        path.append(node)
-    path.reverse()
-
-    return node_dist[to_node], path
-
-def test_dijkstra():
+def test_dijkstra() -> None:
     graph = {"A": [("B",20), ("C",10)],
              "B": [("A",20), ("C",20), ("D",15), ("E", 5)],
              "C": [("A",10), ("B",20), ("D",50), ("E",20)],
@@ -329,6 +554,458 @@ def test_dijkstra():
     print(dijkstra(graph, "D", "A"))
 
 
+###############################################################################
+# 
+#  GENERAL SHORTEST PATH SEARCH (DIJKSTRA / A*)
+# 
+###############################################################################    
+
+class SearchResult:
+    """
+    The result of running search(). Includes the cost of
+    the best path to the target (if any), as well as the
+    cost of every state we reached along the way (in case
+    we need the costs to other states), and a few counters
+    that are useful for profiling the search.
+
+    The path itself is not generated unless we ask for it
+    (with the path method)
+    """
+
+    def __init__(self, target: Any, costs: dict[Any, float], prev: dict[Any, Any] | None,
+                 expanded: int, pushes: int) -> None:
+        # The target we reached (None if we didn't reach any)
+        self.target = target
+
+        # Best known cost to every state reached during the search
+        # (only guaranteed to be optimal for the states that
+        # were expanded)
+        self.costs = costs
+
+        # Number of states removed from the queue and expanded
+        self.expanded = expanded
+
+        # Number of states added to the queue
+        self.pushes = pushes
+
+        # Previous-state dictionary (None if we didn't keep track
+        # of previous states)
+        self._prev = prev
+
+    @property
+    def found(self) -> bool:
+        """
+        Returns True if we reached a target
+        """
+        return self.target is not None
+
+    @property
+    def cost(self) -> float | None:
+        """
+        Returns the cost of the best path to the target
+        (or None if we didn't reach a target)
+        """
+        if self.target is None:
+            return None
+        return self.costs[self.target]
+
+    def path(self, state: Any = None) -> list[Any] | None:
+        """
+        Generate the path from a source state to the target
+        (or to a given state, which must have been reached
+        during the search)
+
+        Returns: The path as a list of states (or None if the
+                 state was not reached)
+        """
+        if self._prev is None:
+            raise ValueError("The search did not keep track of paths (see track_paths)")
+
+        if state is None:
+            state = self.target
+
+        if state is None or state not in self._prev:
+            return None
+
+        path = [state]
+        while self._prev[state] is not None:
+            state = self._prev[state]
+            path.append(state)
+        path.reverse()
+
+        return path
+
+    def __repr__(self) -> str:
+        return f"<SearchResult cost={self.cost} expanded={self.expanded} pushes={self.pushes}>"
+
+
+def search(sources: Any, neighbors: Callable[[Any], Iterable[tuple[Any, float]]],
+           target: Collection[Any] | Callable[[Any], bool] | None = None,
+           heuristic: Callable[[Any], float] | None = None,
+           max_cost: float | None = None, multi_source: bool = False,
+           track_paths: bool = True) -> SearchResult:
+    """
+    Shortest-path search on an implicit graph (where we don't have
+    the whole graph up front, but we can compute the neighbors
+    of any given state). This is Dijkstra's algorithm and, if
+    we provide a heuristic, A* search.
+
+    Parameters:
+    - sources: The starting state or, if multi_source is True,
+               an iterable of starting states (the search
+               behaves as if all of them were at cost zero)
+    - neighbors: A function that takes a state and returns an
+                 iterable of (neighbor, cost) tuples. States can
+                 be any hashable value, and costs must be
+                 non-negative.
+    - target: The state(s) we're looking for. Can be either a
+              collection of states, or a function that takes a
+              state and returns True if it is a target. The search
+              stops as soon as it reaches a target. If None, the
+              search explores every reachable state.
+    - heuristic: An (optional) function that takes a state and
+                 returns a lower bound on the cost to reach a target
+                 from that state. If the heuristic never overestimates
+                 that cost (i.e., if it is admissible), the search
+                 still returns the shortest path, but expands fewer
+                 states.
+    - max_cost: If specified, states with a cost higher than this
+                are not explored.
+    - multi_source: See sources
+    - track_paths: Keep track of the previous state of each state,
+                   so we can generate paths (see SearchResult.path).
+                   Set to False if only the cost is needed.
+
+    Returns: A SearchResult object
+    """
+
+    if multi_source:
+        sources = list(sources)
+    else:
+        sources = [sources]
+
+    is_target: Callable[[Any], bool]
+    if target is None:
+        is_target = lambda state: False
+    elif callable(target):
+        is_target = target
+    else:
+        target_set = set(target)
+        is_target = lambda state: state in target_set
+
+    # The heap contains (priority, tiebreaker, cost, state) tuples.
+    # The tiebreaker ensures we never compare two states
+    # (which may not be comparable), and makes the search
+    # explore states in FIFO order when priorities are equal.
+    counter = itertools.count()
+    h: list[tuple[float, int, float, Any]] = []
+
+    costs: dict[Any, float] = {}
+    prev: dict[Any, Any] | None = {} if track_paths else None
+    expanded = 0
+
+    for source in sources:
+        costs[source] = 0
+        if prev is not None:
+            prev[source] = None
+        priority = heuristic(source) if heuristic is not None else 0
+        heapq.heappush(h, (priority, next(counter), 0, source))
+
+    while len(h) > 0:
+        _, _, cost, state = heapq.heappop(h)
+
+        # Skip stale entries (we found a cheaper way to this
+        # state after it was pushed into the queue)
+        if cost > costs[state]:
+            continue
+
+        # We've reached a target and don't need to check further
+        if is_target(state):
+            return SearchResult(state, costs, prev, expanded, next(counter))
+
+        expanded += 1
+
+        for neighbor, step_cost in neighbors(state):
+            new_cost = cost + step_cost
+
+            if max_cost is not None and new_cost > max_cost:
+                continue
+
+            if neighbor not in costs or new_cost < costs[neighbor]:
+                costs[neighbor] = new_cost
+                if prev is not None:
+                    prev[neighbor] = state
+                if heuristic is not None:
+                    priority = new_cost + heuristic(neighbor)
+                else:
+                    priority = new_cost
+                heapq.heappush(h, (priority, next(counter), new_cost, neighbor))
+
+    # We didn't reach any target
+    return SearchResult(None, costs, prev, expanded, next(counter))
+
+def test_search() -> None:
+    # Shortest path on a small grid, where we don't
+    # build the graph explicitly. Each cell's value is
+    # the cost of entering that cell.
+
+    grid_str = \
+"""
+1163751742
+1381373672
+2136511328
+3694931569
+7463417111
+1319128137
+1359912421
+3125421639
+1293138521
+2311944581
+"""
+
+    grid = Grid.from_string(grid_str, cast=int)
+    target = (grid.rows - 1, grid.cols - 1)
+
+    def neighbors(pos: tuple[int, int]) -> Iterable[tuple[tuple[int, int], Any]]:
+        r, c = pos
+        for dr, dc in Grid.CARDINAL_DIRS:
+            if grid.valid(r+dr, c+dc):
+                yield (r+dr, c+dc), grid.get(r+dr, c+dc)
+
+    def manhattan(pos: tuple[int, int]) -> int:
+        return abs(target[0] - pos[0]) + abs(target[1] - pos[1])
+
+    print("Dijkstra (0,0) -> (9,9)")
+    print(search((0, 0), neighbors, [target]))
+
+    print("A* (0,0) -> (9,9)")
+    result = search((0, 0), neighbors, [target], heuristic=manhattan)
+    print(result)
+    print(result.path())
+
+
+###############################################################################
+# 
+#  BRANCH AND BOUND
+# 
+###############################################################################    
+
+def branch_and_bound(root: Any, branches: Callable[[Any], Iterable[Any]],
+                     value: Callable[[Any], float], upper_bound: Callable[[Any], float],
+                     key: Callable[[Any], Hashable] | None = None, max_memo: int = 1_000_000,
+                     stats: Counter[str] | None = None) -> tuple[float, Any, Counter[str]]:
+    """
+    Branch-and-bound search for the state with the highest value
+    in a tree of states (e.g., the states of a game, where each
+    branch is a possible move).
+
+    The tree is explored depth-first (using an explicit stack),
+    and we skip any state whose upper bound is not better than
+    the best value we've found so far. Optionally, we can also
+    skip states we've already explored.
+
+    Parameters:
+    - root: The initial state
+    - branches: A function that takes a state and returns the
+                states we can reach from it. Branches are explored
+                in the order they are returned (so it pays off to
+                return the most promising ones first)
+    - value: A function that returns the value of a state (i.e.,
+             the value we'd get if we stopped exploring at that state)
+    - upper_bound: A function that returns an upper bound on the value
+                   of any state we can reach from a given state
+                   (including the state itself). The tighter the
+                   bound, the more states we can prune.
+    - key: Optionally, a function that returns a hashable key for a
+           state. If specified, we keep track of the keys of states
+           we've explored, and skip states with a key we've seen
+           before.
+    - max_memo: Maximum number of keys to keep track of. If we reach
+                this limit, we forget all the keys (to keep memory
+                usage bounded)
+    - stats: Optionally, a Counter object for the statistics of the
+             search (so the branches function can also record
+             its own statistics in it)
+
+    Returns: The best value, the state with that value, and a Counter
+             with statistics about the search ("explored" states,
+             states "pruned_bound" because of their upper bound, and
+             states "pruned_memo" because we had already seen them)
+    """
+    if stats is None:
+        stats = Counter()
+
+    best_value = value(root)
+    best_state = root
+    seen: set[Hashable] = set()
+
+    stack = [root]
+    while len(stack) > 0:
+        state = stack.pop()
+
+        if upper_bound(state) <= best_value:
+            stats["pruned_bound"] += 1
+            continue
+
+        if key is not None:
+            k = key(state)
+            if k in seen:
+                stats["pruned_memo"] += 1
+                continue
+            if len(seen) >= max_memo:
+                seen.clear()
+            seen.add(k)
+
+        stats["explored"] += 1
+
+        v = value(state)
+        if v > best_value:
+            best_value = v
+            best_state = state
+
+        # We push the branches in reverse order, so they
+        # are popped in the order they were returned
+        stack.extend(reversed(list(branches(state))))
+
+    return best_value, best_state, stats
+
+def test_branch_and_bound() -> None:
+    # 0/1 knapsack: pick items (weight, value) to maximize the
+    # total value without exceeding the capacity. Each state is
+    # (next item to decide on, total weight, total value)
+    items = [(12, 4), (2, 2), (1, 1), (1, 2), (4, 10)]
+    capacity = 15
+
+    def branches(state: tuple[int, int, int]) -> list[tuple[int, int, int]]:
+        i, weight, val = state
+        if i == len(items):
+            return []
+        w, v = items[i]
+        children = [(i+1, weight, val)]
+        if weight + w <= capacity:
+            children.insert(0, (i+1, weight + w, val + v))
+        return children
+
+    def upper_bound(state: tuple[int, int, int]) -> int:
+        # Optimistic: we can take all the remaining items
+        i, _, val = state
+        return val + sum(v for _, v in items[i:])
+
+    best, state, stats = branch_and_bound((0, 0, 0), branches,
+                                          lambda s: s[2], upper_bound)
+
+    print(f"Best value: {best} (weight {state[1]})")
+    print(dict(stats))
+
+
+###############################################################################
+# 
+#  CYCLE DETECTION
+# 
+###############################################################################    
+
+class Cycle:
+    """
+    A cycle found by detect_cycle(). The state at step
+    start + length is the same as the state at step start
+    (and, from then on, the simulation repeats itself)
+    """
+
+    def __init__(self, start: int, length: int, values: list[Any] | None) -> None:
+        # First step of the cycle
+        self.start = start
+
+        # Number of steps in the cycle
+        self.length = length
+
+        # Value at each step we simulated (from step 0 to
+        # step start + length, inclusive), or None if
+        # we didn't keep track of values
+        self.values = values
+
+    def value_at(self, n: int) -> Any:
+        """
+        Returns the value at step n (extrapolating from the
+        values in the cycle, if n is past the steps we simulated).
+        This assumes the value grows by the same amount every
+        time we go through the cycle.
+        """
+        if self.values is None:
+            raise ValueError("The cycle detection did not keep track of values (see value_fn)")
+
+        if n < len(self.values):
+            return self.values[n]
+
+        n_cycles, offset = divmod(n - self.start, self.length)
+        delta = self.values[self.start + self.length] - self.values[self.start]
+
+        return self.values[self.start + offset] + n_cycles * delta
+
+    def __repr__(self) -> str:
+        return f"Cycle(start={self.start}, length={self.length})"
+
+
+def detect_cycle(state_key_fn: Callable[[Any], Hashable], step_fn: Callable[[Any], Any],
+                 state: Any, value_fn: Callable[[Any], Any] | None = None,
+                 max_steps: int | None = None) -> Cycle | None:
+    """
+    Run a simulation one step at a time until we reach a state
+    we've seen before.
+
+    Parameters:
+    - state_key_fn: Function that returns a hashable "fingerprint"
+                    of a state. Two states with the same fingerprint
+                    are assumed to behave the same from then on.
+    - step_fn: Function that takes a state, and returns the state
+               after one step (it can modify the state in place,
+               as long as it returns it). If it returns None, the
+               simulation has ended.
+    - state: The initial state
+    - value_fn: Optionally, a function that returns a value we want
+                to keep track of at every step (e.g., the height of
+                a tower), so we can extrapolate it with the cycle.
+    - max_steps: Maximum number of steps to simulate
+
+    Returns: A Cycle object, or None if the simulation ended (or
+             we reached max_steps) without repeating a state.
+    """
+    seen: dict[Hashable, int] = {}
+    values: list[Any] | None = [] if value_fn is not None else None
+
+    step = 0
+    while True:
+        if value_fn is not None and values is not None:
+            values.append(value_fn(state))
+
+        key = state_key_fn(state)
+        if key in seen:
+            return Cycle(seen[key], step - seen[key], values)
+        seen[key] = step
+
+        if step == max_steps:
+            return None
+
+        state = step_fn(state)
+        if state is None:
+            return None
+        step += 1
+
+def test_detect_cycle() -> None:
+    # Squaring numbers modulo 97 eventually cycles
+    # (here we also keep track of the sum of all the
+    # numbers generated so far)
+    def step(state: tuple[int, int]) -> tuple[int, int]:
+        x, total = state
+        x = (x * x + 1) % 97
+        return x, total + x
+
+    cycle = detect_cycle(lambda s: s[0], step, (1, 1), value_fn=lambda s: s[1])
+
+    assert cycle is not None
+    print(cycle)
+    print("Sum of the first 1,000,000,000 numbers:", cycle.value_at(10**9 - 1))
+
+
 ###############################################################################       
 
 
@@ -339,4 +1016,12 @@ if __name__ == "__main__":
     print()
     test_grid_bfs()
     print()
+    test_grid_bfs_fast()
+    print()
     test_dijkstra()
+    print()
+    test_search()
+    print()
+    test_branch_and_bound()
+    print()
+    test_detect_cycle()
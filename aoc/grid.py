@@ -3,13 +3,35 @@ This module defines a Grid class that comes in handy in
 Advent of Code problems that involve working with grids,
 particularly when we need to navigate around the grid
 (keeping grid bounds in mind).
+
+The contents of a grid are kept in a storage backend.
+By default, we use a list of lists (which can hold
+values of any type) but, for larger grids, there are
+two more compact backends:
+
+- "bytes": Stores single-character grids (the most common
+  kind of grid in AoC) in a contiguous bytearray.
+- "numpy": Stores numeric grids (e.g., grids created with
+  cast=int) in a 2D NumPy array.
+
+Regardless of the backend, grids can also be manipulated
+as NumPy arrays, which allows running cellular automata
+(where every cell is updated based on the number of
+neighbors with a given value) on the whole grid at once,
+instead of one cell at a time.
+
+Running this Python file will run a micro-benchmark
+comparing the backends.
 """
 
-from typing import Generic, Self
-from collections.abc import Generator
+import copy
+from abc import ABC, abstractmethod
+from typing import Any, Generic, Self
+from collections.abc import Callable, Collection, Generator, Hashable
 from typing_extensions import TypeVar
 
-import copy
+import numpy as np
+import numpy.typing as npt
 
 # Type variable so we can make the Grid class generic
 # While most grids contain strings, there are occasional
@@ -18,12 +40,393 @@ import copy
 T = TypeVar("T", default=str)
 
 
+#
+# STORAGE BACKENDS
+#
+
+class GridStorage(ABC, Generic[T]):
+    """
+    Base class for grid storage backends.
+
+    A backend only needs to know how to store values
+    at (row, col) positions. It can assume that the
+    coordinates it receives have already been validated
+    by the Grid class.
+
+    Backends must implement all the abstract methods
+    (and can override the others if they have a faster
+    way of doing things).
+    """
+
+    rows: int
+    cols: int
+
+    @abstractmethod
+    def __init__(self, grid: list[list[T]]):
+        """Constructor
+
+        Args:
+            grid (list[list[T]]): List of lists of values
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, row: int, col: int) -> T:
+        """Get the value at (row, col)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, row: int, col: int, value: T) -> None:
+        """Set the value at (row, col)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def row(self, row: int) -> list[T]:
+        """Get all the values in a row"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def copy(self) -> Self:
+        """Create a copy of the storage"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def key(self) -> Hashable:
+        """Return a hashable snapshot of the contents of the grid
+
+        The format of the snapshot is specific to each backend,
+        so keys should only be compared with keys from grids
+        that use the same backend.
+        """
+        raise NotImplementedError
+
+    def find(self, value: T) -> tuple[int, int] | None:
+        """Find the first occurrence of a value (in row-major order)
+
+        Returns None if the value is not in the grid, including
+        when it is a value the backend cannot hold.
+        """
+        for r in range(self.rows):
+            for c, v in enumerate(self.row(r)):
+                if v == value:
+                    return (r, c)
+        return None
+
+    def to_array(self) -> npt.NDArray[Any]:
+        """Return a new 2D NumPy array with the contents of the grid"""
+        return np.array([self.row(r) for r in range(self.rows)])
+
+    def set_array(self, array: npt.NDArray[Any]) -> None:
+        """Replace the contents of the grid with a 2D NumPy array
+        (with the same shape as the grid)"""
+        for r, row in enumerate(array.tolist()):
+            for c, v in enumerate(row):
+                self.set(r, c, v)
+
+
+class ListStorage(GridStorage[T]):
+    """
+    Stores the grid as a list of lists. This is the most
+    flexible backend, as it can hold values of any type.
+
+    Like the original Grid class, the storage makes a deep
+    copy of the values, so mutable values are never shared
+    between a grid and its copies.
+    """
+
+    _grid: list[list[T]]
+
+    def __init__(self, grid: list[list[T]]):
+        self._grid = copy.deepcopy(grid)
+        self.rows = len(self._grid)
+        self.cols = len(self._grid[0])
+
+    def get(self, row: int, col: int) -> T:
+        return self._grid[row][col]
+
+    def set(self, row: int, col: int, value: T) -> None:
+        self._grid[row][col] = value
+
+    def row(self, row: int) -> list[T]:
+        return self._grid[row]
+
+    def copy(self) -> Self:
+        return type(self)(self._grid)
+
+    def key(self) -> Hashable:
+        return tuple(tuple(row) for row in self._grid)
+
+    def set_array(self, array: npt.NDArray[Any]) -> None:
+        self._grid = array.tolist()
+
+
+class ByteStorage(GridStorage[str]):
+    """
+    Stores a grid of single characters in a contiguous
+    bytearray, in row-major order. Only characters with
+    a code point below 256 can be stored.
+    """
+
+    _data: bytearray
+
+    def __init__(self, grid: list[list[str]]):
+        self.rows = len(grid)
+        self.cols = len(grid[0])
+        self._data = bytearray("".join("".join(row) for row in grid), "latin-1")
+
+        if len(self._data) != self.rows * self.cols:
+            raise ValueError("ByteStorage can only store single-character values")
+
+    def get(self, row: int, col: int) -> str:
+        return chr(self._data[row * self.cols + col])
+
+    def set(self, row: int, col: int, value: str) -> None:
+        self._data[row * self.cols + col] = ord(value)
+
+    def row(self, row: int) -> list[str]:
+        start = row * self.cols
+        return list(self._data[start:start + self.cols].decode("latin-1"))
+
+    def copy(self) -> Self:
+        storage = type(self).__new__(type(self))
+        storage.rows = self.rows
+        storage.cols = self.cols
+        storage._data = self._data.copy()
+        return storage
+
+    def key(self) -> Hashable:
+        return (self.cols, bytes(self._data))
+
+    def find(self, value: str) -> tuple[int, int] | None:
+        if not isinstance(value, str) or len(value) != 1 or ord(value) > 255:
+            return None
+        i = self._data.find(ord(value))
+        if i == -1:
+            return None
+        return divmod(i, self.cols)
+
+    def to_array(self) -> npt.NDArray[Any]:
+        array = np.frombuffer(self._data, dtype="S1").reshape(self.rows, self.cols)
+        return array.astype("U1")
+
+    def set_array(self, array: npt.NDArray[Any]) -> None:
+        self._data = bytearray(array.astype("S1").tobytes())
+
+
+class NumpyStorage(GridStorage[T]):
+    """
+    Stores a grid of numbers in a 2D NumPy array.
+    """
+
+    _array: npt.NDArray[Any]
+
+    def __init__(self, grid: list[list[T]]):
+        self._array = np.array(grid)
+        if self._array.ndim != 2 or self._array.dtype.kind not in "biuf":
+            raise ValueError("NumpyStorage can only store numeric values")
+        self.rows, self.cols = self._array.shape
+
+    def get(self, row: int, col: int) -> T:
+        # item() returns a Python scalar (instead of a NumPy scalar)
+        return self._array.item(row, col)  # type: ignore[no-any-return]
+
+    def set(self, row: int, col: int, value: T) -> None:
+        self._array[row, col] = value
+
+    def row(self, row: int) -> list[T]:
+        return self._array[row].tolist()  # type: ignore[no-any-return]
+
+    def copy(self) -> Self:
+        storage = type(self).__new__(type(self))
+        storage.rows = self.rows
+        storage.cols = self.cols
+        storage._array = self._array.copy()
+        return storage
+
+    def key(self) -> Hashable:
+        return (self._array.shape, self._array.dtype.str, self._array.tobytes())
+
+    def find(self, value: T) -> tuple[int, int] | None:
+        matches = np.flatnonzero(self._array == value)
+        if len(matches) == 0:
+            return None
+        return divmod(int(matches[0]), self.cols)
+
+    def to_array(self) -> npt.NDArray[Any]:
+        return self._array.copy()
+
+    def set_array(self, array: npt.NDArray[Any]) -> None:
+        self._array = array.astype(self._array.dtype, copy=True)
+
+
+#
+# ARRAY HELPERS
+#
+
+def shift(array: npt.NDArray[Any], dr: int, dc: int,
+          boundary: str = "constant", fill: Any = 0) -> npt.NDArray[Any]:
+    """Shift a 2D array, so each position contains the value of its neighbor
+
+    The value at (r, c) of the returned array is the value
+    at (r+dr, c+dc) in the original array.
+
+    Args:
+        array (NDArray): 2D array
+        dr (int): Row offset of the neighbor
+        dc (int): Column offset of the neighbor
+        boundary (str, optional): How to handle neighbors outside
+            the array: "constant" uses the fill value, and "wrap"
+            wraps around to the other side of the array.
+        fill (Any, optional): Fill value for the "constant" boundary
+
+    Returns:
+        NDArray: Shifted array (with the same shape as the original)
+
+    Raises:
+        ValueError: If the boundary is not valid
+    """
+    if boundary == "wrap":
+        return np.roll(array, (-dr, -dc), axis=(0, 1))
+    elif boundary != "constant":
+        raise ValueError(f"Unknown boundary: {boundary}")
+
+    rows, cols = array.shape
+    shifted = np.full_like(array, fill)
+    if abs(dr) >= rows or abs(dc) >= cols:
+        return shifted
+
+    dst_rows = slice(max(0, -dr), rows - max(0, dr))
+    src_rows = slice(max(0, dr), rows - max(0, -dr))
+    dst_cols = slice(max(0, -dc), cols - max(0, dc))
+    src_cols = slice(max(0, dc), cols - max(0, -dc))
+    shifted[dst_rows, dst_cols] = array[src_rows, src_cols]
+
+    return shifted
+
+
+def neighbor_counts(mask: npt.NDArray[np.bool_],
+                    neighborhood: list[tuple[int, int]],
+                    boundary: str = "constant") -> npt.NDArray[np.int64]:
+    """Count, for every position, how many of its neighbors are set in a mask
+
+    Args:
+        mask (NDArray[bool]): 2D boolean array
+        neighborhood (list[tuple[int, int]]): Offsets of the neighbors
+            (e.g., Grid.DIRECTIONS or Grid.CARDINAL_DIRS)
+        boundary (str, optional): "constant" (positions outside the
+            array are never counted) or "wrap" (see `shift`)
+
+    Returns:
+        NDArray[int]: Array with the number of neighbors of each position
+    """
+    values = mask.astype(np.int64)
+    counts = np.zeros_like(values)
+    for dr, dc in neighborhood:
+        counts += shift(values, dr, dc, boundary)
+    return counts
+
+
+def gather_counts(mask: npt.NDArray[np.bool_],
+                  adjacency: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    """Count, for every position, how many of its neighbors are set in a mask
+
+    Same as `neighbor_counts`, but using an explicit adjacency
+    array (see `Grid.visible_neighbors`) instead of offsets.
+
+    Args:
+        mask (NDArray[bool]): 2D boolean array
+        adjacency (NDArray[int]): Array with one row per position
+            (in row-major order) containing the flat indices of
+            its neighbors, or -1 if there is no neighbor.
+
+    Returns:
+        NDArray[int]: Array with the number of neighbors of each position
+    """
+    # We add an extra False value at the end of the mask,
+    # so that the -1 indices (no neighbor) are never counted.
+    flat_mask = np.append(mask.ravel(), False)
+    counts = flat_mask[adjacency].sum(axis=1, dtype=np.int64)
+    return counts.reshape(mask.shape)
+
+
+def label_components(mask: npt.NDArray[np.bool_]
+                     ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """Find the connected regions in a boolean array
+
+    Two positions are connected if they are both set in the
+    mask, and are adjacent along one of the axes (i.e., no
+    diagonals). This works on arrays with any number of
+    dimensions, and uses an explicit stack (instead of
+    recursion), so it's not affected by the recursion limit.
+
+    Args:
+        mask (NDArray[bool]): Boolean array
+
+    Returns:
+        tuple[NDArray[int], NDArray[int]]: An array (with the same
+            shape as the mask) with the id of the region each position
+            belongs to (or -1 for positions not set in the mask), and
+            an array with the size of each region. Regions are
+            numbered from zero, in the order in which we encounter
+            them (in row-major order).
+    """
+    # We add a border of unset positions around the mask, which
+    # means we can find the neighbors of a position by just
+    # adding/subtracting the strides of the (flattened) array,
+    # without having to check whether we've fallen off the edge.
+    padded = np.pad(mask.astype(bool), 1, constant_values=False)
+    offsets = []
+    for stride in padded.strides:
+        offsets += [stride // padded.itemsize, -stride // padded.itemsize]
+
+    is_set = padded.ravel().tolist()
+    labels = [-1] * len(is_set)
+    sizes: list[int] = []
+
+    for start in np.flatnonzero(padded).tolist():
+        if labels[start] != -1:
+            continue
+
+        label = len(sizes)
+        labels[start] = label
+        stack = [start]
+        size = 0
+        while len(stack) > 0:
+            cur = stack.pop()
+            size += 1
+            for offset in offsets:
+                neighbor = cur + offset
+                if is_set[neighbor] and labels[neighbor] == -1:
+                    labels[neighbor] = label
+                    stack.append(neighbor)
+        sizes.append(size)
+
+    unpadded = tuple(slice(1, -1) for _ in range(padded.ndim))
+    label_array = np.array(labels, dtype=np.int64).reshape(padded.shape)[unpadded]
+
+    return label_array, np.array(sizes, dtype=np.int64)
+
+
+# Type of the rules used by Grid.step_automaton: given an array
+# with the values of the cells, and an array with the neighbor
+# counts, return an array with the new values of the cells.
+AutomatonRule = Callable[[npt.NDArray[Any], npt.NDArray[np.int64]], npt.NDArray[Any]]
+
+
+# Available storage backends, by name
+STORAGE_BACKENDS: dict[str, type[GridStorage[Any]]] = {
+    "list": ListStorage,
+    "bytes": ByteStorage,
+    "numpy": NumpyStorage,
+}
+
+
 class Grid(Generic[T]):
     """
     Grid class for manipulating grids of values,
     indexed by row and column
     """
-    
+
     # Useful for problems that require checking adjacent positions
     DIRECTIONS = [(-1, -1), (0, -1), (+1,-1),
                   (-1,  0),          (+1, 0),
@@ -53,13 +456,15 @@ class Grid(Generic[T]):
                          DOWN: RIGHT,
                          RIGHT: UP}
 
-    _grid: list[list[T]]
+    _storage: GridStorage[T]
+    _rows: int
+    _cols: int
 
     #
     # CONSTRUCTORS
     #
 
-    def __init__(self, grid: list[list[T]]):
+    def __init__(self, grid: list[list[T]], storage: str = "list"):
         """Constructor
 
         Create a grid from a list of lists. Typically not
@@ -67,11 +472,27 @@ class Grid(Generic[T]):
 
         Args:
             grid (list[list[T]]): List of lists of values
+            storage (str, optional): Storage backend to use
+                ("list", "bytes", or "numpy")
+
+        Raises:
+            ValueError: If the storage backend does not exist,
+                or cannot store the values in the grid.
         """
-        self._grid = copy.deepcopy(grid)
+        if storage not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend: {storage}")
+
+        self._set_storage(STORAGE_BACKENDS[storage](grid))
+
+    def _set_storage(self, storage: GridStorage[T]) -> None:
+        """Helper method to set the storage (and cache its dimensions)"""
+        self._storage = storage
+        self._rows = storage.rows
+        self._cols = storage.cols
 
     @classmethod
-    def _from_lines(cls, lines: list[str], cast: type | None = None) -> Self:
+    def _from_lines(cls, lines: list[str], cast: type | None = None,
+                    storage: str = "list") -> Self:
         """Helper method to create a Grid from a list of strings
 
         Args:
@@ -79,6 +500,9 @@ class Grid(Generic[T]):
                with one character per cell.
             cast (type | None, optional): Optionally, cast each character
                to a given type.
+            storage (str, optional): Storage backend to use. Can also
+               be "auto", to use the most compact backend for the
+               type of the values.
 
         Returns: Grid
         """
@@ -89,12 +513,21 @@ class Grid(Generic[T]):
         if cast is None:
             cast = str
 
+        if storage == "auto":
+            if cast is str and all(ord(ch) < 256 for line in lines for ch in line):
+                storage = "bytes"
+            elif cast in (int, float, bool):
+                storage = "numpy"
+            else:
+                storage = "list"
+
         grid = [[cast(v) for v in row] for row in str_grid]
 
-        return cls(grid)
+        return cls(grid, storage)
 
     @classmethod
-    def from_file(cls, filename: str, cast: type | None = None) -> Self:
+    def from_file(cls, filename: str, cast: type | None = None,
+                  storage: str = "list") -> Self:
         """Create a Grid from a text file
 
         The file should contain one line per row, and one
@@ -104,7 +537,9 @@ class Grid(Generic[T]):
 
         Args:
             filename (str): Filename
-            cast (type | None, optional): Type to cast characters to. 
+            cast (type | None, optional): Type to cast characters to.
+            storage (str, optional): Storage backend to use
+                ("list", "bytes", "numpy", or "auto")
 
         Returns: Grid
         """
@@ -112,10 +547,11 @@ class Grid(Generic[T]):
             txt = f.read().strip()
             lines = txt.split("\n")
 
-        return cls._from_lines(lines, cast)
+        return cls._from_lines(lines, cast, storage)
 
     @classmethod
-    def from_string(cls, grid_str: str, cast: type | None = None) -> Self:
+    def from_string(cls, grid_str: str, cast: type | None = None,
+                    storage: str = "list") -> Self:
         """Create a grid from a string
 
         The file should contain one line per row, and one
@@ -125,16 +561,18 @@ class Grid(Generic[T]):
 
         Args:
             grid_str (str): String containing the grid
-            cast (type | None, optional):  Type to cast characters to. 
+            cast (type | None, optional):  Type to cast characters to.
+            storage (str, optional): Storage backend to use
+                ("list", "bytes", "numpy", or "auto")
 
         Returns: Grid
         """
         lines = grid_str.strip().split(sep="\n")
 
-        return cls._from_lines(lines, cast)
+        return cls._from_lines(lines, cast, storage)
 
     @classmethod
-    def init(cls, rows: int, cols: int, value: T) -> Self:
+    def init(cls, rows: int, cols: int, value: T, storage: str = "list") -> Self:
         """Create a grid filled with a specific value
 
         Creates a grid of the given dimensions, and sets all the values
@@ -144,16 +582,19 @@ class Grid(Generic[T]):
             rows (int): Number of rows
             cols (int): Number of columns
             value (T): Value to set in all cells
+            storage (str, optional): Storage backend to use
+                ("list", "bytes", or "numpy")
 
         Returns: Grid
         """
         grid = [[value] * cols for _ in range(rows)]
 
-        return cls(grid)        
+        return cls(grid, storage)
 
     def __str__(self) -> str:
         """Returns a print-able string representation"""
-        rows = ["".join(str(x) for x in row) for row in self._grid]
+        rows = ["".join(str(x) for x in self._storage.row(r))
+                for r in range(self._rows)]
         return "\n".join(rows)
 
     def str_with_markers(self, locs: list[tuple[int, int]], char: str) -> str:
@@ -170,9 +611,9 @@ class Grid(Generic[T]):
             str: String representation with markers
         """
         rows = []
-        for r, row in enumerate(self._grid):
+        for r in range(self._rows):
             line = []
-            for c, value in enumerate(row):
+            for c, value in enumerate(self._storage.row(r)):
                 if (r, c) in locs:
                     line.append(char)
                 else:
@@ -183,10 +624,15 @@ class Grid(Generic[T]):
     def copy(self) -> Self:
         """Create a deep copy of the grid
 
+        The copy uses the same storage backend as the
+        original grid.
+
         Returns: Grid
         """
-        return type(self)(self._grid)
-    
+        grid = type(self).__new__(type(self))
+        grid._set_storage(self._storage.copy())
+        return grid
+
     #
     # PROPERTIES
     #
@@ -194,13 +640,21 @@ class Grid(Generic[T]):
     @property
     def rows(self) -> int:
         """Returns the number of rows in the grid"""
-        return len(self._grid)
+        return self._rows
 
     @property
     def cols(self) -> int:
         """Returns the number of columns in the grid"""
-        return len(self._grid[0])    
-    
+        return self._cols
+
+    @property
+    def storage(self) -> str:
+        """Returns the name of the storage backend"""
+        for name, backend in STORAGE_BACKENDS.items():
+            if type(self._storage) is backend:
+                return name
+        return type(self._storage).__name__
+
     #
     # ACCESS METHODS
     #
@@ -213,27 +667,14 @@ class Grid(Generic[T]):
             for r, c, v in grid:
                 ...
         """
-        for r, row in enumerate(self._grid):
-            for c, v in enumerate(row):
+        for r in range(self._rows):
+            for c, v in enumerate(self._storage.row(r)):
                 yield (r, c, v)
 
     def items(self)-> Generator[tuple[int, int, T], None, None]:
         """Alias for `__iter__`, returns an iterator of (row, col, value)."""
         return self.__iter__()
 
-    def __validate_coords(self, row: int, col: int) -> None:
-        """Helper method to validate (row, col) coordinates
-
-        Args:
-            row (int): Row
-            col (int): Column
-
-        Raises:
-            IndexError: If the row or column are not valid
-        """
-        if not 0 <= row < self.rows or not 0 <= col < self.cols:
-            raise IndexError(f"Invalid position ({row}, {col})")
-
     def get(self, row: int, col: int) -> T:
         """Get the value at (row, col), assuming valid coordinates
 
@@ -249,9 +690,10 @@ class Grid(Generic[T]):
         Raises:
             IndexError: If the row or column are not valid
         """
-        self.__validate_coords(row, col)
+        if not (0 <= row < self._rows and 0 <= col < self._cols):
+            raise IndexError(f"Invalid position ({row}, {col})")
 
-        return self._grid[row][col]
+        return self._storage.get(row, col)
 
     def getdefault(self, row: int, col: int, default: T | None = None) -> T | None:
         """Get value at (row, col), or a default value if the coordinates are not valid
@@ -269,11 +711,11 @@ class Grid(Generic[T]):
         Returns: The value at (row, col) if the coordinates are valid,
             the default value otherwise.
         """
-        try:
-            return self.get(row, col)
-        except IndexError:
+        if not (0 <= row < self._rows and 0 <= col < self._cols):
             return default
 
+        return self._storage.get(row, col)
+
     def valid(self, row: int, col: int) -> bool:
         """Checks if (row, col) are valid coordinates
 
@@ -283,11 +725,7 @@ class Grid(Generic[T]):
 
         Returns: True if the coordinates are valid, False otherwise.
         """
-        try:
-            self.__validate_coords(row, col)
-            return True
-        except IndexError:
-            return False
+        return 0 <= row < self._rows and 0 <= col < self._cols
 
     #
     # UPDATE METHODS
@@ -302,11 +740,12 @@ class Grid(Generic[T]):
             value (T): Value
 
         Raises:
-            IndexError: If the row or column are not valid            
+            IndexError: If the row or column are not valid
         """
-        self.__validate_coords(row, col)
+        if not (0 <= row < self._rows and 0 <= col < self._cols):
+            raise IndexError(f"Invalid position ({row}, {col})")
 
-        self._grid[row][col] = value
+        self._storage.set(row, col, value)
 
 
     #
@@ -316,15 +755,16 @@ class Grid(Generic[T]):
     def hash(self) -> int:
         """Return a hash value that can be used in sets, dictionaries, etc.
 
-        Currently just generates a hash based on a
-        tuple of tuples representation of the grid.
+        The hash is computed from a snapshot of the contents
+        of the grid provided by the storage backend, so it
+        is only meaningful when comparing grids that use
+        the same backend.
 
         Returns:
             int: Hash value
         """
-        tpl_grid = tuple(tuple(row) for row in self._grid)
-        return hash(tpl_grid)
-    
+        return hash(self._storage.key())
+
     def find_value(self, value: T) -> tuple[int, int] | None:
         """Find the first occurrence of a value in the grid
 
@@ -335,8 +775,275 @@ class Grid(Generic[T]):
             tuple[int, int]: Coordinates of the value, or
             None if the value can't be found.
         """
-        for r, c, v in self.items():
-            if v == value:
-                return (r, c)
-        
-        return None
+        return self._storage.find(value)
+
+    #
+    # ARRAY METHODS
+    #
+
+    def to_array(self) -> npt.NDArray[Any]:
+        """Return the contents of the grid as a 2D NumPy array
+
+        Grids of characters are returned as arrays of
+        one-character strings (so we can still write
+        things like `array == "#"`), and numeric grids
+        are returned as numeric arrays. The array is a new
+        array, so modifying it won't modify the grid.
+
+        Returns:
+            NDArray: Array with the contents of the grid
+        """
+        return self._storage.to_array()
+
+    def set_array(self, array: npt.NDArray[Any]) -> None:
+        """Replace the contents of the grid with a 2D NumPy array
+
+        Args:
+            array (NDArray): Array (with the same shape as the grid)
+
+        Raises:
+            ValueError: If the array has a different shape
+        """
+        if array.shape != (self._rows, self._cols):
+            raise ValueError(f"Expected array with shape {(self._rows, self._cols)}, "
+                             f"got {array.shape}")
+
+        self._storage.set_array(array)
+
+    def label_components(self, passable: Collection[T]
+                         ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """Find the connected regions of the grid
+
+        A region is a set of cells containing passable values
+        that are connected to each other (moving up, down,
+        left, or right, but not diagonally). For example,
+        this is the same as flood filling from every
+        passable cell, but done in a single pass.
+
+        Args:
+            passable (Collection[T]): Values that are part of a region
+
+        Returns:
+            tuple[NDArray[int], NDArray[int]]: A 2D array with the id
+                of the region each cell belongs to (or -1 if the cell
+                is not passable), and an array with the size of
+                each region (see the `label_components` function)
+        """
+        mask = np.isin(self.to_array(), np.array(list(passable)))
+        return label_components(mask)
+
+    def visible_neighbors(self, passable: T,
+                          neighborhood: list[tuple[int, int]] = DIRECTIONS
+                          ) -> npt.NDArray[np.int64]:
+        """Find the first visible cell in each direction, for every cell
+
+        Looking from each cell in the direction of each offset
+        in the neighborhood, we skip over any cells containing
+        the `passable` value, and find the first cell that
+        doesn't contain it (if any). For example, in a grid
+        of seats where "." is the floor, this finds the seats
+        that can be seen from each seat.
+
+        The result is returned as an adjacency array that can
+        be passed to `step_automaton` and `run_until_stable`
+        (instead of a neighborhood). The index is built in
+        a single pass per direction, so it is worth building
+        it once and reusing it as long as the passable cells
+        don't change.
+
+        Args:
+            passable (T): Value of the cells we can see through
+            neighborhood (list[tuple[int, int]], optional): Directions
+                to look in
+
+        Returns:
+            NDArray[int]: Array with one row per cell (in row-major
+                order, so cell (r, c) is row r * cols + c), and one
+                column per direction, containing the flat index of
+                the first visible cell in that direction (or -1 if
+                there is no such cell)
+        """
+        rows, cols = self._rows, self._cols
+        is_passable = (self.to_array() == passable).ravel().tolist()
+        adjacency = np.full((rows * cols, len(neighborhood)), -1, dtype=np.int64)
+
+        for d, (dr, dc) in enumerate(neighborhood):
+            # We visit the cells in an order that ensures the
+            # cell at (r+dr, c+dc) is visited before (r, c), so
+            # we can reuse what that cell could see.
+            first = [-1] * (rows * cols)
+            row_order = range(rows - 1, -1, -1) if dr > 0 else range(rows)
+            col_order = range(cols - 1, -1, -1) if dc > 0 else range(cols)
+            for r in row_order:
+                nr = r + dr
+                if not 0 <= nr < rows:
+                    continue
+                for c in col_order:
+                    nc = c + dc
+                    if 0 <= nc < cols:
+                        n = nr * cols + nc
+                        first[r * cols + c] = first[n] if is_passable[n] else n
+            adjacency[:, d] = first
+
+        return adjacency
+
+    def _count_neighbors(self, cells: npt.NDArray[Any], count: T,
+                         neighborhood: list[tuple[int, int]], boundary: str,
+                         neighbors: npt.NDArray[np.int64] | None) -> npt.NDArray[np.int64]:
+        """Helper method to count neighbors in `step_automaton` and `run_until_stable`"""
+        if neighbors is not None:
+            return gather_counts(cells == count, neighbors)
+        return neighbor_counts(cells == count, neighborhood, boundary)
+
+    def step_automaton(self, rule: AutomatonRule, count: T,
+                       neighborhood: list[tuple[int, int]] = DIRECTIONS,
+                       boundary: str = "constant",
+                       neighbors: npt.NDArray[np.int64] | None = None) -> int:
+        """Run one step of a cellular automaton on the whole grid
+
+        For every cell, we count how many of its neighbors
+        contain the value `count`, and then apply the rule to
+        all the cells at once. For example, this would run
+        one step of Conway's Game of Life:
+
+            def life(cells, counts):
+                alive = (counts == 3) | ((cells == "#") & (counts == 2))
+                return np.where(alive, "#", ".")
+
+            grid.step_automaton(life, "#")
+
+        Args:
+            rule (AutomatonRule): Function that takes an array of
+                cell values and an array of neighbor counts, and
+                returns an array with the new values of the cells.
+            count (T): Value to count in the neighbors of each cell
+            neighborhood (list[tuple[int, int]], optional): Offsets
+                of the neighbors of a cell
+            boundary (str, optional): "constant" (cells outside the
+                grid are never counted) or "wrap" (the grid wraps
+                around its edges)
+            neighbors (NDArray[int] | None, optional): Adjacency
+                array (see `visible_neighbors`). If specified, it is
+                used instead of the neighborhood and boundary.
+
+        Returns:
+            int: Number of cells that changed
+        """
+        cells = self.to_array()
+        counts = self._count_neighbors(cells, count, neighborhood, boundary, neighbors)
+        new_cells = rule(cells, counts)
+        changes = int(np.count_nonzero(new_cells != cells))
+        if changes > 0:
+            self.set_array(new_cells)
+
+        return changes
+
+    def run_until_stable(self, rule: AutomatonRule, count: T,
+                         neighborhood: list[tuple[int, int]] = DIRECTIONS,
+                         boundary: str = "constant",
+                         neighbors: npt.NDArray[np.int64] | None = None,
+                         max_steps: int | None = None) -> int:
+        """Run a cellular automaton until the grid stops changing
+
+        Same as calling `step_automaton` until it returns zero,
+        except the intermediate generations are kept as arrays,
+        and the grid is only updated once we reach the final
+        (stable) generation.
+
+        Args:
+            rule (AutomatonRule): See `step_automaton`
+            count (T): See `step_automaton`
+            neighborhood (list[tuple[int, int]], optional):
+                See `step_automaton`
+            boundary (str, optional): See `step_automaton`
+            neighbors (NDArray[int] | None, optional):
+                See `step_automaton`
+            max_steps (int | None, optional): Stop after this
+                many steps, even if the grid is not stable.
+
+        Returns:
+            int: Number of steps that changed the grid
+        """
+        cells = self.to_array()
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            counts = self._count_neighbors(cells, count, neighborhood, boundary, neighbors)
+            new_cells = rule(cells, counts)
+            if np.array_equal(new_cells, cells):
+                break
+            cells = new_cells
+            steps += 1
+
+        if steps > 0:
+            self.set_array(cells)
+
+        return steps
+
+
+###############################################################################
+#
+#  BENCHMARK
+#
+###############################################################################
+
+def benchmark_storage(rows: int = 140, cols: int = 140, number: int = 5) -> None:
+    """
+    Micro-benchmark comparing the storage backends on
+    the most common grid operations.
+
+    Args:
+        rows (int): Number of rows in the benchmark grid
+        cols (int): Number of columns in the benchmark grid
+        number (int): Number of times to run each operation
+    """
+    import random
+    import timeit
+
+    rng = random.Random(2024)
+    chars = [[rng.choice(".#") for _ in range(cols)] for _ in range(rows)]
+    digits = [[rng.randint(0, 9) for _ in range(cols)] for _ in range(rows)]
+
+    grids: dict[str, Grid[Any]] = {
+        "list (str)": Grid(chars, "list"),
+        "bytes (str)": Grid(chars, "bytes"),
+        "list (int)": Grid(digits, "list"),
+        "numpy (int)": Grid(digits, "numpy"),
+    }
+
+    def get_all(grid: Grid[Any]) -> None:
+        for r in range(grid.rows):
+            for c in range(grid.cols):
+                grid.get(r, c)
+
+    def set_all(grid: Grid[Any]) -> None:
+        for r in range(grid.rows):
+            for c in range(grid.cols):
+                grid.set(r, c, grid.get(r, c))
+
+    def iterate(grid: Grid[Any]) -> None:
+        for _ in grid.items():
+            pass
+
+    def copy_grid(grid: Grid[Any]) -> None:
+        for _ in range(100):
+            grid.copy()
+
+    def hash_grid(grid: Grid[Any]) -> None:
+        for _ in range(100):
+            grid.hash()
+
+    ops = [("get", get_all), ("set", set_all), ("items()", iterate),
+           ("copy() x100", copy_grid), ("hash() x100", hash_grid)]
+
+    print(f"Grid storage benchmark ({rows}x{cols}, best of {number}, in ms)")
+    print(f"{'':14}" + "".join(f"{name:>14}" for name, _ in ops))
+    for label, grid in grids.items():
+        times = []
+        for _, op in ops:
+            t = min(timeit.repeat(lambda: op(grid), number=1, repeat=number))
+            times.append(t * 1000)
+        print(f"{label:14}" + "".join(f"{t:14.2f}" for t in times))
+
+
+if __name__ == "__main__":
+    benchmark_storage()
@@ -5,6 +5,7 @@ Utility functions and classes for Advent of Code
 import shapely.geometry
 import shapely.affinity
 import math
+import time
 import parse # type: ignore
 from collections.abc import Callable, Generator
 from typing import Self, overload
@@ -46,6 +47,28 @@ def call_and_print(fn: Callable[..., object], *args: object) -> None:
     print("{}({}) = {}".format(fn.__name__, str_args, fn(*args)))
 
 
+def call_and_time(fn: Callable[..., object], *args: object, repeat: int = 1) -> object:
+    """
+    Call a function with some parameters (repeat times), and print the
+    function call, the return value, and the best running time.
+    Returns the return value of the function.
+    """
+    str_args = ", ".join(repr(arg) for arg in args)
+
+    if len(str_args) > 20:
+        str_args = str_args[:20] + "..."
+
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rv = fn(*args)
+        best = min(best, time.perf_counter() - start)
+
+    print("{}({}) = {}  [{:.3f}s]".format(fn.__name__, str_args, rv, best))
+
+    return rv
+
+
 #
 # FILE I/O
 #